@@ -1,31 +1,90 @@
 from __future__ import annotations
 
+import copy
 import json
 import logging
 import os
 import threading
 import time
 import uuid
+from collections.abc import Coroutine
 from dataclasses import dataclass
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Any
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, urlparse
 
+from src.agent_runtime import decision_parse_snapshot
 from src.agentic_maturity import AGENTIC_MATURITY_STAGES, ASSESSMENT_QUESTIONS
-from src.ai_client import AIClient, AIClientError
+from src.ai_client import AIClient, AIClientError, AsyncAIClient
+from src.async_server import AsyncHTTPServer
+from src.chat_runtime import EventSink, run_sync
 from src.constants import LEVELS, USE_CASE_OPTIONS
-from src.levels import run_level
-from src.runtime_client import CapturedAIClient
+from src.deadline import Deadline
+from src.http_pool import shared_async_pool, shared_pool
+from src.levels import async_run_level, run_level
+from src.metrics import METRICS, RATE_LIMITED, RUN_REQUESTS, RUN_SECONDS, labels
+from src.rate_limit import RateLimiter
+from src.resilience import resilience_snapshot
+from src.response_cache import AsyncCachedAIClient, CachedAIClient, ResponseCache
+from src.runtime_client import CapturedAIClient, CapturedAsyncAIClient
+from src.single_flight import SingleFlight
+from src.static_assets import ASSET_CACHE_CONTROL, StaticAssets
+from src.static_responses import PreparedResponse, prepare_json
+from src.worker_pool import shared_worker_pool
 
 ROOT = Path(__file__).parent
 WEB = ROOT / "web"
 MAX_BODY_BYTES = 16 * 1024
 MAX_CUSTOM_CONTEXT_CHARS = 1200
-RATE_LIMIT_WINDOW_SECONDS = 60
-RATE_LIMIT_MAX_REQUESTS = 20
-_rate_limit_store: dict[str, list[float]] = {}
-_rate_limit_lock = threading.Lock()
+# Per-client sliding-window limits with O(1) state per IP; idle clients are swept away.
+RATE_LIMITER = RateLimiter.from_env()
+# Boot-time catalogue endpoints never change while the process runs, so their bodies,
+# compressed variants and ETags are built once here.
+STATIC_API = {
+    "/api/levels": prepare_json({"levels": LEVELS}),
+    "/api/use-cases": prepare_json({"use_cases": USE_CASE_OPTIONS}),
+    "/api/agentic-maturity": prepare_json({"stages": AGENTIC_MATURITY_STAGES}),
+    "/api/assessment": prepare_json({"questions": ASSESSMENT_QUESTIONS}),
+}
+STATIC_API_CACHE_CONTROL = os.getenv("STATIC_API_CACHE_CONTROL", "public, max-age=300")
+# web/ is served from memory; STATIC_RELOAD=1 re-reads files that change on disk.
+STATIC_ASSETS = StaticAssets.from_env(WEB)
+# One keep-alive pool per process so Handler threads reuse upstream connections.
+UPSTREAM_POOL = shared_pool()
+# Identical preset prompts across a classroom are answered once and then served from here.
+RESPONSE_CACHE = ResponseCache.from_env()
+# Identical runs that arrive while one is already executing wait for it instead.
+RUN_FLIGHTS: SingleFlight[dict[str, Any]] = SingleFlight()
+
+METRICS.gauge(
+    "glytch_active_threads", "Live threads in the server process.", threading.active_count
+)
+METRICS.gauge(
+    "glytch_runs_in_flight",
+    "Distinct level runs currently executing.",
+    lambda: RUN_FLIGHTS.snapshot()["in_flight"],
+)
+METRICS.gauge(
+    "glytch_response_cache_hit_ratio",
+    "Share of response cache lookups served from the cache.",
+    lambda: RESPONSE_CACHE.snapshot()["hit_ratio"],
+)
+METRICS.gauge(
+    "glytch_response_cache_entries",
+    "Entries held in the in-memory response cache.",
+    lambda: RESPONSE_CACHE.snapshot()["entries"],
+)
+METRICS.gauge(
+    "glytch_rate_limiter_clients",
+    "Client IPs currently tracked by the rate limiter.",
+    lambda: len(RATE_LIMITER),
+)
+METRICS.gauge(
+    "glytch_worker_pool_queue_depth",
+    "Calls waiting for a shared worker pool thread.",
+    lambda: shared_worker_pool().snapshot()["queue_depth"],
+)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger("glytch-demo")
@@ -39,9 +98,18 @@ class RunRequest:
 
 
 class Handler(SimpleHTTPRequestHandler):
+    # AsyncHTTPServer sets this on the handler it mixes in; runs then await the async
+    # pipeline on its event loop instead of blocking a thread on each model call.
+    on_event_loop = False
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, directory=str(WEB), **kwargs)
 
+    # Run routes are coroutines; under the threaded server nothing in them suspends, so
+    # they finish inline on the connection's thread.
+    def run_coroutine(self, work: Coroutine[Any, Any, None]) -> None:
+        run_sync(work)
+
     def _send_json(self, status: int, payload: dict[str, Any]) -> None:
         body = json.dumps(payload).encode()
         self.send_response(status)
@@ -50,6 +118,38 @@ class Handler(SimpleHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_text(self, status: int, body_text: str, content_type: str) -> None:
+        body = body_text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # The body is shared by every caller, so the request id travels in a header instead.
+    def _send_prepared(
+        self,
+        prepared: PreparedResponse,
+        request_id: str,
+        cache_control: str = STATIC_API_CACHE_CONTROL,
+    ) -> None:
+        encoding, variant = prepared.select(self.headers.get("Accept-Encoding"))
+        status = 304 if prepared.not_modified(self.headers.get("If-None-Match")) else 200
+        self.send_response(status)
+        self.send_header("ETag", variant.etag)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("X-Request-ID", request_id)
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", prepared.content_type)
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(variant.body)))
+        self.end_headers()
+        self.wfile.write(variant.body)
+
     def _request_id(self) -> str:
         return uuid.uuid4().hex[:12]
 
@@ -63,24 +163,14 @@ class Handler(SimpleHTTPRequestHandler):
 
     def _check_rate_limit(self, request_id: str) -> bool:
         ip = self.client_address[0] if self.client_address else "unknown"
-        now = time.time()
-        with _rate_limit_lock:
-            window = [
-                t for t in _rate_limit_store.get(ip, []) if now - t < RATE_LIMIT_WINDOW_SECONDS
-            ]
-            if len(window) >= RATE_LIMIT_MAX_REQUESTS:
-                self._send_json(
-                    429,
-                    {
-                        "request_id": request_id,
-                        "error": "rate limit exceeded",
-                        "code": "rate_limited",
-                    },
-                )
-                return False
-            window.append(now)
-            _rate_limit_store[ip] = window
-        return True
+        if RATE_LIMITER.allow(ip):
+            return True
+        METRICS.inc(RATE_LIMITED)
+        self._send_json(
+            429,
+            {"request_id": request_id, "error": "rate limit exceeded", "code": "rate_limited"},
+        )
+        return False
 
     def do_GET(self) -> None:
         request_id = self._request_id()
@@ -89,23 +179,51 @@ class Handler(SimpleHTTPRequestHandler):
         if path == "/healthz":
             self._send_json(200, {"status": "ok"})
             return
-        if path == "/api/levels":
-            self._send_json(200, {"request_id": request_id, "levels": LEVELS})
+        if path == "/metrics":
+            self._send_text(200, METRICS.render(), "text/plain; version=0.0.4; charset=utf-8")
             return
-        if path == "/api/use-cases":
-            self._send_json(200, {"request_id": request_id, "use_cases": USE_CASE_OPTIONS})
+        if path in STATIC_API:
+            self._send_prepared(STATIC_API[path], request_id)
             return
-        if path == "/api/agentic-maturity":
-            self._send_json(200, {"request_id": request_id, "stages": AGENTIC_MATURITY_STAGES})
+        if path == "/api/run/stats":
+            self._send_json(
+                200,
+                {
+                    "request_id": request_id,
+                    "agent_decisions": decision_parse_snapshot(),
+                    "coalescing": RUN_FLIGHTS.snapshot(),
+                    "rate_limiter": RATE_LIMITER.snapshot(),
+                    "response_cache": RESPONSE_CACHE.snapshot(),
+                    "upstream_pool": (
+                        shared_async_pool() if self.on_event_loop else UPSTREAM_POOL
+                    ).snapshot(),
+                    "upstream_resilience": resilience_snapshot(),
+                    "worker_pool": shared_worker_pool().snapshot(),
+                },
+            )
             return
-        if path == "/api/assessment":
-            self._send_json(200, {"request_id": request_id, "questions": ASSESSMENT_QUESTIONS})
+        if path == "/api/run/stream":
+            if not self._check_rate_limit(request_id):
+                return
+            query = parse_qs(urlparse(self.path).query)
+            self.run_coroutine(
+                self._stream_level(
+                    query.get("level", [""])[0],
+                    request_id,
+                    path,
+                    start,
+                    query.get("use_case", ["uk_year10_teacher"])[0],
+                    query.get("use_case_context", [""])[0],
+                )
+            )
             return
         if path.startswith("/api/run/"):
-            return self._execute_level(path.split("/")[-1], request_id, path, start)
-        if path.startswith("/assets/"):
-            self.path = path
-            return SimpleHTTPRequestHandler.do_GET(self)
+            self.run_coroutine(self._execute_level(path.split("/")[-1], request_id, path, start))
+            return
+        asset = STATIC_ASSETS.get(path)
+        if asset is not None:
+            self._send_prepared(asset, request_id, ASSET_CACHE_CONTROL)
+            return
         return super().do_GET()
 
     def _parse_run_request(self, request_id: str) -> RunRequest | None:
@@ -161,7 +279,7 @@ class Handler(SimpleHTTPRequestHandler):
         request_id = self._request_id()
         path = urlparse(self.path).path
         start = time.perf_counter()
-        if path != "/api/run":
+        if path not in {"/api/run", "/api/run/stream"}:
             self._send_json(
                 404, {"request_id": request_id, "error": "not found", "code": "not_found"}
             )
@@ -171,108 +289,34 @@ class Handler(SimpleHTTPRequestHandler):
         parsed = self._parse_run_request(request_id)
         if parsed is None:
             return
-        self._execute_level(
-            str(parsed.level), request_id, path, start, parsed.use_case, parsed.use_case_context
+        if path == "/api/run/stream":
+            self.run_coroutine(
+                self._stream_level(
+                    str(parsed.level),
+                    request_id,
+                    path,
+                    start,
+                    parsed.use_case,
+                    parsed.use_case_context,
+                )
+            )
+            return
+        self.run_coroutine(
+            self._execute_level(
+                str(parsed.level), request_id, path, start, parsed.use_case, parsed.use_case_context
+            )
         )
 
-    def _execute_level(
-        self,
-        level_text: str,
-        request_id: str,
-        path: str,
-        start: float,
-        use_case_key: str = "uk_year10_teacher",
-        use_case_context: str = "",
-    ) -> None:
-        status = 200
+    def _validate_run(
+        self, request_id: str, level_text: str, use_case_key: str, use_case_context: str
+    ) -> RunRequest | None:
         try:
             level = int(level_text)
             if level not in LEVELS:
                 raise ValueError("out of range")
-            use_case_key = (use_case_key or "").strip()
-            use_case_context = (use_case_context or "").strip()
-            if use_case_key == "custom":
-                if not use_case_context:
-                    self._validation_error(
-                        request_id,
-                        "use_case_context is required when use_case is custom",
-                        "invalid_field",
-                        "use_case_context",
-                    )
-                    return
-                if len(use_case_context) > MAX_CUSTOM_CONTEXT_CHARS:
-                    self._validation_error(
-                        request_id,
-                        f"use_case_context must be {MAX_CUSTOM_CONTEXT_CHARS} characters or fewer",
-                        "invalid_field",
-                        "use_case_context",
-                    )
-                    return
-            elif use_case_key not in USE_CASE_OPTIONS:
-                self._validation_error(
-                    request_id,
-                    "use_case must be a known preset or custom",
-                    "invalid_field",
-                    "use_case",
-                )
-                return
-            real_client = AIClient()
-            run_client = CapturedAIClient(real_client)
-            payload = run_level(
-                level, run_client, use_case_key=use_case_key, use_case_context=use_case_context
-            )
-            if run_client.has_errors:
-                first = run_client.errors[0]
-                payload["runtime_error"] = {
-                    "message": first.message,
-                    "code": first.code,
-                    "status": first.status,
-                    "count": len(run_client.errors),
-                }
-                payload["runtime_errors"] = [
-                    {"message": e.message, "code": e.code, "status": e.status}
-                    for e in run_client.errors
-                ]
-                payload.setdefault("lines", []).extend(
-                    [
-                        "Runtime warning: one or more AI calls failed safely.",
-                        f"Reason: {first.message}",
-                        f"Code: {first.code}",
-                        "No external action was taken.",
-                    ]
-                )
-                payload.setdefault("theatre_steps", []).append(
-                    {
-                        "label": "AI call failed safely",
-                        "actor": "system",
-                        "status": "failed",
-                        "summary": first.message,
-                        "detail": (
-                            "The run continued with a safe placeholder so the workshop "
-                            "output could still render."
-                        ),
-                    }
-                )
-                payload["replay_steps"] = payload.get("replay_steps", []) + [
-                    f"AI call failed safely: {first.message}"
-                ]
-                approval = payload.setdefault("approval_summary", {})
-                approval["approved"] = False
-                approval["final_status"] = "needs_human_review"
-                approval["merge_decision"] = "not_run"
-                approval["verifier_result"] = approval.get("verifier_result") or first.message
-            payload["backend"] = {
-                "provider": "OpenAI",
-                "configured": real_client.available(),
-                "model": real_client.model,
-                "base_url": real_client.base_url,
-            }
-            payload["request_id"] = request_id
-            self._send_json(status, payload)
         except ValueError:
-            status = 400
             self._send_json(
-                status,
+                400,
                 {
                     "request_id": request_id,
                     "error": "invalid level",
@@ -280,6 +324,180 @@ class Handler(SimpleHTTPRequestHandler):
                     "field": "level",
                 },
             )
+            return None
+        use_case_key = (use_case_key or "").strip()
+        use_case_context = (use_case_context or "").strip()
+        if use_case_key == "custom":
+            if not use_case_context:
+                self._validation_error(
+                    request_id,
+                    "use_case_context is required when use_case is custom",
+                    "invalid_field",
+                    "use_case_context",
+                )
+                return None
+            if len(use_case_context) > MAX_CUSTOM_CONTEXT_CHARS:
+                self._validation_error(
+                    request_id,
+                    f"use_case_context must be {MAX_CUSTOM_CONTEXT_CHARS} characters or fewer",
+                    "invalid_field",
+                    "use_case_context",
+                )
+                return None
+        elif use_case_key not in USE_CASE_OPTIONS:
+            self._validation_error(
+                request_id,
+                "use_case must be a known preset or custom",
+                "invalid_field",
+                "use_case",
+            )
+            return None
+        return RunRequest(level=level, use_case=use_case_key, use_case_context=use_case_context)
+
+    async def _run_payload(
+        self,
+        run: RunRequest,
+        request_id: str,
+        deadline: Deadline | None,
+        on_event: EventSink | None = None,
+    ) -> dict[str, Any]:
+        key = (run.level, run.use_case, " ".join(run.use_case_context.split()))
+        if self.on_event_loop:
+            shared, coalesced = await RUN_FLIGHTS.run_async(
+                key, lambda emit: self._build_async_payload(run, deadline, emit), on_event=on_event
+            )
+        else:
+            shared, coalesced = RUN_FLIGHTS.run(
+                key, lambda emit: self._build_payload(run, deadline, emit), on_event=on_event
+            )
+        if coalesced:
+            logger.info(
+                "request_id=%s coalesced into in-flight level=%s run", request_id, run.level
+            )
+        payload = copy.deepcopy(shared)
+        payload["request_id"] = request_id
+        return payload
+
+    def _build_payload(
+        self, run: RunRequest, deadline: Deadline | None, on_event: EventSink | None
+    ) -> dict[str, Any]:
+        real_client = AIClient(pool=UPSTREAM_POOL)
+        run_client = CapturedAIClient(CachedAIClient(real_client, RESPONSE_CACHE))
+        payload = run_level(
+            run.level,
+            run_client,
+            use_case_key=run.use_case,
+            use_case_context=run.use_case_context,
+            on_event=on_event,
+            deadline=deadline,
+        )
+        return self._decorate_payload(payload, run_client, real_client)
+
+    async def _build_async_payload(
+        self, run: RunRequest, deadline: Deadline | None, on_event: EventSink | None
+    ) -> dict[str, Any]:
+        real_client = AsyncAIClient(pool=shared_async_pool())
+        run_client = CapturedAsyncAIClient(AsyncCachedAIClient(real_client, RESPONSE_CACHE))
+        payload = await async_run_level(
+            run.level,
+            run_client,
+            use_case_key=run.use_case,
+            use_case_context=run.use_case_context,
+            on_event=on_event,
+            deadline=deadline,
+        )
+        return self._decorate_payload(payload, run_client, real_client)
+
+    def _decorate_payload(
+        self,
+        payload: dict[str, Any],
+        run_client: CapturedAIClient | CapturedAsyncAIClient,
+        real_client: AIClient | AsyncAIClient,
+    ) -> dict[str, Any]:
+        payload["timings"] = run_client.timings_summary()
+        if run_client.has_errors:
+            first = run_client.errors[0]
+            payload["runtime_error"] = {
+                "message": first.message,
+                "code": first.code,
+                "status": first.status,
+                "count": len(run_client.errors),
+            }
+            payload["runtime_errors"] = [
+                {"message": e.message, "code": e.code, "status": e.status}
+                for e in run_client.errors
+            ]
+            payload.setdefault("lines", []).extend(
+                [
+                    "Runtime warning: one or more AI calls failed safely.",
+                    f"Reason: {first.message}",
+                    f"Code: {first.code}",
+                    "No external action was taken.",
+                ]
+            )
+            payload.setdefault("theatre_steps", []).append(
+                {
+                    "label": "AI call failed safely",
+                    "actor": "system",
+                    "status": "failed",
+                    "summary": first.message,
+                    "detail": (
+                        "The run continued with a safe placeholder so the workshop "
+                        "output could still render."
+                    ),
+                }
+            )
+            payload["replay_steps"] = payload.get("replay_steps", []) + [
+                f"AI call failed safely: {first.message}"
+            ]
+            approval = payload.setdefault("approval_summary", {})
+            approval["approved"] = False
+            approval["final_status"] = "needs_human_review"
+            approval["merge_decision"] = "not_run"
+            approval["verifier_result"] = approval.get("verifier_result") or first.message
+        payload["backend"] = {
+            "provider": "OpenAI",
+            "configured": real_client.available(),
+            "model": real_client.model,
+            "base_url": real_client.base_url,
+        }
+        return payload
+
+    def _log_run(
+        self, request_id: str, path: str, level_text: str, status: int, start: float
+    ) -> None:
+        elapsed = time.perf_counter() - start
+        logger.info(
+            "request_id=%s path=%s level=%s status=%s duration_ms=%.2f",
+            request_id,
+            path,
+            level_text,
+            status,
+            elapsed * 1000,
+        )
+        # Labels come from a closed set so a client cannot grow the series without bound.
+        level = level_text if level_text.isdigit() and int(level_text) in LEVELS else "invalid"
+        mode = "stream" if path.endswith("/stream") else "run"
+        METRICS.inc(RUN_REQUESTS, labels(level=level, mode=mode, status=status))
+        METRICS.observe(RUN_SECONDS, elapsed, labels(level=level, status=status))
+
+    async def _execute_level(
+        self,
+        level_text: str,
+        request_id: str,
+        path: str,
+        start: float,
+        use_case_key: str = "uk_year10_teacher",
+        use_case_context: str = "",
+    ) -> None:
+        run = self._validate_run(request_id, level_text, use_case_key, use_case_context)
+        if run is None:
+            self._log_run(request_id, path, level_text, 400, start)
+            return
+        status = 200
+        try:
+            payload = await self._run_payload(run, request_id, Deadline.from_env())
+            self._send_json(status, payload)
         except AIClientError as err:
             status = err.status
             self._send_json(
@@ -292,18 +510,87 @@ class Handler(SimpleHTTPRequestHandler):
                 status,
                 {"request_id": request_id, "error": "internal error", "code": "internal_error"},
             )
-        logger.info(
-            "request_id=%s path=%s level=%s status=%s duration_ms=%.2f",
-            request_id,
-            path,
-            level_text,
-            status,
-            (time.perf_counter() - start) * 1000,
+        self._log_run(request_id, path, level_text, status, start)
+
+    async def _stream_level(
+        self,
+        level_text: str,
+        request_id: str,
+        path: str,
+        start: float,
+        use_case_key: str = "uk_year10_teacher",
+        use_case_context: str = "",
+    ) -> None:
+        run = self._validate_run(request_id, level_text, use_case_key, use_case_context)
+        if run is None:
+            self._log_run(request_id, path, level_text, 400, start)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Accel-Buffering", "no")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        write_lock = threading.Lock()
+        disconnected = False
+
+        def send_event(event: str, data: dict[str, Any]) -> None:
+            nonlocal disconnected
+            frame = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+            with write_lock:
+                if disconnected:
+                    return
+                try:
+                    self.wfile.write(frame)
+                    self.wfile.flush()
+                except OSError:
+                    disconnected = True
+
+        send_event(
+            "started",
+            {"request_id": request_id, "level": run.level, "title": LEVELS[run.level]["name"]},
         )
+        status = 200
+        try:
+            send_event(
+                "result",
+                await self._run_payload(run, request_id, Deadline.from_env(), on_event=send_event),
+            )
+        except AIClientError as err:
+            status = err.status
+            send_event(
+                "error",
+                {
+                    "request_id": request_id,
+                    "error": err.message,
+                    "code": err.code,
+                    "status": status,
+                },
+            )
+        except Exception:
+            logger.exception("request_id=%s unhandled error while streaming level", request_id)
+            status = 500
+            send_event(
+                "error",
+                {
+                    "request_id": request_id,
+                    "error": "internal error",
+                    "code": "internal_error",
+                    "status": status,
+                },
+            )
+        send_event("done", {"request_id": request_id, "status": status})
+        self._log_run(request_id, path, level_text, status, start)
 
 
 if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     print(f"Serving demo at http://{host}:{port}")
-    ThreadingHTTPServer((host, port), Handler).serve_forever()
+    # SERVER_MODE=asyncio serves every connection and run from one event loop; the default
+    # stays thread-per-connection.
+    if os.getenv("SERVER_MODE", "threading").strip().lower() == "asyncio":
+        AsyncHTTPServer.from_env(Handler, host, port, max_body_bytes=MAX_BODY_BYTES).run()
+    else:
+        ThreadingHTTPServer((host, port), Handler).serve_forever()
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import UTC, datetime
 from html import escape
+from io import BytesIO
+from itertools import repeat
+import os
 from pathlib import Path
 import re
 import tarfile
 from tempfile import TemporaryDirectory
-from typing import Iterable
+from typing import BinaryIO
+
+from .matcher import LineMatcher
 
 DATE_TOKEN_PATTERN = re.compile(r"(20\d{2}[-/]\d{2}[-/]\d{2})")
 SEVERITY_PATTERN = re.compile(r"\b(INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\b", re.IGNORECASE)
@@ -16,6 +23,16 @@ NAMESPACE_PATTERN = re.compile(r'\b(?:namespace|ns)[=/:\"]+([a-z0-9][a-z0-9-]*)'
 NODE_PATTERN = re.compile(r'\b(?:node|host|machine)[=/:\"]+([a-z0-9][a-z0-9.-]*)', re.IGNORECASE)
 POD_PATTERN = re.compile(r'\bpod[=/:\"]+([a-z0-9][a-z0-9-]*)', re.IGNORECASE)
 
+READ_BUFFER_BYTES = 1024 * 1024
+# Line breaks other than \n and \r\n that str.splitlines() honours, as they appear in UTF-8.
+EXTRA_LINE_BREAKS = (
+    b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e", b"\xc2\x85", b"\xe2\x80\xa8", b"\xe2\x80\xa9"
+)
+SHARDS_PER_JOB = 8
+BINARY_SUFFIXES = frozenset({".png", ".jpg", ".jpeg", ".gif", ".pdf", ".bin", ".gz", ".xz", ".bz2"})
+# Log timestamps and file mtimes may be in different time zones, so allow a day of slack.
+STALE_MARGIN_SECONDS = 24 * 60 * 60
+
 ROOT_CAUSE_RULES: dict[str, tuple[re.Pattern[str], str]] = {
     "api_availability": (
         re.compile(r"\b(apiserver|api server|oauth|authentication)\b.*\b(timeout|unavailable|503|connection reset|refused)\b", re.IGNORECASE),
@@ -40,6 +57,45 @@ ROOT_CAUSE_RULES: dict[str, tuple[re.Pattern[str], str]] = {
 }
 
 
+# Lowercase literals that every match of the pattern must contain; the matcher skips a
+# pattern outright when none of its keywords occur in the line.
+ENTITY_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "namespace": ("namespace", "ns"),
+    "node": ("node", "host", "machine"),
+    "pod": ("pod",),
+}
+RULE_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "api_availability": ("apiserver", "api server", "oauth", "authentication"),
+    "etcd_health": ("etcd",),
+    "node_resource_pressure": (
+        "node not ready",
+        "disk pressure",
+        "memory pressure",
+        "oomkilled",
+        "evicted",
+        "filesystem full",
+    ),
+    "operator_degradation": ("operator",),
+    "network_instability": (
+        "i/o timeout",
+        "tls handshake timeout",
+        "connection reset",
+        "no route to host",
+        "context deadline exceeded",
+    ),
+}
+
+LINE_MATCHER = LineMatcher(
+    SEVERITY_PATTERN,
+    {
+        "namespace": (NAMESPACE_PATTERN, ENTITY_KEYWORDS["namespace"]),
+        "node": (NODE_PATTERN, ENTITY_KEYWORDS["node"]),
+        "pod": (POD_PATTERN, ENTITY_KEYWORDS["pod"]),
+    },
+    {key: (pattern, RULE_KEYWORDS[key]) for key, (pattern, _rationale) in ROOT_CAUSE_RULES.items()},
+)
+
+
 @dataclass(frozen=True)
 class Evidence:
     source: str
@@ -79,6 +135,7 @@ class LogSummary:
     unhealthy_operator_signals: list[str] = field(default_factory=list)
     problematic_nodes: list[tuple[str, int]] = field(default_factory=list)
     infrastructure_hotspots: list[tuple[str, int]] = field(default_factory=list)
+    total_files_skipped: int = 0
 
 
 def _normalize_incident_date(value: str) -> str:
@@ -97,7 +154,7 @@ def _normalize_level(level: str) -> str:
 
 def _iter_text_files(root: Path) -> Iterable[Path]:
     for path in root.rglob("*"):
-        if path.is_file() and path.suffix.lower() not in {".png", ".jpg", ".jpeg", ".gif", ".pdf", ".bin", ".gz", ".xz", ".bz2"}:
+        if path.is_file() and path.suffix.lower() not in BINARY_SUFFIXES:
             yield path
 
 
@@ -114,61 +171,278 @@ def _prepare_input(source: Path) -> tuple[Path, TemporaryDirectory | None]:
     raise ValueError(f"Invalid must-gather input: {source}. Provide a directory, single text file, or a tar/tgz archive.")
 
 
-def analyze_log_file(file_path: str | Path, *, incident_date: str, top_n: int = 5) -> LogSummary:
-    source = Path(file_path).expanduser().resolve()
-    if not source.exists():
-        raise ValueError(f"Invalid must-gather input: {source}")
+# Keeps the first ``limit`` evidence lines in scan order and only counts the rest.
+class _BoundedEvidence:
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.items: list[Evidence] = []
+        self.seen = 0
+
+    def add(self, evidence: Evidence) -> None:
+        self.seen += 1
+        if len(self.items) < self.limit:
+            self.items.append(evidence)
+
+    def merge(self, other: _BoundedEvidence) -> None:
+        self.seen += other.seen
+        self.items.extend(other.items[: self.limit - len(self.items)])
+
+
+@dataclass
+class _ScanState:
+    top_n: int
+    level_counts: Counter[str] = field(default_factory=Counter)
+    namespace_counts: Counter[str] = field(default_factory=Counter)
+    node_counts: Counter[str] = field(default_factory=Counter)
+    pod_counts: Counter[str] = field(default_factory=Counter)
+    rule_hits: Counter[str] = field(default_factory=Counter)
+    rule_evidence: dict[str, list[Evidence]] = field(default_factory=lambda: defaultdict(list))
+    timeline: _BoundedEvidence = field(init=False)
+    notable_errors: _BoundedEvidence = field(init=False)
+    files_scanned: int = 0
+    files_skipped: int = 0
+
+    def __post_init__(self) -> None:
+        self.timeline = _BoundedEvidence(max(self.top_n * 3, 10))
+        self.notable_errors = _BoundedEvidence(self.top_n)
+
+    # Partials must be merged in file order: Counter.update keeps first-seen key order and
+    # the bounded lists keep the earliest evidence, so ties and samples match a serial scan.
+    def merge(self, other: _ScanState) -> None:
+        self.level_counts.update(other.level_counts)
+        self.namespace_counts.update(other.namespace_counts)
+        self.node_counts.update(other.node_counts)
+        self.pod_counts.update(other.pod_counts)
+        self.rule_hits.update(other.rule_hits)
+        for key, evidence in other.rule_evidence.items():
+            kept = self.rule_evidence[key]
+            kept.extend(evidence[: self.top_n - len(kept)])
+        self.timeline.merge(other.timeline)
+        self.notable_errors.merge(other.notable_errors)
+        self.files_scanned += other.files_scanned
+        self.files_skipped += other.files_skipped
+
+
+def _date_bytes_pattern(normalized_date: str) -> re.Pattern[bytes]:
+    # DATE_TOKEN_PATTERN accepts either separator in either position, so the raw-byte
+    # prefilter does too; a line without these bytes can never match the incident date.
+    year, month, day = (part.encode() for part in normalized_date.split("-"))
+    return re.compile(re.escape(year) + rb"[-/]" + re.escape(month) + rb"[-/]" + re.escape(day))
+
+
+def _iter_blocks(handle: BinaryIO) -> Iterator[bytes]:
+    tail = b""
+    while block := handle.read(READ_BUFFER_BYTES):
+        data = tail + block
+        cut = data.rfind(b"\n") + 1
+        if cut:
+            yield data[:cut]
+        tail = data[cut:]
+    if tail:
+        yield tail
+
+
+def _plain_line_breaks(data: bytes) -> bool:
+    # Substring checks run at memchr speed; a character-class regex over a whole block does not.
+    if data.count(b"\r") != data.count(b"\r\n"):
+        return False
+    return not any(brk in data for brk in EXTRA_LINE_BREAKS)
+
+
+def _iter_dated_lines(handle: BinaryIO, date_bytes: re.Pattern[bytes]) -> Iterator[tuple[int, str]]:
+    # Yields only lines containing the incident date bytes, numbered exactly as splitlines()
+    # on the whole decoded file would number them. Blocks whose only line breaks are \n or
+    # \r\n are searched and counted as raw bytes; anything else is decoded line by line.
+    line_number = 0
+    for data in _iter_blocks(handle):
+        if not _plain_line_breaks(data):
+            for raw in BytesIO(data):
+                has_date = date_bytes.search(raw) is not None
+                for line in raw.decode("utf-8", errors="replace").splitlines():
+                    line_number += 1
+                    if has_date:
+                        yield line_number, line
+            continue
+        counted = 0
+        line_end = 0
+        for match in date_bytes.finditer(data):
+            if match.start() < line_end:
+                continue
+            line_start = data.rfind(b"\n", 0, match.start()) + 1
+            line_end = data.find(b"\n", match.end())
+            if line_end == -1:
+                line_end = len(data)
+            line_number += data.count(b"\n", counted, line_start)
+            counted = line_start
+            line = data[line_start:line_end].decode("utf-8", errors="replace")
+            yield line_number + 1, line.splitlines()[0]
+        line_number += data.count(b"\n", counted)
+
+
+def _scan_stream(handle: BinaryIO, source: str, normalized_date: str, state: _ScanState) -> None:
+    for line_number, line in _iter_dated_lines(handle, _date_bytes_pattern(normalized_date)):
+        date_match = DATE_TOKEN_PATTERN.search(line)
+        if not date_match:
+            continue
+        if date_match.group(1).replace("/", "-") != normalized_date:
+            continue
 
-    normalized_date = _normalize_incident_date(incident_date)
-    root, temp_dir = _prepare_input(source)
-
-    level_counts: Counter[str] = Counter()
-    namespace_counts: Counter[str] = Counter()
-    node_counts: Counter[str] = Counter()
-    pod_counts: Counter[str] = Counter()
-    rule_hits: Counter[str] = Counter()
-    rule_evidence: dict[str, list[Evidence]] = defaultdict(list)
-    timeline: list[Evidence] = []
-
-    files_scanned = 0
-    candidate_files = [source] if source.is_file() and not tarfile.is_tarfile(source) else list(_iter_text_files(root))
-    for text_file in candidate_files:
-        files_scanned += 1
+        matched = LINE_MATCHER.match(line)
+        severity = _normalize_level(matched.severity) if matched.severity else "INFO"
+        evidence = Evidence(
+            source=source,
+            line_number=line_number,
+            severity=severity,
+            line=line.strip(),
+        )
+        state.timeline.add(evidence)
+        if severity in {"ERROR", "FATAL", "CRITICAL"}:
+            state.notable_errors.add(evidence)
+        state.level_counts[severity] += 1
+
+        if matched.namespace:
+            state.namespace_counts[matched.namespace] += 1
+        if matched.node:
+            state.node_counts[matched.node] += 1
+        if matched.pod:
+            state.pod_counts[matched.pod] += 1
+
+        for key in matched.rules:
+            state.rule_hits[key] += 1
+            if len(state.rule_evidence[key]) < state.top_n:
+                state.rule_evidence[key].append(evidence)
+
+
+def _stale_before(normalized_date: str) -> float:
+    incident_start = datetime.strptime(normalized_date, "%Y-%m-%d").replace(tzinfo=UTC)
+    return incident_start.timestamp() - STALE_MARGIN_SECONDS
+
+
+def _scan_file(
+    text_file: Path,
+    root: Path,
+    normalized_date: str,
+    state: _ScanState,
+    stale_before: float | None = None,
+) -> None:
+    # A file last written before the incident day cannot hold log lines from that day.
+    if stale_before is not None:
         try:
-            lines = text_file.read_text(encoding="utf-8", errors="replace").splitlines()
+            if text_file.stat().st_mtime < stale_before:
+                state.files_skipped += 1
+                return
         except OSError:
-            continue
-
-        for line_number, line in enumerate(lines, start=1):
-            date_match = DATE_TOKEN_PATTERN.search(line)
-            if not date_match:
+            pass
+    state.files_scanned += 1
+    try:
+        with text_file.open("rb", buffering=READ_BUFFER_BYTES) as handle:
+            _scan_stream(handle, str(text_file.relative_to(root)), normalized_date, state)
+    except OSError:
+        return
+
+
+def _scan_archive(
+    source: Path, normalized_date: str, state: _ScanState, stale_before: float | None = None
+) -> None:
+    # Members are read once in archive order and never written to disk. Path() normalises
+    # names such as "./ns/pod.log" the way extractall() plus relative_to() would print them.
+    with tarfile.open(source, mode="r|*") as archive:
+        for member in archive:
+            name = Path(member.name)
+            if not member.isfile() or name.is_absolute() or ".." in name.parts:
+                continue
+            if name.suffix.lower() in BINARY_SUFFIXES:
                 continue
-            if date_match.group(1).replace("/", "-") != normalized_date:
+            if stale_before is not None and member.mtime < stale_before:
+                state.files_skipped += 1
                 continue
+            handle = archive.extractfile(member)
+            if handle is None:
+                continue
+            state.files_scanned += 1
+            with handle:
+                _scan_stream(handle, str(name), normalized_date, state)
+
+
+def _scan_shard(
+    files: list[Path], root: Path, normalized_date: str, top_n: int, stale_before: float | None
+) -> _ScanState:
+    state = _ScanState(top_n)
+    for text_file in files:
+        _scan_file(text_file, root, normalized_date, state, stale_before)
+    return state
+
+
+def _scan_parallel(
+    files: list[Path],
+    root: Path,
+    normalized_date: str,
+    top_n: int,
+    jobs: int,
+    stale_before: float | None,
+) -> _ScanState:
+    # Several contiguous shards per worker keep cores busy when file sizes are uneven, and
+    # map() yields partials in shard order so the merge stays deterministic.
+    shard_size = max(1, -(-len(files) // (jobs * SHARDS_PER_JOB)))
+    shards = [files[i : i + shard_size] for i in range(0, len(files), shard_size)]
+    state = _ScanState(top_n)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        partials = pool.map(
+            _scan_shard,
+            shards,
+            repeat(root),
+            repeat(normalized_date),
+            repeat(top_n),
+            repeat(stale_before),
+        )
+        for partial in partials:
+            state.merge(partial)
+    return state
+
+
+def analyze_log_file(
+    file_path: str | Path,
+    *,
+    incident_date: str,
+    top_n: int = 5,
+    jobs: int = 1,
+    skip_stale_files: bool = False,
+    stream_archive: bool = False,
+) -> LogSummary:
+    source = Path(file_path).expanduser().resolve()
+    if not source.exists():
+        raise ValueError(f"Invalid must-gather input: {source}")
 
-            severity_match = SEVERITY_PATTERN.search(line)
-            severity = _normalize_level(severity_match.group(1)) if severity_match else "INFO"
-            evidence = Evidence(
-                source=str(text_file.relative_to(root)),
-                line_number=line_number,
-                severity=severity,
-                line=line.strip(),
+    normalized_date = _normalize_incident_date(incident_date)
+    jobs = jobs if jobs > 0 else os.cpu_count() or 1
+    stale_before = _stale_before(normalized_date) if skip_stale_files else None
+
+    temp_dir: TemporaryDirectory | None = None
+    if stream_archive and source.is_file() and tarfile.is_tarfile(source):
+        # A single archive stream cannot be shared between workers, so this path ignores jobs.
+        # Members arrive in archive order, not the directory-walk order of an extracted copy,
+        # and the stream cannot be reordered without buffering it. Totals and counts match
+        # extraction, but the capped samples (timeline, notable errors, per-rule evidence and
+        # the signal lists built from it) and the order of equal counts may differ.
+        state = _ScanState(top_n)
+        _scan_archive(source, normalized_date, state, stale_before)
+    else:
+        root, temp_dir = _prepare_input(source)
+        single_file = source.is_file() and not tarfile.is_tarfile(source)
+        candidate_files = [source] if single_file else _iter_text_files(root)
+        if jobs > 1:
+            state = _scan_parallel(
+                list(candidate_files), root, normalized_date, top_n, jobs, stale_before
             )
-            timeline.append(evidence)
-            level_counts[severity] += 1
-
-            if namespace_match := NAMESPACE_PATTERN.search(line):
-                namespace_counts[namespace_match.group(1)] += 1
-            if node_match := NODE_PATTERN.search(line):
-                node_counts[node_match.group(1)] += 1
-            if pod_match := POD_PATTERN.search(line):
-                pod_counts[pod_match.group(1)] += 1
-
-            for key, (pattern, _rationale) in ROOT_CAUSE_RULES.items():
-                if pattern.search(line):
-                    rule_hits[key] += 1
-                    if len(rule_evidence[key]) < top_n:
-                        rule_evidence[key].append(evidence)
+        else:
+            state = _ScanState(top_n)
+            for text_file in candidate_files:
+                _scan_file(text_file, root, normalized_date, state, stale_before)
+
+    rule_hits = state.rule_hits
+    rule_evidence = state.rule_evidence
+    namespace_counts = state.namespace_counts
+    node_counts = state.node_counts
 
     ranked_causes = [
         RootCauseCandidate(
@@ -188,16 +462,17 @@ def analyze_log_file(file_path: str | Path, *, incident_date: str, top_n: int =
         source_path=source,
         incident_date=normalized_date,
         extracted_dir=temp_path,
-        total_files_scanned=files_scanned,
-        matched_lines=len(timeline),
-        levels=dict(sorted(level_counts.items())),
+        total_files_scanned=state.files_scanned,
+        total_files_skipped=state.files_skipped,
+        matched_lines=state.timeline.seen,
+        levels=dict(sorted(state.level_counts.items())),
         top_namespaces=namespace_counts.most_common(top_n),
         top_nodes=node_counts.most_common(top_n),
-        top_pods=pod_counts.most_common(top_n),
+        top_pods=state.pod_counts.most_common(top_n),
         root_cause_candidates=ranked_causes,
-        timeline=timeline[: max(top_n * 3, 10)],
+        timeline=state.timeline.items,
         recommendations=recommendations,
-        notable_errors=[e.line for e in timeline if e.severity in {"ERROR", "FATAL", "CRITICAL"}][:top_n],
+        notable_errors=[e.line for e in state.notable_errors.items],
         api_failure_signals=[e.line for e in rule_evidence.get("api_availability", [])],
         watch_storm_signals=[e.line for e in rule_evidence.get("etcd_health", [])],
         problematic_namespaces=namespace_counts.most_common(top_n),
@@ -239,6 +514,11 @@ def render_human_readable_report(summary: LogSummary) -> str:
         f"- Source bundle: `{summary.source_path}`",
         f"- Incident date: `{summary.incident_date}`",
         f"- Files scanned: **{summary.total_files_scanned}**",
+        *(
+            [f"- Files skipped (last modified before the incident date): **{skipped}**"]
+            if (skipped := summary.total_files_skipped)
+            else []
+        ),
         f"- Matching dated lines: **{summary.matched_lines}**",
         "",
         "## Most Likely Root Causes",
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import argparse
+import random
+from collections.abc import Callable
+from time import perf_counter
+
+from .analyzer import LINE_MATCHER
+from .matcher import LineMatch
+
+SAMPLE_MESSAGES = (
+    "etcd leader changed during election term=42",
+    "kube-apiserver request timeout talking to oauth 503",
+    "clusteroperator/authentication Degraded: not progressing",
+    "node not ready: disk pressure on node=worker-3",
+    "tls handshake timeout dialing 10.0.0.12:6443",
+    "reconcile complete for object payments/api in controller deployment",
+    "Successfully pulled image quay.io/openshift/release@sha256:abc in 1.2s",
+    "GET /apis/apps/v1/namespaces/shop/deployments 200 OK latency=3ms",
+    "OOMKilled container in pod/api-7 namespace/payments",
+    "watch of *v1.ConfigMap ended with: very short watch",
+)
+
+
+def synthetic_lines(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    levels = ("INFO", "WARN", "ERROR", "I0501", "")
+    return [
+        f"2024-05-01T10:{i % 60:02d}:{i % 59:02d}Z {rng.choice(levels)} "
+        f"{rng.choice(SAMPLE_MESSAGES)} host=worker-{i % 5}"
+        for i in range(count)
+    ]
+
+
+def _lines_per_second(match: Callable[[str], LineMatch], lines: list[str], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = perf_counter()
+        for line in lines:
+            match(line)
+        best = min(best, perf_counter() - started)
+    return len(lines) / best
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m openshift_log_analyzer.benchmark",
+        description=(
+            "Compare per-line matching throughput of the keyword-gated matcher "
+            "against the original per-pattern scan."
+        ),
+    )
+    parser.add_argument("--lines", type=int, default=100_000, help="Synthetic dated lines to match")
+    parser.add_argument(
+        "--rounds", type=int, default=3, help="Timed rounds; the fastest is reported"
+    )
+    args = parser.parse_args(argv)
+
+    lines = synthetic_lines(args.lines)
+    if [LINE_MATCHER.match(line) for line in lines] != [
+        LINE_MATCHER.match_reference(line) for line in lines
+    ]:
+        raise SystemExit("Matcher results differ from the reference scan.")
+    before = _lines_per_second(LINE_MATCHER.match_reference, lines, args.rounds)
+    after = _lines_per_second(LINE_MATCHER.match, lines, args.rounds)
+    print(f"lines: {len(lines)}")
+    print(f"before (per-pattern scan): {before:,.0f} lines/s")
+    print(f"after (keyword-gated matcher): {after:,.0f} lines/s")
+    print(f"speed-up: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
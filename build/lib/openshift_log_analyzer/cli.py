@@ -14,6 +14,26 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("bundle", help="Path to a must-gather directory or tar/tgz archive")
     parser.add_argument("--incident-date", required=True, help="Incident date to analyze (YYYY-MM-DD)")
     parser.add_argument("--top", type=int, default=5, help="Top N namespaces, nodes, pods, and root-cause candidates to show")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes used to scan files in parallel (0 uses one per CPU core).",
+    )
+    parser.add_argument(
+        "--skip-stale-files",
+        action="store_true",
+        help="Skip files whose modification time is more than a day before the incident date.",
+    )
+    parser.add_argument(
+        "--stream-archive",
+        action="store_true",
+        help=(
+            "Scan tar/tgz members straight from the archive instead of extracting it to a "
+            "temporary directory first (always uses one process). Counts match extraction; "
+            "sampled evidence lines follow archive order and may differ."
+        ),
+    )
     parser.add_argument(
         "--html-output",
         type=Path,
@@ -24,7 +44,14 @@ def build_parser() -> argparse.ArgumentParser:
 
 def main() -> None:
     args = build_parser().parse_args()
-    summary = analyze_log_file(args.bundle, incident_date=args.incident_date, top_n=args.top)
+    summary = analyze_log_file(
+        args.bundle,
+        incident_date=args.incident_date,
+        top_n=args.top,
+        jobs=args.jobs,
+        skip_stale_files=args.skip_stale_files,
+        stream_archive=args.stream_archive,
+    )
     print(render_human_readable_report(summary))
 
     if args.html_output:
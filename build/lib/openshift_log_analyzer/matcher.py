@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+_UPPERCASE_ESCAPE = re.compile(r"\\[A-Z]")
+
+
+@dataclass(frozen=True)
+class LineMatch:
+    severity: str | None
+    namespace: str | None
+    node: str | None
+    pod: str | None
+    rules: tuple[str, ...]
+
+
+def _lowercase_pattern(pattern: re.Pattern[str]) -> re.Pattern[str]:
+    # Escapes such as \S or \W change meaning when lowercased, so refuse rather than guess.
+    if _UPPERCASE_ESCAPE.search(pattern.pattern):
+        raise ValueError(f"Cannot build a lowercase fast path for {pattern.pattern!r}")
+    return re.compile(pattern.pattern.lower(), pattern.flags & ~re.IGNORECASE)
+
+
+# ASCII lines are lowercased once, a keyword gate picks the few patterns that could match
+# using plain substring checks, and only those run as case-sensitive regexes. Lines with
+# non-ASCII text fall back to the original case-insensitive patterns, whose Unicode case
+# folding a plain lower() cannot reproduce.
+class LineMatcher:
+    def __init__(
+        self,
+        severity: re.Pattern[str],
+        entities: dict[str, tuple[re.Pattern[str], tuple[str, ...]]],
+        rules: dict[str, tuple[re.Pattern[str], tuple[str, ...]]],
+    ) -> None:
+        self.severity = severity
+        self.entities = {name: pattern for name, (pattern, _keywords) in entities.items()}
+        self.rules = {key: pattern for key, (pattern, _keywords) in rules.items()}
+        self._severity_fast = _lowercase_pattern(severity)
+        self._entity_gates = [
+            (name, keywords, _lowercase_pattern(pattern))
+            for name, (pattern, keywords) in entities.items()
+        ]
+        self._rule_gates = [
+            (key, keywords, _lowercase_pattern(pattern))
+            for key, (pattern, keywords) in rules.items()
+        ]
+
+    def match(self, line: str) -> LineMatch:
+        if not line.isascii():
+            return self.match_reference(line)
+        lowered = line.lower()
+        severity_match = self._severity_fast.search(lowered)
+        # Plain loops with break, not any(...), because the gate runs for every dated line.
+        entities: dict[str, str | None] = {}
+        for name, keywords, pattern in self._entity_gates:
+            entities[name] = None
+            for keyword in keywords:
+                if keyword in lowered:
+                    if found := pattern.search(lowered):
+                        # Spans are identical in the lowered copy, so values keep the original case.
+                        entities[name] = line[found.start(1) : found.end(1)]
+                    break
+        rules: list[str] = []
+        for key, keywords, pattern in self._rule_gates:
+            for keyword in keywords:
+                if keyword in lowered:
+                    if pattern.search(lowered):
+                        rules.append(key)
+                    break
+        severity = line[severity_match.start(1) : severity_match.end(1)] if severity_match else None
+        return LineMatch(
+            severity=severity,
+            namespace=entities.get("namespace"),
+            node=entities.get("node"),
+            pod=entities.get("pod"),
+            rules=tuple(rules),
+        )
+
+    def match_reference(self, line: str) -> LineMatch:
+        severity_match = self.severity.search(line)
+        entities = {name: pattern.search(line) for name, pattern in self.entities.items()}
+        return LineMatch(
+            severity=severity_match.group(1) if severity_match else None,
+            namespace=entities["namespace"].group(1) if entities.get("namespace") else None,
+            node=entities["node"].group(1) if entities.get("node") else None,
+            pod=entities["pod"].group(1) if entities.get("pod") else None,
+            rules=tuple(key for key, pattern in self.rules.items() if pattern.search(line)),
+        )
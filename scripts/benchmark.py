@@ -0,0 +1,360 @@
+"""Load-test /api/run across levels against a fake OpenAI-compatible upstream."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+DECISION_REPLY = '{"action":"finish","input":"","reason":"benchmark","final":"Benchmark answer."}'
+
+
+@dataclass
+class UpstreamProfile:
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0
+    error_rate: float = 0.0
+    seed: int | None = None
+
+
+def _reply_for(body: dict[str, Any]) -> str:
+    messages = body.get("messages") or [{}]
+    system = str(messages[0].get("content", "")).lower()
+    if body.get("response_format") or "agent controller" in system or "invalid json" in system:
+        return DECISION_REPLY
+    if "score" in system:
+        return "90"
+    if "verif" in system or "check" in system:
+        return "supported: strong pass, safe to use."
+    return "Benchmark reply."
+
+
+class FakeUpstream:
+    def __init__(self, profile: UpstreamProfile) -> None:
+        self.profile = profile
+        self.calls = 0
+        self.injected_errors = 0
+        self._random = random.Random(profile.seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}/v1"
+
+    def start(self) -> FakeUpstream:
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _plan_call(self) -> tuple[float, bool]:
+        with self._lock:
+            self.calls += 1
+            jitter = self._random.uniform(-self.profile.jitter_ms, self.profile.jitter_ms)
+            fail = self._random.random() < self.profile.error_rate
+            if fail:
+                self.injected_errors += 1
+        return max(self.profile.latency_ms + jitter, 0.0) / 1000, fail
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        upstream = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", "0"))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                delay, fail = upstream._plan_call()
+                time.sleep(delay)
+                if fail:
+                    error = {"error": {"message": "injected failure", "type": "server_error"}}
+                    self._send(503, json.dumps(error).encode(), "application/json")
+                    return
+                text = _reply_for(body)
+                usage = {
+                    "prompt_tokens": length // 4,
+                    "completion_tokens": max(1, len(text) // 4),
+                }
+                if body.get("stream"):
+                    chunks = [{"choices": [{"delta": {"content": text}}]}]
+                    if (body.get("stream_options") or {}).get("include_usage"):
+                        chunks.append({"choices": [], "usage": usage})
+                    sse = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks)
+                    self._send(200, f"{sse}data: [DONE]\n\n".encode(), "text/event-stream")
+                    return
+                reply = {
+                    "choices": [{"message": {"role": "assistant", "content": text}}],
+                    "usage": usage,
+                }
+                self._send(200, json.dumps(reply).encode(), "application/json")
+
+        return _Handler
+
+
+@dataclass
+class Sample:
+    level: int
+    status: int
+    seconds: float
+
+
+@dataclass
+class ThreadSampler:
+    interval: float = 0.05
+    peak: int = 0
+    _stop: threading.Event = field(default_factory=threading.Event)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            self._stop.wait(self.interval)
+
+    @contextmanager
+    def running(self) -> Iterator[ThreadSampler]:
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            self._stop.set()
+            thread.join()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered)) - 1
+    return ordered[max(0, min(len(ordered) - 1, rank))]
+
+
+def latency_summary(seconds: list[float]) -> dict[str, float]:
+    ms = [s * 1000 for s in seconds]
+    return {
+        "p50": round(percentile(ms, 50), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "p99": round(percentile(ms, 99), 2),
+        "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "max": round(max(ms), 2) if ms else 0.0,
+    }
+
+
+def _get_json(url: str) -> dict[str, Any]:
+    with urlopen(url, timeout=30) as response:
+        data: dict[str, Any] = json.loads(response.read())
+    return data
+
+
+def post_run(target: str, level: int, context: str) -> Sample:
+    body = json.dumps(
+        {"level": level, "use_case": "uk_year10_teacher", "use_case_context": context}
+    )
+    request = Request(
+        f"{target}/api/run",
+        data=body.encode(),
+        method="POST",
+        headers={"Content-Type": "application/json"},
+    )
+    started = time.perf_counter()
+    try:
+        with urlopen(request, timeout=120) as response:
+            response.read()
+            status = response.status
+    except HTTPError as err:
+        status = err.code
+    except (URLError, TimeoutError):
+        status = 0
+    return Sample(level, status, time.perf_counter() - started)
+
+
+@contextmanager
+def in_process_app(upstream: FakeUpstream) -> Iterator[str]:
+    overrides = {"OPENAI_API_KEY": "benchmark", "OPENAI_BASE_URL": upstream.base_url}
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    import app
+    from src.rate_limit import RateLimiter
+
+    class _QuietHandler(app.Handler):
+        def log_message(self, format: str, *args: Any) -> None:
+            return
+
+    # Every benchmark request comes from loopback, so the per-IP limiter is lifted for the
+    # duration of the run.
+    rate_limiter = app.RATE_LIMITER
+    app.RATE_LIMITER = RateLimiter(max_requests=sys.maxsize, sweep_seconds=0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _QuietHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        yield f"http://{host!s}:{port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        app.RATE_LIMITER = rate_limiter
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@contextmanager
+def external_app(target: str) -> Iterator[str]:
+    yield target
+
+
+def _calibrate(target: str, upstream: FakeUpstream | None, levels: list[int]) -> dict[int, int]:
+    # One sequential run per level, so upstream calls can be attributed to a level.
+    calls: dict[int, int] = {}
+    for level in levels:
+        before = upstream.calls if upstream else 0
+        post_run(target, level, f"calibration level {level}")
+        calls[level] = (upstream.calls - before) if upstream else 0
+    return calls
+
+
+def run_benchmark(
+    levels: list[int],
+    requests_per_level: int = 5,
+    concurrency: int = 8,
+    profile: UpstreamProfile | None = None,
+    target: str | None = None,
+    repeat_context: bool = False,
+) -> dict[str, Any]:
+    upstream = None if target else FakeUpstream(profile or UpstreamProfile()).start()
+    app_context = in_process_app(upstream) if upstream else external_app(str(target))
+    try:
+        with app_context as base:
+            calls_by_level = _calibrate(base, upstream, levels)
+            calls_before = upstream.calls if upstream else 0
+            jobs = [
+                (level, "benchmark" if repeat_context else f"benchmark run {n} level {level}")
+                for n in range(requests_per_level)
+                for level in levels
+            ]
+            with ThreadSampler().running() as sampler, ThreadPoolExecutor(concurrency) as pool:
+                started = time.perf_counter()
+                samples = list(pool.map(lambda job: post_run(base, *job), jobs))
+                duration = time.perf_counter() - started
+            stats = _get_json(f"{base}/api/run/stats")
+            upstream_calls = (upstream.calls - calls_before) if upstream else None
+    finally:
+        if upstream:
+            upstream.stop()
+
+    ok = [s for s in samples if s.status == 200]
+    return {
+        "config": {
+            "levels": levels,
+            "requests_per_level": requests_per_level,
+            "concurrency": concurrency,
+            "upstream": asdict(profile or UpstreamProfile()) if upstream else None,
+            "target": target or "in-process",
+            "repeat_context": repeat_context,
+        },
+        "requests": len(samples),
+        "ok": len(ok),
+        "status_counts": {str(k): v for k, v in sorted(Counter(s.status for s in samples).items())},
+        "duration_seconds": round(duration, 3),
+        "requests_per_second": round(len(samples) / duration, 2) if duration else 0.0,
+        "latency_ms": latency_summary([s.seconds for s in samples]),
+        "per_level": {
+            str(level): {
+                **latency_summary([s.seconds for s in samples if s.level == level]),
+                "upstream_calls_per_run": calls_by_level.get(level),
+            }
+            for level in levels
+        },
+        "upstream": {
+            "calls": upstream_calls,
+            "calls_per_run": round(upstream_calls / len(samples), 2)
+            if upstream_calls is not None and samples
+            else None,
+            "injected_errors": upstream.injected_errors if upstream else None,
+        },
+        "threads": {
+            "peak_active": sampler.peak if upstream else None,
+            "worker_pool_threads": stats.get("worker_pool", {}).get("threads"),
+        },
+        "server_stats": stats,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--levels", default="1-8", help="level list, e.g. 1-8 or 1,4,8")
+    parser.add_argument("--requests-per-level", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--target", help="benchmark a running app instead of an in-process one")
+    parser.add_argument(
+        "--repeat-context",
+        action="store_true",
+        help="send identical runs so the response cache and coalescing are exercised",
+    )
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        parse_levels(args.levels),
+        requests_per_level=args.requests_per_level,
+        concurrency=args.concurrency,
+        profile=UpstreamProfile(args.latency_ms, args.jitter_ms, args.error_rate, args.seed),
+        target=args.target.rstrip("/") if args.target else None,
+        repeat_context=args.repeat_context,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    print(text)
+    return 0 if report["ok"] == report["requests"] else 1
+
+
+def parse_levels(spec: str) -> list[int]:
+    levels: list[int] = []
+    for part in spec.split(","):
+        start, _, end = part.strip().partition("-")
+        levels.extend(range(int(start), int(end or start) + 1))
+    return levels
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
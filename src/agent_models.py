@@ -16,6 +16,7 @@ class AgentWorker:
     name: str
     role: str
     task: str
+    depends_on: tuple[str, ...] = ()
 
 
 @dataclass
@@ -90,6 +91,8 @@ class OrchestratorTaskRecord:
     started_at: str = ""
     completed_at: str = ""
     worker_status: WorkerStatus = WorkerStatus.WAITING
+    depends_on: list[str] = field(default_factory=list)
+    on_critical_path: bool = False
 
 
 @dataclass
@@ -104,3 +107,4 @@ class OrchestratorRunState:
     approved_for_merge: bool = False
     final_answer: str = ""
     audit_log: list[str] = field(default_factory=list)
+    critical_path: list[str] = field(default_factory=list)
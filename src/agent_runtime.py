@@ -1,13 +1,56 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
+from collections import Counter
 from collections.abc import Callable
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Any
 
-from src.types import AIChatClient
+from src.call_timings import call_site
+from src.chat_runtime import ChatRuntime, SyncChatRuntime, as_runtime, run_sync
+from src.deadline import Deadline, budget_spent
+from src.types import AIChatClient, AsyncAIChatClient
 
 ALLOWED_ACTIONS = {"research", "calculate", "draft", "finish"}
+CHARS_PER_TOKEN = 4
+DECISION_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string", "enum": sorted(ALLOWED_ACTIONS)},
+        "input": {"type": "string"},
+        "reason": {"type": "string"},
+        "final": {"type": "string"},
+    },
+    "required": ["action", "input", "reason", "final"],
+    "additionalProperties": False,
+}
+
+
+@dataclass
+class DecisionParseStats:
+    strict: int = 0
+    recovered: int = 0
+    correction_retries: int = 0
+    fallbacks: int = 0
+
+
+_stats = DecisionParseStats()
+_stats_lock = threading.Lock()
+
+
+def decision_parse_snapshot() -> dict[str, int]:
+    with _stats_lock:
+        stats = asdict(_stats)
+    # Every recovered reply is a correction round trip that did not have to happen.
+    stats["retries_saved"] = stats["recovered"]
+    return stats
+
+
+def _count(field: str) -> None:
+    with _stats_lock:
+        setattr(_stats, field, getattr(_stats, field) + 1)
 
 
 @dataclass
@@ -27,6 +70,96 @@ class AgentStep:
     observation: str
 
 
+@dataclass(frozen=True)
+class TraceBudget:
+    recent_steps: int = 3
+    observation_chars: int = 400
+    max_tokens: int = 1200
+
+    @classmethod
+    def from_env(cls) -> TraceBudget:
+        return cls(
+            recent_steps=max(1, int(os.getenv("AGENT_TRACE_RECENT_STEPS", "3"))),
+            observation_chars=int(os.getenv("AGENT_TRACE_OBSERVATION_CHARS", "400")),
+            max_tokens=int(os.getenv("AGENT_TRACE_MAX_TOKENS", "1200")),
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: max(limit - 3, 0)] + "..."
+
+
+def _step_line(step: AgentStep, observation_chars: int, with_reason: bool) -> str:
+    reason = f" reason={_clip(step.reason, 160)}" if with_reason else ""
+    return (
+        f"#{step.iteration} action={step.action}{reason} input={_clip(step.tool_input, 200)} "
+        f"observation={_clip(step.observation, observation_chars)}"
+    )
+
+
+def _summarise_steps(steps: list[AgentStep], limit_chars: int) -> str:
+    counts = Counter(step.action for step in steps)
+    head = (
+        f"Earlier steps #{steps[0].iteration}-#{steps[-1].iteration} summarised ("
+        + ", ".join(f"{action} x{n}" for action, n in counts.items())
+        + ")"
+    )
+    notes: list[str] = []
+    used = len(head)
+    for step in reversed(steps):
+        note = f"#{step.iteration} {step.action}: {_clip(step.observation, 80)}"
+        if used + len(note) + 2 > limit_chars:
+            break
+        notes.append(note)
+        used += len(note) + 2
+    return head + "".join(f"; {note}" for note in reversed(notes))
+
+
+# Older steps collapse into a bounded summary and only the newest few are sent verbatim,
+# so the controller prompt stays roughly the same size however long the loop runs.
+def compact_trace(
+    trace: list[AgentStep], budget: TraceBudget | None = None, with_reason: bool = True
+) -> str:
+    if not trace:
+        return "(empty)"
+    budget = budget or TraceBudget()
+    limit_chars = budget.max_tokens * CHARS_PER_TOKEN
+    keep = min(budget.recent_steps, len(trace))
+    while True:
+        older, recent = trace[: len(trace) - keep], trace[len(trace) - keep :]
+        lines = [_step_line(step, budget.observation_chars, with_reason) for step in recent]
+        if older:
+            lines.insert(0, _summarise_steps(older, limit_chars // 4))
+        text = "\n".join(lines)
+        if estimate_tokens(text) <= budget.max_tokens:
+            return text
+        if keep == 1:
+            # Still over budget with one verbatim step: shorten that step's observation rather
+            # than slicing the text, so the summary line and the step prefix stay whole.
+            step = recent[0]
+            overflow = len(text) - limit_chars
+            observation_chars = len(_clip(step.observation, budget.observation_chars))
+            lines[-1] = _step_line(step, max(observation_chars - overflow, 0), with_reason)
+            return "\n".join(lines)
+        keep -= 1
+
+
+def _controller_context(
+    objective: str, trace: list[AgentStep], last_observation: str, budget: TraceBudget | None
+) -> str:
+    budget = budget or TraceBudget()
+    return (
+        f"Objective: {objective}\n"
+        f"Last observation: {_clip(last_observation, budget.observation_chars) or 'none'}\n"
+        f"Current trace:\n" + compact_trace(trace, budget)
+    )
+
+
 def _safe_draft_decision() -> AgentDecision:
     return AgentDecision(
         action="draft",
@@ -36,14 +169,34 @@ def _safe_draft_decision() -> AgentDecision:
     )
 
 
-def _parse_decision(raw: str) -> AgentDecision | None:
+def extract_json_object(raw: str) -> tuple[dict[str, Any] | None, bool]:
+    text = raw.strip()
     try:
-        parsed = json.loads(raw)
+        parsed = json.loads(text)
     except json.JSONDecodeError:
-        return None
+        parsed = None
+    if isinstance(parsed, dict):
+        return parsed, False
+    # Models often wrap the object in prose or a ```json fence; decode from each "{"
+    # and keep the first complete object instead of asking the model again.
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            parsed, _end = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, dict):
+            return parsed, True
+        start = text.find("{", start + 1)
+    return None, False
 
-    if not isinstance(parsed, dict):
+
+def _parse_decision(raw: str) -> AgentDecision | None:
+    parsed, recovered = extract_json_object(raw)
+    if parsed is None:
         return None
+    _count("recovered" if recovered else "strict")
 
     action = str(parsed.get("action", "")).strip().lower()
     tool_input = str(parsed.get("input", ""))
@@ -54,15 +207,27 @@ def _parse_decision(raw: str) -> AgentDecision | None:
 
 
 def choose_next_action(
-    client: AIChatClient, objective: str, trace: list[AgentStep], last_observation: str
+    client: AIChatClient,
+    objective: str,
+    trace: list[AgentStep],
+    last_observation: str,
+    budget: TraceBudget | None = None,
 ) -> AgentDecision:
-    trace_lines = [
-        (
-            f"#{step.iteration} action={step.action} reason={step.reason} "
-            f"input={step.tool_input} observation={step.observation}"
+    return run_sync(
+        async_choose_next_action(
+            SyncChatRuntime(client), objective, trace, last_observation, budget
         )
-        for step in trace
-    ]
+    )
+
+
+async def async_choose_next_action(
+    client: AsyncAIChatClient | ChatRuntime,
+    objective: str,
+    trace: list[AgentStep],
+    last_observation: str,
+    budget: TraceBudget | None = None,
+) -> AgentDecision:
+    runtime = as_runtime(client)
     prompt = (
         "You are a constrained agent controller. Choose exactly one next action. "
         "Return strict JSON only with schema: "
@@ -71,15 +236,12 @@ def choose_next_action(
         '"final":"string only when action is finish"}. '
         "Do not include markdown or extra keys."
     )
-    context = (
-        f"Objective: {objective}\n"
-        f"Last observation: {last_observation or 'none'}\n"
-        f"Current trace:\n" + ("\n".join(trace_lines) if trace_lines else "(empty)")
-    )
+    context = _controller_context(objective, trace, last_observation, budget)
 
-    raw = client.chat(prompt, context)
+    raw = await runtime.chat_json(prompt, context, DECISION_SCHEMA)
     decision = _parse_decision(raw)
     if decision is None:
+        _count("correction_retries")
         correction_prompt = (
             "Your last response was invalid JSON. "
             "Return only valid JSON using this schema exactly: "
@@ -87,12 +249,15 @@ def choose_next_action(
             '"reason":"short human-readable reason",'
             '"final":"string only when action is finish"}.'
         )
-        raw_retry = client.chat(
-            correction_prompt, f"Objective: {objective}\nTrace:\n" + "\n".join(trace_lines)
+        raw_retry = await runtime.chat_json(
+            correction_prompt,
+            f"Objective: {objective}\nTrace:\n" + compact_trace(trace, budget),
+            DECISION_SCHEMA,
         )
         decision = _parse_decision(raw_retry)
 
     if decision is None:
+        _count("fallbacks")
         return _safe_draft_decision()
 
     return decision
@@ -104,12 +269,53 @@ def run_constrained_agent_loop(
     retrieve_fn: Callable[[str], str],
     calculate_fn: Callable[[str], str],
     max_iterations: int = 5,
+    deadline: Deadline | None = None,
+    trace_budget: TraceBudget | None = None,
 ) -> dict[str, Any]:
+    return run_sync(
+        async_run_constrained_agent_loop(
+            SyncChatRuntime(client, deadline=deadline),
+            objective,
+            retrieve_fn,
+            calculate_fn,
+            max_iterations=max_iterations,
+            trace_budget=trace_budget,
+        )
+    )
+
+
+async def async_run_constrained_agent_loop(
+    client: AsyncAIChatClient | ChatRuntime,
+    objective: str,
+    retrieve_fn: Callable[[str], str],
+    calculate_fn: Callable[[str], str],
+    max_iterations: int = 5,
+    deadline: Deadline | None = None,
+    trace_budget: TraceBudget | None = None,
+) -> dict[str, Any]:
+    runtime = as_runtime(client, deadline=deadline)
+    budget = trace_budget or TraceBudget.from_env()
     trace: list[AgentStep] = []
     last_observation = ""
+    context_tokens = 0
 
     for iteration in range(1, max_iterations + 1):
-        decision = choose_next_action(client, objective, trace, last_observation)
+        if budget_spent(runtime.deadline):
+            return {
+                "trace": trace,
+                "final_answer": last_observation
+                or "Time budget spent before an answer was drafted.",
+                "stopped_on_finish": False,
+                "context_tokens": context_tokens,
+            }
+        context_tokens = max(
+            context_tokens,
+            estimate_tokens(_controller_context(objective, trace, last_observation, budget)),
+        )
+        with call_site(action="choose_next_action"):
+            decision = await async_choose_next_action(
+                runtime, objective, trace, last_observation, budget
+            )
 
         if decision.action not in ALLOWED_ACTIONS:
             observation = (
@@ -141,7 +347,12 @@ def run_constrained_agent_loop(
                     observation=f"Final answer selected: {final_answer}",
                 )
             )
-            return {"trace": trace, "final_answer": final_answer, "stopped_on_finish": True}
+            return {
+                "trace": trace,
+                "final_answer": final_answer,
+                "stopped_on_finish": True,
+                "context_tokens": context_tokens,
+            }
 
         if decision.action == "research":
             observation = retrieve_fn(decision.input)
@@ -151,7 +362,10 @@ def run_constrained_agent_loop(
             except Exception as err:  # defensive tool execution
                 observation = f"tool error: {err}"
         else:
-            observation = client.chat("Draft a concise response for the objective.", decision.input)
+            with call_site(action="draft"):
+                observation = await runtime.chat(
+                    "Draft a concise response for the objective.", decision.input
+                )
 
         trace.append(
             AgentStep(
@@ -162,18 +376,26 @@ def run_constrained_agent_loop(
                 observation=observation,
             )
         )
+        runtime.emit(
+            "theatre_step",
+            {
+                "label": "Action selected",
+                "actor": "agent",
+                "status": "running",
+                "summary": f"Iteration {iteration}: {decision.action}",
+                "detail": f"Reason: {decision.reason} · Observation: {observation[:280]}",
+            },
+        )
         last_observation = observation
 
-    best_effort = client.chat(
-        "Max iterations reached. Produce a best-effort final answer from the observations.",
-        "\n".join(
-            [
-                (
-                    f"#{step.iteration} action={step.action} input={step.tool_input} "
-                    f"observation={step.observation}"
-                )
-                for step in trace
-            ]
-        ),
-    )
-    return {"trace": trace, "final_answer": best_effort, "stopped_on_finish": False}
+    with call_site(action="best_effort"):
+        best_effort = await runtime.chat(
+            "Max iterations reached. Produce a best-effort final answer from the observations.",
+            compact_trace(trace, budget, with_reason=False),
+        )
+    return {
+        "trace": trace,
+        "final_answer": best_effort,
+        "stopped_on_finish": False,
+        "context_tokens": context_tokens,
+    }
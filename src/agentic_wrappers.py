@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 from typing import Any
 from uuid import uuid4
 
-from src.types import AIChatClient
+from src.call_timings import call_site
+from src.chat_runtime import ChatRuntime, SyncChatRuntime, as_runtime, run_sync
+from src.deadline import Deadline, budget_spent
+from src.types import AIChatClient, AsyncAIChatClient
 
 ExecuteActionFn = Callable[[str, dict[str, Any]], tuple[str, str]]
+AsyncExecuteActionFn = Callable[[str, dict[str, Any]], Awaitable[tuple[str, str]]]
 
 
 def run_agentic_capability_demo(
@@ -20,7 +24,41 @@ def run_agentic_capability_demo(
     verifier_prompt: str,
     max_iterations: int = 2,
     require_human_approval: bool = True,
+    deadline: Deadline | None = None,
 ) -> dict[str, Any]:
+    async def _execute(action: str, state: dict[str, Any]) -> tuple[str, str]:
+        return execute_action_fn(action, state)
+
+    return run_sync(
+        async_run_agentic_capability_demo(
+            SyncChatRuntime(client, deadline=deadline),
+            level,
+            objective,
+            capability_name,
+            allowed_actions,
+            initial_action,
+            _execute,
+            verifier_prompt,
+            max_iterations=max_iterations,
+            require_human_approval=require_human_approval,
+        )
+    )
+
+
+async def async_run_agentic_capability_demo(
+    client: AsyncAIChatClient | ChatRuntime,
+    level: int,
+    objective: str,
+    capability_name: str,
+    allowed_actions: list[str],
+    initial_action: str,
+    execute_action_fn: AsyncExecuteActionFn,
+    verifier_prompt: str,
+    max_iterations: int = 2,
+    require_human_approval: bool = True,
+    deadline: Deadline | None = None,
+) -> dict[str, Any]:
+    runtime = as_runtime(client, deadline=deadline)
     run_id = f"lvl{level}-{uuid4().hex[:8]}"
     policy = {
         "allowed_actions": allowed_actions,
@@ -42,15 +80,29 @@ def run_agentic_capability_demo(
     stop_condition = "iteration budget reached"
 
     for iteration in range(1, max_iterations + 1):
+        if budget_spent(runtime.deadline):
+            stop_condition = "time budget spent"
+            break
         if current_action not in allowed_actions:
             current_action = "finish" if "finish" in allowed_actions else allowed_actions[-1]
 
         actions.append(current_action)
-        answer, observation = execute_action_fn(
-            current_action, {"iteration": iteration, "current": final_answer}
-        )
+        with call_site(action=current_action):
+            answer, observation = await execute_action_fn(
+                current_action, {"iteration": iteration, "current": final_answer}
+            )
         observations.append(observation)
         audit_log.append(f"iteration={iteration} action={current_action} observation={observation}")
+        runtime.emit(
+            "theatre_step",
+            {
+                "label": "Action selected",
+                "actor": "agent",
+                "status": "completed",
+                "summary": f"Iteration {iteration}: {current_action}",
+                "detail": observation[:280],
+            },
+        )
 
         if answer:
             final_answer = answer
@@ -89,11 +141,22 @@ def run_agentic_capability_demo(
         else:
             current_action = "finish"
 
-    verification_result = client.chat(
-        verifier_prompt, f"Objective:{objective}\nCandidate answer:{final_answer}"
-    )
+    with call_site(action="final_verification"):
+        verification_result = await runtime.chat(
+            verifier_prompt, f"Objective:{objective}\nCandidate answer:{final_answer}"
+        )
     approved_for_final = not require_human_approval or "deny" not in verification_result.lower()
     final_verdict = "approved" if approved_for_final else "needs_human_review"
+    runtime.emit(
+        "theatre_step",
+        {
+            "label": "Verification performed",
+            "actor": "verifier",
+            "status": "completed",
+            "summary": verification_result[:280],
+            "detail": f"Final verdict: {final_verdict}",
+        },
+    )
     audit_log.append(f"verification={verification_result}")
     audit_log.append(f"approval_required={require_human_approval}")
     audit_log.append(f"approved_for_final={approved_for_final}")
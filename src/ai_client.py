@@ -1,13 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import itertools
 import json
 import logging
 import os
+import time
+from collections.abc import Callable
 from dataclasses import dataclass
+from http.client import HTTPException
 from typing import Any
 from urllib.error import HTTPError, URLError
 from urllib.request import Request, urlopen
 
+from src.call_timings import record_upstream, record_usage
+from src.deadline import call_timeout, remaining_budget
+from src.http_pool import AsyncConnectionPool, ConnectionPool
+from src.metrics import METRICS, UPSTREAM_SECONDS, labels
+from src.resilience import (
+    RetryPolicy,
+    breaker_for,
+    is_retryable,
+    record_gave_up,
+    record_retry,
+    retry_after_seconds,
+    trips_breaker,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,18 +35,106 @@ class AIClientError(Exception):
     message: str
     code: str
     status: int = 500
+    upstream_status: int | None = None
+
+
+def _map_upstream_error(err: HTTPError | URLError | TimeoutError) -> AIClientError:
+    if isinstance(err, HTTPError):
+        detail = ""
+        try:
+            detail = err.read().decode("utf-8", errors="ignore").strip()[:180]
+        except Exception:
+            pass
+        logger.warning("Upstream AI HTTP error status=%s detail=%s", err.code, detail)
+        return AIClientError(
+            "Upstream AI provider returned an error for the configured model. "
+            "Check OPENAI_MODEL, model access, quota, and billing.",
+            code="upstream_http",
+            status=502,
+            upstream_status=err.code,
+        )
+    if isinstance(err, URLError):
+        return AIClientError(
+            f"connection error: {err.reason}", code="upstream_connection", status=502
+        )
+    return AIClientError("upstream timeout", code="upstream_timeout", status=504)
+
+
+def _chat_content(raw: bytes) -> str:
+    try:
+        body: dict[str, Any] = json.loads(raw.decode("utf-8"))
+    except json.JSONDecodeError as err:
+        raise AIClientError("invalid JSON from upstream", code="upstream_json", status=502) from err
+    record_usage(body.get("usage") if isinstance(body, dict) else None)
+    try:
+        return str(body["choices"][0]["message"]["content"]).strip()
+    except (KeyError, IndexError, TypeError, AttributeError) as err:
+        raise AIClientError(
+            "unexpected upstream response shape", code="upstream_schema", status=502
+        ) from err
+
+
+def _stream_delta(data: str) -> str:
+    try:
+        chunk = json.loads(data)
+    except json.JSONDecodeError as err:
+        raise AIClientError("invalid JSON from upstream", code="upstream_json", status=502) from err
+    try:
+        record_usage(chunk.get("usage"))
+        choices = chunk.get("choices") or []
+        if not choices:
+            return ""
+        return str((choices[0].get("delta") or {}).get("content") or "")
+    except (AttributeError, TypeError) as err:
+        raise AIClientError(
+            "unexpected upstream response shape", code="upstream_schema", status=502
+        ) from err
+
+
+def _stream_line_delta(raw_line: bytes) -> str:
+    line = raw_line.decode("utf-8", errors="replace").strip()
+    if not line.startswith("data:"):
+        return ""
+    data = line[len("data:") :].strip()
+    if data == "[DONE]":
+        return ""
+    return _stream_delta(data)
+
+
+def json_schema_format(schema: dict[str, Any], name: str = "response") -> dict[str, Any]:
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": True}}
 
 
-class AIClient:
-    def __init__(self) -> None:
+# Many OpenAI-compatible providers answer a json_schema response_format with 400. Once a
+# plain retry of the same call works, that provider is sent plain requests from then on.
+_schema_rejected: set[str] = set()
+
+
+def _observe_upstream(started: float, outcome: str) -> None:
+    METRICS.observe(UPSTREAM_SECONDS, time.perf_counter() - started, labels(outcome=outcome))
+
+
+class _ChatCompletionsConfig:
+    def __init__(self, retry: RetryPolicy | None = None) -> None:
         self.api_key = os.getenv("OPENAI_API_KEY", "").strip()
         self.base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
         self.model = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+        self.retry = retry if retry is not None else RetryPolicy.from_env()
+        self.structured_output = os.getenv("OPENAI_STRUCTURED_OUTPUT", "1").strip().lower() in {
+            "1",
+            "true",
+        }
 
     def available(self) -> bool:
         return bool(self.api_key)
 
-    def _build_chat_payload(self, system: str, user: str, temperature: float) -> dict[str, Any]:
+    def _build_chat_payload(
+        self,
+        system: str,
+        user: str,
+        temperature: float,
+        response_format: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
         payload: dict[str, Any] = {
             "model": self.model,
             "temperature": temperature,
@@ -36,49 +143,269 @@ class AIClient:
                 {"role": "user", "content": user},
             ],
         }
+        if response_format is not None:
+            payload["response_format"] = response_format
         return payload
 
-    def chat(self, system: str, user: str, temperature: float = 0.2) -> str:
+    def _headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    def _require_key(self) -> None:
         if not self.available():
             raise AIClientError("OPENAI_API_KEY is not set", code="missing_api_key", status=503)
+
+    def _admit(self) -> None:
+        if not breaker_for(self.base_url).allow():
+            raise AIClientError(
+                "Upstream AI provider is failing repeatedly; skipping calls until it recovers.",
+                code="upstream_circuit_open",
+                status=503,
+            )
+
+    def _sends_schema(self) -> bool:
+        return self.structured_output and self.base_url not in _schema_rejected
+
+    def _succeeded(self) -> None:
+        breaker_for(self.base_url).record_success()
+
+    def _abandoned(self) -> None:
+        breaker_for(self.base_url).release_probe()
+
+    def _retry_delay(
+        self, err: HTTPError | URLError | TimeoutError, attempt: int, can_retry: bool = True
+    ) -> float | None:
+        breaker = breaker_for(self.base_url)
+        if trips_breaker(err):
+            breaker.record_failure()
+        else:
+            # A 4xx or 429 says nothing about upstream health either way, so the failure count
+            # stands; only a 2xx closes the breaker.
+            breaker.release_probe()
+        if not (can_retry and is_retryable(err)):
+            return None
+        delay = self.retry.backoff(attempt, retry_after_seconds(err))
+        budget = remaining_budget()
+        if delay is not None and budget is not None and delay >= budget:
+            delay = None
+        if delay is None:
+            record_gave_up()
+            return None
+        logger.info("Retrying upstream AI call attempt=%s delay=%.2fs", attempt + 1, delay)
+        record_retry(delay)
+        return delay
+
+
+class AIClient(_ChatCompletionsConfig):
+    def __init__(
+        self, pool: ConnectionPool | None = None, retry: RetryPolicy | None = None
+    ) -> None:
+        super().__init__(retry)
+        self.pool = pool
+
+    def chat(self, system: str, user: str, temperature: float = 0.2) -> str:
+        return self._complete(self._build_chat_payload(system, user, temperature))
+
+    def chat_json(
+        self, system: str, user: str, schema: dict[str, Any], temperature: float = 0.2
+    ) -> str:
+        if not self._sends_schema():
+            return self.chat(system, user, temperature)
+        try:
+            return self._complete(
+                self._build_chat_payload(system, user, temperature, json_schema_format(schema))
+            )
+        except AIClientError as err:
+            if err.upstream_status != 400:
+                raise
+        text = self.chat(system, user, temperature)
+        _schema_rejected.add(self.base_url)
+        return text
+
+    def _complete(self, payload: dict[str, Any]) -> str:
+        self._require_key()
+        body = json.dumps(payload).encode("utf-8")
+        request = Request(
+            url=f"{self.base_url}/chat/completions",
+            data=body,
+            method="POST",
+            headers=self._headers(),
+        )
+        opener = self.pool.urlopen if self.pool is not None else urlopen
+        for attempt in itertools.count():
+            self._admit()
+            started = time.perf_counter()
+            try:
+                with opener(request, timeout=call_timeout(30)) as response:
+                    raw = response.read()
+            except (HTTPError, URLError, TimeoutError) as err:
+                _observe_upstream(started, "error")
+                delay = self._retry_delay(err, attempt)
+                if delay is None:
+                    raise _map_upstream_error(err) from err
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._abandoned()
+                raise
+            _observe_upstream(started, "ok")
+            self._succeeded()
+            break
+        record_upstream(len(body), len(raw))
+        return _chat_content(raw)
+
+    def chat_stream(
+        self,
+        system: str,
+        user: str,
+        on_token: Callable[[str], None],
+        temperature: float = 0.2,
+    ) -> str:
+        self._require_key()
         payload = self._build_chat_payload(system, user, temperature)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        body = json.dumps(payload).encode("utf-8")
         request = Request(
             url=f"{self.base_url}/chat/completions",
-            data=json.dumps(payload).encode("utf-8"),
+            data=body,
             method="POST",
-            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            headers=self._headers(),
         )
-        try:
-            with urlopen(request, timeout=30) as response:
-                text = response.read().decode("utf-8")
-                body: dict[str, Any] = json.loads(text)
-        except HTTPError as err:
-            detail = ""
+        parts: list[str] = []
+        opener = self.pool.stream if self.pool is not None else urlopen
+        for attempt in itertools.count():
+            self._admit()
+            received = 0
+            started = time.perf_counter()
             try:
-                detail = err.read().decode("utf-8", errors="ignore").strip()[:180]
-            except Exception:
-                pass
-            logger.warning("Upstream AI HTTP error status=%s detail=%s", err.code, detail)
-            raise AIClientError(
-                "Upstream AI provider returned an error for the configured model. "
-                "Check OPENAI_MODEL, model access, quota, and billing.",
-                code="upstream_http",
-                status=502,
-            ) from err
-        except URLError as err:
-            raise AIClientError(
-                f"connection error: {err.reason}", code="upstream_connection", status=502
-            ) from err
-        except TimeoutError as err:
-            raise AIClientError("upstream timeout", code="upstream_timeout", status=504) from err
-        except json.JSONDecodeError as err:
-            raise AIClientError(
-                "invalid JSON from upstream", code="upstream_json", status=502
-            ) from err
+                with opener(request, timeout=call_timeout(30)) as response:
+                    for raw_line in response:
+                        received += len(raw_line)
+                        delta = _stream_line_delta(raw_line)
+                        if delta:
+                            parts.append(delta)
+                            on_token(delta)
+            except (OSError, HTTPException) as err:
+                _observe_upstream(started, "error")
+                upstream = err if isinstance(err, URLError | TimeoutError) else URLError(err)
+                # Tokens already reached the listener, so a retry would duplicate them.
+                delay = self._retry_delay(upstream, attempt, can_retry=not parts)
+                if delay is None:
+                    raise _map_upstream_error(upstream) from err
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Bad frames, listener errors and interrupts would otherwise leave a half-open
+                # breaker waiting forever on a probe that never reports back.
+                self._abandoned()
+                raise
+            _observe_upstream(started, "ok")
+            self._succeeded()
+            break
+        record_upstream(len(body), received)
+        return "".join(parts).strip()
+
+
+class AsyncAIClient(_ChatCompletionsConfig):
+    def __init__(
+        self, pool: AsyncConnectionPool | None = None, retry: RetryPolicy | None = None
+    ) -> None:
+        super().__init__(retry)
+        self.pool = pool if pool is not None else AsyncConnectionPool.from_env()
+
+    async def chat(self, system: str, user: str, temperature: float = 0.2) -> str:
+        return await self._complete(self._build_chat_payload(system, user, temperature))
 
+    async def chat_json(
+        self, system: str, user: str, schema: dict[str, Any], temperature: float = 0.2
+    ) -> str:
+        if not self._sends_schema():
+            return await self.chat(system, user, temperature)
         try:
-            return str(body["choices"][0]["message"]["content"]).strip()
-        except (KeyError, IndexError, TypeError, AttributeError) as err:
-            raise AIClientError(
-                "unexpected upstream response shape", code="upstream_schema", status=502
-            ) from err
+            return await self._complete(
+                self._build_chat_payload(system, user, temperature, json_schema_format(schema))
+            )
+        except AIClientError as err:
+            if err.upstream_status != 400:
+                raise
+        text = await self.chat(system, user, temperature)
+        _schema_rejected.add(self.base_url)
+        return text
+
+    async def _complete(self, payload: dict[str, Any]) -> str:
+        self._require_key()
+        body = json.dumps(payload).encode("utf-8")
+        for attempt in itertools.count():
+            self._admit()
+            started = time.perf_counter()
+            try:
+                response = await self.pool.request(
+                    "POST",
+                    f"{self.base_url}/chat/completions",
+                    body,
+                    self._headers(),
+                    timeout=call_timeout(30),
+                )
+            except (HTTPError, URLError, TimeoutError) as err:
+                _observe_upstream(started, "error")
+                delay = self._retry_delay(err, attempt)
+                if delay is None:
+                    raise _map_upstream_error(err) from err
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._abandoned()
+                raise
+            _observe_upstream(started, "ok")
+            self._succeeded()
+            break
+        record_upstream(len(body), len(response.body))
+        return _chat_content(response.body)
+
+    async def chat_stream(
+        self,
+        system: str,
+        user: str,
+        on_token: Callable[[str], None],
+        temperature: float = 0.2,
+    ) -> str:
+        self._require_key()
+        payload = self._build_chat_payload(system, user, temperature)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        body = json.dumps(payload).encode("utf-8")
+        parts: list[str] = []
+        for attempt in itertools.count():
+            self._admit()
+            received = 0
+            started = time.perf_counter()
+            try:
+                async with self.pool.stream(
+                    "POST",
+                    f"{self.base_url}/chat/completions",
+                    body,
+                    self._headers(),
+                    timeout=call_timeout(30),
+                ) as response:
+                    async for raw_line in response.lines():
+                        received += len(raw_line)
+                        delta = _stream_line_delta(raw_line)
+                        if delta:
+                            parts.append(delta)
+                            on_token(delta)
+            except (HTTPError, URLError, TimeoutError) as err:
+                _observe_upstream(started, "error")
+                # Tokens already reached the listener, so a retry would duplicate them.
+                delay = self._retry_delay(err, attempt, can_retry=not parts)
+                if delay is None:
+                    raise _map_upstream_error(err) from err
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._abandoned()
+                raise
+            _observe_upstream(started, "ok")
+            self._succeeded()
+            break
+        record_upstream(len(body), received)
+        return "".join(parts).strip()
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import logging
+import os
+import signal
+import threading
+import uuid
+from collections.abc import Coroutine
+from http.client import parse_headers
+from http.server import BaseHTTPRequestHandler
+from typing import Any, cast
+from urllib.parse import urlsplit
+
+from src.metrics import METRICS, OVERLOADED
+
+logger = logging.getLogger("glytch-demo")
+
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class _LoopWriter:
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self._writer = writer
+
+    def write(self, data: bytes) -> int:
+        if self._writer.is_closing():
+            raise BrokenPipeError("client disconnected")
+        chunk = bytes(data)
+        self._writer.write(chunk)
+        return len(chunk)
+
+    def flush(self) -> None:
+        return
+
+
+# Mixed in front of the app's Handler so each request parsed by the event loop is replayed
+# through the same routes, once, against in-memory streams instead of a socket. Everything
+# runs on the loop thread: a route with slow work hands a coroutine to run_coroutine and the
+# server awaits it after the handler returns, so a run in progress holds no thread.
+class _Exchange(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    on_event_loop = True
+    pending: Coroutine[Any, Any, None] | None = None
+
+    def run_coroutine(self, work: Coroutine[Any, Any, None]) -> None:
+        self.pending = work
+
+    def setup(self) -> None:
+        self.rfile, self.wfile = self.request
+
+    def handle(self) -> None:
+        self.handle_one_request()
+
+    def finish(self) -> None:
+        return
+
+    def end_headers(self) -> None:
+        if getattr(self.server, "draining", False) and not self.close_connection:
+            self.send_header("Connection", "close")
+        super().end_headers()
+
+
+def _is_run_route(path: str) -> bool:
+    return path.startswith("/api/run") and path != "/api/run/stats"
+
+
+class AsyncHTTPServer:
+    def __init__(
+        self,
+        handler_class: type[BaseHTTPRequestHandler],
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        max_runs: int = 256,
+        keepalive_seconds: float = 15.0,
+        drain_seconds: float = 30.0,
+        retry_after_seconds: int = 5,
+        max_body_bytes: int = 16 * 1024,
+    ) -> None:
+        self.handler_class: type[BaseHTTPRequestHandler] = type(
+            f"Async{handler_class.__name__}", (_Exchange, handler_class), {}
+        )
+        self.host = host
+        self.port = port
+        self.max_runs = max(1, max_runs)
+        self.keepalive_seconds = keepalive_seconds
+        self.drain_seconds = drain_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.max_body_bytes = max_body_bytes
+        self.draining = False
+        self.runs = 0
+        self.ready = threading.Event()
+        self._connections: dict[asyncio.Task[None], bool] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.Server | None = None
+        self._stop: asyncio.Event | None = None
+
+    @classmethod
+    def from_env(
+        cls, handler_class: type[BaseHTTPRequestHandler], host: str, port: int, **kwargs: Any
+    ) -> AsyncHTTPServer:
+        return cls(
+            handler_class,
+            host,
+            port,
+            max_runs=int(os.getenv("ASYNC_MAX_RUNS", "256")),
+            keepalive_seconds=float(os.getenv("ASYNC_KEEPALIVE_SECONDS", "15")),
+            drain_seconds=float(os.getenv("ASYNC_DRAIN_SECONDS", "30")),
+            retry_after_seconds=int(os.getenv("ASYNC_RETRY_AFTER_SECONDS", "5")),
+            **kwargs,
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "connections": len(self._connections),
+            "runs": self.runs,
+            "max_runs": self.max_runs,
+            "draining": self.draining,
+        }
+
+    def run(self) -> None:
+        asyncio.run(self.serve(install_signals=True))
+
+    async def serve(self, install_signals: bool = False) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._server = await asyncio.start_server(
+            self._serve_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        if install_signals:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                self._loop.add_signal_handler(sig, self.begin_drain)
+        self.ready.set()
+        await self._stop.wait()
+        await self._drain()
+
+    def shutdown(self) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.begin_drain)
+
+    def begin_drain(self) -> None:
+        if self.draining or self._stop is None:
+            return
+        logger.info("draining: %s run(s) in flight", self.runs)
+        self.draining = True
+        if self._server is not None:
+            self._server.close()
+        for task, idle in list(self._connections.items()):
+            if idle:
+                task.cancel()
+        self._stop.set()
+
+    async def _drain(self) -> None:
+        pending = list(self._connections)
+        if pending:
+            _, still_open = await asyncio.wait(pending, timeout=self.drain_seconds)
+            for task in still_open:
+                task.cancel()
+            await asyncio.gather(*still_open, return_exceptions=True)
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = cast(asyncio.Task[None], asyncio.current_task())
+        peer = writer.get_extra_info("peername") or ("unknown", 0)
+        try:
+            while not self.draining:
+                self._connections[task] = True
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), self.keepalive_seconds
+                    )
+                except (TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                self._connections[task] = False
+                if not await self._respond(head, reader, writer, peer):
+                    break
+        except (asyncio.CancelledError, asyncio.IncompleteReadError, ConnectionError, TimeoutError):
+            pass
+        except Exception:
+            logger.exception("unhandled error while serving %s", peer[0])
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _respond(
+        self,
+        head: bytes,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        peer: tuple[str, int],
+    ) -> bool:
+        request_line, _, header_block = head.partition(b"\r\n")
+        headers = parse_headers(io.BytesIO(header_block))
+        try:
+            length = int(headers.get("Content-Length") or 0)
+        except ValueError:
+            length = 0
+        # Bodies the handler would reject are left unread, so the connection cannot be reused.
+        reusable = "Transfer-Encoding" not in headers and length <= self.max_body_bytes
+        body = b""
+        if reusable and length > 0:
+            body = await asyncio.wait_for(reader.readexactly(length), self.keepalive_seconds)
+
+        parts = request_line.decode("latin-1").split()
+        path = urlsplit(parts[1]).path if len(parts) > 1 else ""
+        if _is_run_route(path) and self.runs >= self.max_runs:
+            self._send_overloaded(writer)
+            await writer.drain()
+            return reusable and not self.draining
+
+        streams = (io.BytesIO(head + body), _LoopWriter(writer))
+        handler = cast(_Exchange, self.handler_class(cast(Any, streams), peer, cast(Any, self)))
+        if handler.pending is not None:
+            self.runs += 1
+            try:
+                await handler.pending
+            finally:
+                self.runs -= 1
+        await writer.drain()
+        return reusable and not handler.close_connection and not self.draining
+
+    def _send_overloaded(self, writer: asyncio.StreamWriter) -> None:
+        METRICS.inc(OVERLOADED)
+        body = json.dumps(
+            {
+                "request_id": uuid.uuid4().hex[:12],
+                "error": "server is at capacity, retry shortly",
+                "code": "overloaded",
+            }
+        ).encode()
+        writer.write(
+            b"HTTP/1.1 503 Service Unavailable\r\n"
+            b"Content-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\nRetry-After: {self.retry_after_seconds}\r\n".encode()
+            + (b"Connection: close\r\n" if self.draining else b"")
+            + b"\r\n"
+            + body
+        )
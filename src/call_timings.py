@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+@dataclass
+class CallTiming:
+    method: str
+    level: int | None = None
+    worker: str = ""
+    action: str = ""
+    wall_ms: float = 0.0
+    upstream_calls: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    ok: bool = True
+
+    @property
+    def site(self) -> str:
+        parts = [f"level {self.level}" if self.level is not None else "", self.worker, self.action]
+        return " / ".join(p for p in parts if p) or "unlabelled"
+
+
+# Levels, workers and actions label the calls they make here; the wrapper that times a
+# call reads the label, and the HTTP client adds bytes and usage to the open record.
+_site: ContextVar[dict[str, Any] | None] = ContextVar("call_site", default=None)
+_active: ContextVar[CallTiming | None] = ContextVar("active_call", default=None)
+
+
+@contextmanager
+def call_site(**fields: Any) -> Iterator[None]:
+    token = _site.set({**(_site.get() or {}), **fields})
+    try:
+        yield
+    finally:
+        _site.reset(token)
+
+
+@contextmanager
+def timed_call(method: str) -> Iterator[CallTiming]:
+    record = CallTiming(method=method, **(_site.get() or {}))
+    token = _active.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record.ok = False
+        raise
+    finally:
+        record.wall_ms = round((time.perf_counter() - started) * 1000, 2)
+        _active.reset(token)
+
+
+def record_upstream(request_bytes: int, response_bytes: int) -> None:
+    record = _active.get()
+    if record is not None:
+        record.upstream_calls += 1
+        record.request_bytes += request_bytes
+        record.response_bytes += response_bytes
+
+
+def record_usage(usage: Any) -> None:
+    record = _active.get()
+    if record is None or not isinstance(usage, dict):
+        return
+    record.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+    record.completion_tokens += int(usage.get("completion_tokens") or 0)
+
+
+_TOTALS = (
+    "wall_ms",
+    "upstream_calls",
+    "request_bytes",
+    "response_bytes",
+    "prompt_tokens",
+    "completion_tokens",
+)
+
+
+def summarize_timings(records: list[CallTiming]) -> dict[str, Any]:
+    by_site: dict[str, dict[str, Any]] = {}
+    for record in records:
+        site = by_site.setdefault(
+            record.site, {"site": record.site, "calls": 0, **dict.fromkeys(_TOTALS, 0)}
+        )
+        site["calls"] += 1
+        for name in _TOTALS:
+            site[name] += getattr(record, name)
+    sites = sorted(by_site.values(), key=lambda s: s["wall_ms"], reverse=True)
+    for site in sites:
+        site["wall_ms"] = round(site["wall_ms"], 2)
+    totals = {name: sum(getattr(r, name) for r in records) for name in _TOTALS}
+    totals["wall_ms"] = round(totals["wall_ms"], 2)
+    return {
+        "calls": len(records),
+        **totals,
+        "failed": sum(1 for r in records if not r.ok),
+        "slowest_site": sites[0]["site"] if sites else None,
+        "by_site": sites,
+        "per_call": [{**asdict(r), "site": r.site} for r in records],
+    }
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import itertools
+from collections.abc import Callable, Collection, Coroutine
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Protocol, TypeVar, cast
+
+from src.deadline import DEADLINE_PLACEHOLDER, Deadline, bound
+from src.types import AIChatClient, AsyncAIChatClient
+from src.worker_pool import FairWorkerPool, shared_upstream_slots, shared_worker_pool
+
+T = TypeVar("T")
+T_co = TypeVar("T_co", covariant=True)
+
+EventSink = Callable[[str, dict[str, Any]], None]
+
+
+# Level pipelines are written once as coroutines. The async runtime awaits real I/O;
+# the sync runtime wraps a blocking client, so its coroutines never suspend and
+# run_sync can drive them to completion without an event loop.
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value  # type: ignore[no-any-return]
+    coro.close()
+    raise RuntimeError("sync pipeline awaited a pending operation")
+
+
+class Spawned(Protocol[T_co]):
+    def done(self) -> bool: ...
+
+    def result(self) -> T_co: ...
+
+    def cancel(self) -> bool: ...
+
+    def cancelled(self) -> bool: ...
+
+    def exception(self) -> BaseException | None: ...
+
+
+class ChatRuntime(Protocol):
+    model: str
+    base_url: str
+    deadline: Deadline | None
+
+    def available(self) -> bool: ...
+
+    async def chat(self, system: str, user: str) -> str: ...
+
+    async def chat_json(self, system: str, user: str, schema: dict[str, Any]) -> str: ...
+
+    async def gather(self, coros: list[Coroutine[Any, Any, T]]) -> list[T]: ...
+
+    def spawn(self, coro: Coroutine[Any, Any, T]) -> Spawned[T]: ...
+
+    async def wait_any(self, pending: Collection[Spawned[Any]]) -> None: ...
+
+    def emit(self, event: str, data: dict[str, Any]) -> None: ...
+
+
+class _EventEmitter:
+    def __init__(self, on_event: EventSink | None, deadline: Deadline | None = None) -> None:
+        self.on_event = on_event
+        self.deadline = deadline
+        self._call_ids = itertools.count(1)
+
+    def _out_of_time(self) -> bool:
+        if self.deadline is None or not self.deadline.expired:
+            return False
+        self.deadline.skip_call()
+        return True
+
+    def emit(self, event: str, data: dict[str, Any]) -> None:
+        if self.on_event is not None:
+            self.on_event(event, data)
+
+    def _token_sink(self) -> Callable[[str], None]:
+        call_id = next(self._call_ids)
+        return lambda delta: self.emit("token", {"call": call_id, "delta": delta})
+
+
+class SyncChatRuntime(_EventEmitter):
+    def __init__(
+        self,
+        client: AIChatClient,
+        on_event: EventSink | None = None,
+        deadline: Deadline | None = None,
+        pool: FairWorkerPool | None = None,
+    ) -> None:
+        super().__init__(on_event, deadline)
+        self.client = client
+        self.model = getattr(client, "model", "")
+        self.base_url = getattr(client, "base_url", "")
+        # Every blocking call of this run queues under one key, which is what the shared
+        # pool rotates over to keep concurrent runs fair.
+        self.pool = pool if pool is not None else shared_worker_pool()
+        self.run_key = object()
+
+    def available(self) -> bool:
+        return self.client.available()
+
+    async def chat(self, system: str, user: str) -> str:
+        if self._out_of_time():
+            return DEADLINE_PLACEHOLDER
+        ctx = contextvars.copy_context()
+        return self.pool.call(self.run_key, lambda: ctx.run(self._blocking_chat, system, user))
+
+    def _blocking_chat(self, system: str, user: str) -> str:
+        # The deadline may have passed while this call waited for a pool thread.
+        if self._out_of_time():
+            return DEADLINE_PLACEHOLDER
+        with bound(self.deadline):
+            if self.on_event is None:
+                return self.client.chat(system, user)
+            on_token = self._token_sink()
+            chat_stream = getattr(self.client, "chat_stream", None)
+            if chat_stream is not None:
+                return str(chat_stream(system, user, on_token))
+            text = self.client.chat(system, user)
+        on_token(text)
+        return text
+
+    async def chat_json(self, system: str, user: str, schema: dict[str, Any]) -> str:
+        if self._out_of_time():
+            return DEADLINE_PLACEHOLDER
+        ctx = contextvars.copy_context()
+        return self.pool.call(
+            self.run_key, lambda: ctx.run(self._blocking_json, system, user, schema)
+        )
+
+    def _blocking_json(self, system: str, user: str, schema: dict[str, Any]) -> str:
+        if self._out_of_time():
+            return DEADLINE_PLACEHOLDER
+        chat_json = getattr(self.client, "chat_json", None)
+        with bound(self.deadline):
+            if chat_json is not None:
+                text = str(chat_json(system, user, schema))
+            else:
+                text = self.client.chat(system, user)
+        if self.on_event is not None:
+            self._token_sink()(text)
+        return text
+
+    async def gather(self, coros: list[Coroutine[Any, Any, T]]) -> list[T]:
+        futures = [cast(Future[T], self.spawn(coro)) for coro in coros]
+        if self.pool.on_worker_thread():
+            return [self.pool.wait_nested(future) for future in futures]
+        return [future.result() for future in futures]
+
+    def spawn(self, coro: Coroutine[Any, Any, T]) -> Spawned[T]:
+        # Pool threads do not inherit context variables, so the spawning context (call
+        # site labels, the bound deadline) travels with the coroutine.
+        ctx = contextvars.copy_context()
+        submit = self.pool.submit_nested if self.pool.on_worker_thread() else self.pool.submit
+        future = submit(self.run_key, lambda: ctx.run(run_sync, coro))
+        future.add_done_callback(lambda f: coro.close() if f.cancelled() else None)
+        return future
+
+    async def wait_any(self, pending: Collection[Spawned[Any]]) -> None:
+        futures = cast(Collection[Future[Any]], pending)
+        if self.pool.on_worker_thread() and any(self.pool.run_if_queued(f) for f in futures):
+            return
+        wait(futures, return_when=FIRST_COMPLETED)
+
+
+class AsyncChatRuntime(_EventEmitter):
+    def __init__(
+        self,
+        client: AsyncAIChatClient,
+        on_event: EventSink | None = None,
+        deadline: Deadline | None = None,
+        slots: asyncio.Semaphore | None = None,
+    ) -> None:
+        super().__init__(on_event, deadline)
+        self.client = client
+        self.model = getattr(client, "model", "")
+        self.base_url = getattr(client, "base_url", "")
+        # Bounds concurrent upstream calls the way the shared worker pool does for sync runs.
+        self.slots = slots
+
+    def available(self) -> bool:
+        return self.client.available()
+
+    async def chat(self, system: str, user: str) -> str:
+        if self._out_of_time():
+            return DEADLINE_PLACEHOLDER
+        async with self.slots or shared_upstream_slots():
+            if self._out_of_time():
+                return DEADLINE_PLACEHOLDER
+            with bound(self.deadline):
+                if self.on_event is None:
+                    return await self.client.chat(system, user)
+                on_token = self._token_sink()
+                chat_stream = getattr(self.client, "chat_stream", None)
+                if chat_stream is not None:
+                    return str(await chat_stream(system, user, on_token))
+                text = await self.client.chat(system, user)
+        on_token(text)
+        return text
+
+    async def chat_json(self, system: str, user: str, schema: dict[str, Any]) -> str:
+        if self._out_of_time():
+            return DEADLINE_PLACEHOLDER
+        chat_json = getattr(self.client, "chat_json", None)
+        async with self.slots or shared_upstream_slots():
+            if self._out_of_time():
+                return DEADLINE_PLACEHOLDER
+            with bound(self.deadline):
+                if chat_json is not None:
+                    text = str(await chat_json(system, user, schema))
+                else:
+                    text = await self.client.chat(system, user)
+        if self.on_event is not None:
+            self._token_sink()(text)
+        return text
+
+    async def gather(self, coros: list[Coroutine[Any, Any, T]]) -> list[T]:
+        return list(await asyncio.gather(*coros))
+
+    def spawn(self, coro: Coroutine[Any, Any, T]) -> Spawned[T]:
+        return asyncio.ensure_future(coro)
+
+    async def wait_any(self, pending: Collection[Spawned[Any]]) -> None:
+        await asyncio.wait(
+            cast(Collection[asyncio.Future[Any]], pending), return_when=FIRST_COMPLETED
+        )
+
+
+def as_runtime(
+    client: AsyncAIChatClient | ChatRuntime,
+    on_event: EventSink | None = None,
+    deadline: Deadline | None = None,
+) -> ChatRuntime:
+    if isinstance(client, SyncChatRuntime | AsyncChatRuntime):
+        return client
+    return AsyncChatRuntime(cast(AsyncAIChatClient, client), on_event=on_event, deadline=deadline)
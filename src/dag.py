@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+from src.chat_runtime import ChatRuntime, Spawned
+
+T = TypeVar("T")
+
+NodeFn = Callable[[dict[str, T]], Coroutine[Any, Any, T]]
+
+
+@dataclass
+class DagNode(Generic[T]):
+    name: str
+    run: NodeFn[T]
+    depends_on: tuple[str, ...] = ()
+
+
+@dataclass
+class DagRun(Generic[T]):
+    outputs: dict[str, T] = field(default_factory=dict)
+    started: dict[str, float] = field(default_factory=dict)
+    finished: dict[str, float] = field(default_factory=dict)
+    order: list[str] = field(default_factory=list)
+    gated_by: dict[str, str] = field(default_factory=dict)
+
+    def critical_path(self) -> list[str]:
+        if not self.finished:
+            return []
+        node = max(self.finished, key=self.finished.__getitem__)
+        path = [node]
+        while self.gated_by.get(node):
+            node = self.gated_by[node]
+            path.append(node)
+        return path[::-1]
+
+    def critical_path_ms(self) -> float:
+        path = self.critical_path()
+        if not path:
+            return 0.0
+        return round((self.finished[path[-1]] - self.started[path[0]]) * 1000, 2)
+
+
+def topological_order(nodes: list[DagNode[T]]) -> list[DagNode[T]]:
+    by_name = {n.name: n for n in nodes}
+    for node in nodes:
+        missing = [d for d in node.depends_on if d not in by_name]
+        if missing:
+            raise ValueError(f"node {node.name} depends on unknown nodes: {missing}")
+    ordered: list[DagNode[T]] = []
+    visiting: set[str] = set()
+    placed: set[str] = set()
+
+    def _visit(node: DagNode[T]) -> None:
+        if node.name in placed:
+            return
+        if node.name in visiting:
+            raise ValueError(f"dependency cycle through {node.name}")
+        visiting.add(node.name)
+        for dep in node.depends_on:
+            _visit(by_name[dep])
+        visiting.discard(node.name)
+        placed.add(node.name)
+        ordered.append(node)
+
+    for node in nodes:
+        _visit(node)
+    return ordered
+
+
+def _record_start(run: DagRun[T], node: DagNode[T]) -> Coroutine[Any, Any, T]:
+    if node.depends_on:
+        # The dependency that finished last is the one that actually held this node back.
+        run.gated_by[node.name] = max(node.depends_on, key=run.finished.__getitem__)
+    inputs = {dep: run.outputs[dep] for dep in node.depends_on}
+
+    async def _started() -> T:
+        # Stamped once the node runs rather than when it is queued for a worker slot, so
+        # time spent waiting for the pool is neither "saved" nor on the critical path.
+        run.started[node.name] = time.perf_counter()
+        return await node.run(inputs)
+
+    return _started()
+
+
+def _record_finish(run: DagRun[T], name: str, output: T) -> None:
+    run.finished[name] = time.perf_counter()
+    run.outputs[name] = output
+    run.order.append(name)
+
+
+# Nodes already finished in ``run`` are kept rather than repeated, so a caller can resume a
+# failed attempt by passing the same DagRun back in.
+async def run_dag(
+    runtime: ChatRuntime,
+    nodes: list[DagNode[T]],
+    parallel: bool = True,
+    run: DagRun[T] | None = None,
+) -> DagRun[T]:
+    ordered = topological_order(nodes)
+    if run is None:
+        run = DagRun()
+    waiting = [n for n in ordered if n.name not in run.outputs]
+    if not parallel:
+        for node in waiting:
+            _record_finish(run, node.name, await _record_start(run, node))
+        return run
+
+    pending: dict[Spawned[T], str] = {}
+
+    def _launch_ready() -> None:
+        for node in [n for n in waiting if all(d in run.outputs for d in n.depends_on)]:
+            waiting.remove(node)
+            pending[runtime.spawn(_record_start(run, node))] = node.name
+
+    _launch_ready()
+    try:
+        while pending:
+            await runtime.wait_any(list(pending))
+            for spawned in [s for s in pending if s.done()]:
+                _record_finish(run, pending.pop(spawned), spawned.result())
+            _launch_ready()
+    except BaseException:
+        for spawned in pending:
+            spawned.cancel()
+        # Nodes that already started may not stop on cancel; wait for them so nothing is
+        # still running when the caller moves on, and keep the ones that succeeded.
+        while pending:
+            await runtime.wait_any(list(pending))
+            for spawned in [s for s in pending if s.done()]:
+                name = pending.pop(spawned)
+                if not spawned.cancelled() and spawned.exception() is None:
+                    _record_finish(run, name, spawned.result())
+        raise
+    return run
+
+
+@dataclass
+class FanOut(Generic[T]):
+    outputs: dict[str, T]
+    wall_ms: float
+    serial_ms: float
+
+    @property
+    def saved_ms(self) -> float:
+        return round(max(self.serial_ms - self.wall_ms, 0.0), 2)
+
+
+# Independent calls inside a level go through the same scheduler as Level 8; serial_ms is
+# what the calls would have cost back to back, so the difference is the time saved.
+async def fan_out(runtime: ChatRuntime, nodes: list[DagNode[T]]) -> FanOut[T]:
+    started = time.perf_counter()
+    run = await run_dag(runtime, nodes)
+    wall = time.perf_counter() - started
+    serial = sum(run.finished[name] - run.started[name] for name in run.finished)
+    return FanOut(run.outputs, round(wall * 1000, 2), round(serial * 1000, 2))
+
+
+def fan_out_summary(fan_outs: list[FanOut[Any]]) -> dict[str, Any]:
+    return {
+        "groups": len(fan_outs),
+        "calls": sum(len(f.outputs) for f in fan_outs),
+        "wall_ms": round(sum(f.wall_ms for f in fan_outs), 2),
+        "serial_ms": round(sum(f.serial_ms for f in fan_outs), 2),
+        "saved_ms": round(sum(f.saved_ms for f in fan_outs), 2),
+    }
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEADLINE_PLACEHOLDER = "Skipped: the run's time budget was used up before this step."
+MIN_CALL_TIMEOUT_SECONDS = 0.05
+
+
+class Deadline:
+    def __init__(self, budget_seconds: float) -> None:
+        self.budget_seconds = budget_seconds
+        self.started_at = time.monotonic()
+        self.skipped_calls = 0
+        self.stopped_early = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Deadline | None:
+        budget = float(os.getenv("RUN_DEADLINE_SECONDS", "90"))
+        return cls(budget) if budget > 0 else None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        return self.budget_seconds - self.elapsed()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @property
+    def exceeded(self) -> bool:
+        return self.stopped_early or self.skipped_calls > 0
+
+    def timeout(self, cap: float) -> float:
+        return max(MIN_CALL_TIMEOUT_SECONDS, min(cap, self.remaining()))
+
+    def skip_call(self) -> None:
+        with self._lock:
+            self.skipped_calls += 1
+
+    def stop_early(self) -> None:
+        self.stopped_early = True
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "budget_seconds": self.budget_seconds,
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "exceeded": self.exceeded,
+            "skipped_calls": self.skipped_calls,
+        }
+
+
+def budget_spent(deadline: Deadline | None) -> bool:
+    if deadline is None or not deadline.expired:
+        return False
+    deadline.stop_early()
+    return True
+
+
+# The runtime binds its deadline around each client call so the innermost HTTP client
+# can size its timeout without every wrapper in between growing a new parameter.
+_current: ContextVar[Deadline | None] = ContextVar("run_deadline", default=None)
+
+
+@contextmanager
+def bound(deadline: Deadline | None) -> Iterator[None]:
+    token = _current.set(deadline)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def call_timeout(default: float) -> float:
+    deadline = _current.get()
+    return default if deadline is None else deadline.timeout(default)
+
+
+def remaining_budget() -> float | None:
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, replace
+from typing import Any
+
+from src.agent_models import OrchestratorTaskRecord
+
+
+@dataclass(frozen=True)
+class LogEvent:
+    seq: int
+    source: str
+    message: str
+
+
+# Appends never take a lock: next() on itertools.count is atomic under the GIL, and
+# each source owns its buffer, so concurrent workers never write to the same list.
+class EventLog:
+    def __init__(self, sources: Iterable[str] = ()) -> None:
+        self._seq = itertools.count(1)
+        self._buffers: dict[str, list[LogEvent]] = {source: [] for source in sources}
+
+    def next_seq(self) -> int:
+        return next(self._seq)
+
+    def append(self, source: str, message: str) -> LogEvent:
+        event = LogEvent(self.next_seq(), source, message)
+        self._buffers.setdefault(source, []).append(event)
+        return event
+
+    def merged(self) -> list[LogEvent]:
+        buffers = [list(buffer) for buffer in list(self._buffers.values())]
+        return list(heapq.merge(*buffers, key=lambda event: event.seq))
+
+    def messages(self) -> list[str]:
+        return [event.message for event in self.merged()]
+
+    def as_dicts(self) -> list[dict[str, Any]]:
+        return [asdict(event) for event in self.merged()]
+
+
+# Records are replaced, never mutated, so a snapshot taken from another thread sees each
+# record either entirely before or entirely after a transition.
+class TaskBoard:
+    def __init__(self, records: Iterable[OrchestratorTaskRecord]) -> None:
+        self._slots = {record.worker_name: record for record in records}
+
+    def get(self, worker_name: str) -> OrchestratorTaskRecord:
+        return self._slots[worker_name]
+
+    def update(self, worker_name: str, **changes: Any) -> OrchestratorTaskRecord:
+        record = replace(self._slots[worker_name], **changes)
+        self._slots[worker_name] = record
+        return record
+
+    def records(self) -> list[OrchestratorTaskRecord]:
+        return list(self._slots.values())
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        return [asdict(record) for record in self.records()]
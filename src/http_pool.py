@@ -0,0 +1,522 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import ssl
+import threading
+import time
+import weakref
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass, field
+from http.client import (
+    HTTPConnection,
+    HTTPException,
+    HTTPMessage,
+    HTTPResponse,
+    HTTPSConnection,
+    parse_headers,
+)
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import Request
+
+PoolKey = tuple[str, str, int]
+
+# Errors that mean a kept-alive socket was closed by the server while idle.
+_STALE_CONNECTION_ERRORS = (ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+@dataclass
+class PoolStats:
+    created: int = 0
+    reused: int = 0
+    evicted_idle: int = 0
+    discarded_full: int = 0
+
+
+@dataclass
+class PooledResponse:
+    status: int
+    reason: str
+    headers: HTTPMessage
+    body: bytes
+    _stream: io.BytesIO = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._stream = io.BytesIO(self.body)
+
+    def __enter__(self) -> PooledResponse:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        return None
+
+    def read(self, amt: int | None = None) -> bytes:
+        return self._stream.read(amt)
+
+
+class ConnectionPool:
+    def __init__(self, max_per_host: int = 8, idle_timeout: float = 60.0) -> None:
+        if max_per_host < 1:
+            raise ValueError("max_per_host must be at least 1")
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.stats = PoolStats()
+        self._idle: dict[PoolKey, deque[tuple[HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    @classmethod
+    def from_env(cls) -> ConnectionPool:
+        return cls(
+            max_per_host=int(os.getenv("OPENAI_POOL_MAXSIZE", "8")),
+            idle_timeout=float(os.getenv("OPENAI_POOL_IDLE_SECONDS", "60")),
+        )
+
+    def idle_count(self, key: PoolKey | None = None) -> int:
+        with self._lock:
+            if key is not None:
+                return len(self._idle.get(key, ()))
+            return sum(len(conns) for conns in self._idle.values())
+
+    def snapshot(self) -> dict[str, int]:
+        return {**asdict(self.stats), "idle": self.idle_count()}
+
+    def close(self) -> None:
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+    def _evict_expired(self, now: float) -> list[HTTPConnection]:
+        expired: list[HTTPConnection] = []
+        for conns in self._idle.values():
+            while conns and now - conns[0][1] > self.idle_timeout:
+                expired.append(conns.popleft()[0])
+        self.stats.evicted_idle += len(expired)
+        return expired
+
+    def _acquire(self, key: PoolKey, timeout: float) -> tuple[HTTPConnection, bool]:
+        now = time.monotonic()
+        with self._lock:
+            expired = self._evict_expired(now)
+            conns = self._idle.get(key)
+            conn = conns.pop()[0] if conns else None
+            if conn is not None:
+                self.stats.reused += 1
+            else:
+                self.stats.created += 1
+        for stale in expired:
+            stale.close()
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        scheme, host, port = key
+        if scheme == "https":
+            return HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context), False
+        return HTTPConnection(host, port, timeout=timeout), False
+
+    def _release(self, key: PoolKey, conn: HTTPConnection) -> None:
+        now = time.monotonic()
+        discard: HTTPConnection | None = None
+        with self._lock:
+            expired = self._evict_expired(now)
+            conns = self._idle.setdefault(key, deque())
+            if len(conns) >= self.max_per_host:
+                discard = conn
+                self.stats.discarded_full += 1
+            else:
+                conns.append((conn, now))
+        for stale in expired:
+            stale.close()
+        if discard is not None:
+            discard.close()
+
+    @staticmethod
+    def _target(request: Request) -> tuple[PoolKey, str, dict[str, str]]:
+        parts = urlsplit(request.full_url)
+        scheme = parts.scheme.lower()
+        if scheme not in {"http", "https"} or not parts.hostname:
+            raise URLError(f"unsupported URL: {request.full_url}")
+        key: PoolKey = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        return key, path, dict(request.header_items())
+
+    def _send(
+        self, request: Request, timeout: float
+    ) -> tuple[PoolKey, HTTPConnection, HTTPResponse]:
+        key, path, headers = self._target(request)
+        conn, reused = self._acquire(key, timeout)
+        while True:
+            try:
+                conn.request(request.get_method(), path, body=request.data, headers=headers)
+                return key, conn, conn.getresponse()
+            except TimeoutError:
+                conn.close()
+                raise
+            except (*_STALE_CONNECTION_ERRORS, HTTPException) as err:
+                conn.close()
+                if reused:
+                    conn, reused = self._acquire(key, timeout)
+                    continue
+                raise URLError(err) from err
+            except OSError as err:
+                conn.close()
+                raise URLError(err) from err
+
+    def _finish(self, key: PoolKey, conn: HTTPConnection, response: HTTPResponse) -> None:
+        if response.will_close or not response.isclosed():
+            conn.close()
+        else:
+            self._release(key, conn)
+
+    def _read_all(self, key: PoolKey, conn: HTTPConnection, response: HTTPResponse) -> bytes:
+        try:
+            body = response.read()
+        except TimeoutError:
+            conn.close()
+            raise
+        except (OSError, HTTPException) as err:
+            conn.close()
+            raise URLError(err) from err
+        self._finish(key, conn, response)
+        return body
+
+    def urlopen(self, request: Request, timeout: float = 30) -> PooledResponse:
+        key, conn, response = self._send(request, timeout)
+        body = self._read_all(key, conn, response)
+        if response.status >= 400:
+            raise HTTPError(
+                request.full_url, response.status, response.reason, response.msg, io.BytesIO(body)
+            )
+        return PooledResponse(
+            status=response.status, reason=response.reason, headers=response.msg, body=body
+        )
+
+    @contextmanager
+    def stream(self, request: Request, timeout: float = 30) -> Iterator[HTTPResponse]:
+        key, conn, response = self._send(request, timeout)
+        if response.status >= 400:
+            body = self._read_all(key, conn, response)
+            raise HTTPError(
+                request.full_url, response.status, response.reason, response.msg, io.BytesIO(body)
+            )
+        try:
+            yield response
+        except BaseException:
+            conn.close()
+            raise
+        self._finish(key, conn, response)
+
+
+_shared_pool: ConnectionPool | None = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool() -> ConnectionPool:
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ConnectionPool.from_env()
+        return _shared_pool
+
+
+@dataclass
+class _AsyncConnection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+# asyncio streams belong to the loop that opened them, so use one pool per event loop.
+class AsyncConnectionPool:
+    def __init__(self, max_per_host: int = 8, idle_timeout: float = 60.0) -> None:
+        if max_per_host < 1:
+            raise ValueError("max_per_host must be at least 1")
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.stats = PoolStats()
+        self._idle: dict[PoolKey, deque[tuple[_AsyncConnection, float]]] = {}
+        self._ssl_context = ssl.create_default_context()
+
+    @classmethod
+    def from_env(cls) -> AsyncConnectionPool:
+        return cls(
+            max_per_host=int(os.getenv("OPENAI_POOL_MAXSIZE", "8")),
+            idle_timeout=float(os.getenv("OPENAI_POOL_IDLE_SECONDS", "60")),
+        )
+
+    def idle_count(self) -> int:
+        return sum(len(conns) for conns in self._idle.values())
+
+    def snapshot(self) -> dict[str, int]:
+        return {**asdict(self.stats), "idle": self.idle_count()}
+
+    def close(self) -> None:
+        idle = self._idle
+        self._idle = {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+    def _evict_expired(self, now: float) -> None:
+        for conns in self._idle.values():
+            while conns and now - conns[0][1] > self.idle_timeout:
+                conns.popleft()[0].close()
+                self.stats.evicted_idle += 1
+
+    async def _acquire(self, key: PoolKey) -> tuple[_AsyncConnection, bool]:
+        self._evict_expired(time.monotonic())
+        conns = self._idle.get(key)
+        while conns:
+            conn = conns.pop()[0]
+            if conn.reader.at_eof() or conn.writer.is_closing():
+                conn.close()
+                continue
+            self.stats.reused += 1
+            return conn, True
+        self.stats.created += 1
+        scheme, host, port = key
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=self._ssl_context if scheme == "https" else None
+        )
+        return _AsyncConnection(reader, writer), False
+
+    def _release(self, key: PoolKey, conn: _AsyncConnection) -> None:
+        now = time.monotonic()
+        self._evict_expired(now)
+        conns = self._idle.setdefault(key, deque())
+        if len(conns) >= self.max_per_host:
+            self.stats.discarded_full += 1
+            conn.close()
+            return
+        conns.append((conn, now))
+
+    async def _exchange(
+        self, conn: _AsyncConnection, head: bytes, body: bytes
+    ) -> AsyncStreamedResponse:
+        conn.writer.write(head + body)
+        await conn.writer.drain()
+        status, reason, headers = await self._read_head(conn.reader)
+        # Interim responses (100 Continue, 103 Early Hints) come before the final one and
+        # carry no body.
+        while 100 <= status < 200:
+            status, reason, headers = await self._read_head(conn.reader)
+        return AsyncStreamedResponse(status, reason, headers, conn.reader)
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> tuple[int, str, HTTPMessage]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed before response")
+        _version, status_text, *reason = status_line.decode("latin-1").split(" ", 2)
+        lines: list[bytes] = []
+        while (line := await reader.readline()) not in {b"\r\n", b"\n", b""}:
+            lines.append(line)
+        headers = parse_headers(io.BytesIO(b"".join(lines) + b"\r\n"))
+        return int(status_text), (reason[0] if reason else "").strip(), headers
+
+    @staticmethod
+    def _target(
+        method: str, url: str, body: bytes, headers: dict[str, str]
+    ) -> tuple[PoolKey, bytes]:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in {"http", "https"} or not parts.hostname:
+            raise URLError(f"unsupported URL: {url}")
+        key: PoolKey = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        host_header = parts.netloc.rsplit("@", 1)[-1]
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host_header}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        lines += [f"Content-Length: {len(body)}", "Connection: keep-alive", "", ""]
+        return key, "\r\n".join(lines).encode("latin-1")
+
+    async def _open(
+        self, key: PoolKey, head: bytes, body: bytes, read_body: bool
+    ) -> tuple[_AsyncConnection, AsyncStreamedResponse, bytes]:
+        conn, reused = await self._acquire(key)
+        while True:
+            try:
+                response = await self._exchange(conn, head, body)
+                payload = await response.read() if read_body else b""
+                return conn, response, payload
+            except (*_STALE_CONNECTION_ERRORS, asyncio.IncompleteReadError) as err:
+                conn.close()
+                if reused:
+                    conn, reused = await self._acquire(key)
+                    continue
+                raise URLError(err) from err
+            except BaseException:
+                conn.close()
+                raise
+
+    def _finish(
+        self, key: PoolKey, conn: _AsyncConnection, response: AsyncStreamedResponse
+    ) -> None:
+        if response.reusable:
+            self._release(key, conn)
+        else:
+            conn.close()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes,
+        headers: dict[str, str],
+        timeout: float = 30,
+    ) -> PooledResponse:
+        key, head = self._target(method, url, body, headers)
+        try:
+            conn, response, payload = await asyncio.wait_for(
+                self._open(key, head, body, read_body=True), timeout
+            )
+        except TimeoutError:
+            raise
+        except (OSError, ValueError, asyncio.LimitOverrunError) as err:
+            raise URLError(err) from err
+        self._finish(key, conn, response)
+        if response.status >= 400:
+            raise HTTPError(
+                url, response.status, response.reason, response.headers, io.BytesIO(payload)
+            )
+        return PooledResponse(
+            status=response.status, reason=response.reason, headers=response.headers, body=payload
+        )
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        body: bytes,
+        headers: dict[str, str],
+        timeout: float = 30,
+    ) -> AsyncIterator[AsyncStreamedResponse]:
+        key, head = self._target(method, url, body, headers)
+        try:
+            conn, response, _ = await asyncio.wait_for(
+                self._open(key, head, body, read_body=False), timeout
+            )
+            if response.status >= 400:
+                payload = await asyncio.wait_for(response.read(), timeout)
+        except TimeoutError:
+            raise
+        except (OSError, ValueError, asyncio.LimitOverrunError) as err:
+            raise URLError(err) from err
+        if response.status >= 400:
+            self._finish(key, conn, response)
+            raise HTTPError(
+                url, response.status, response.reason, response.headers, io.BytesIO(payload)
+            )
+        response.timeout = timeout
+        try:
+            yield response
+        except BaseException:
+            conn.close()
+            raise
+        self._finish(key, conn, response)
+
+
+# The body of a response read from an AsyncConnectionPool connection, either all at once
+# or incrementally; each read is bounded by ``timeout`` like a socket timeout.
+class AsyncStreamedResponse:
+    def __init__(
+        self, status: int, reason: str, headers: HTTPMessage, reader: asyncio.StreamReader
+    ) -> None:
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.timeout: float | None = None
+        self.complete = status in {204, 304}
+        self._reader = reader
+        self._chunked = headers.get("Transfer-Encoding", "").lower() == "chunked"
+        length = headers.get("Content-Length")
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        self._until_eof = not self._chunked and self._remaining is None
+
+    @property
+    def reusable(self) -> bool:
+        return (
+            self.complete
+            and not self._until_eof
+            and self.headers.get("Connection", "").lower() != "close"
+        )
+
+    async def _next_chunk(self) -> bytes:
+        if self.complete:
+            return b""
+        if self._chunked:
+            size = int((await self._reader.readline()).split(b";")[0].strip(), 16)
+            if size == 0:
+                while (await self._reader.readline()) not in {b"\r\n", b"\n", b""}:
+                    pass
+                self.complete = True
+                return b""
+            data = await self._reader.readexactly(size)
+            await self._reader.readexactly(2)
+            return data
+        if self._remaining is not None:
+            if self._remaining == 0:
+                self.complete = True
+                return b""
+            data = await self._reader.read(min(self._remaining, 64 * 1024))
+            if not data:
+                raise asyncio.IncompleteReadError(b"", self._remaining)
+            self._remaining -= len(data)
+            return data
+        data = await self._reader.read(64 * 1024)
+        if not data:
+            self.complete = True
+        return data
+
+    async def read(self) -> bytes:
+        chunks: list[bytes] = []
+        while chunk := await self._next_chunk():
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        buffered = b""
+        while True:
+            try:
+                chunk = await asyncio.wait_for(self._next_chunk(), self.timeout)
+            except TimeoutError:
+                raise
+            except (OSError, ValueError, asyncio.IncompleteReadError) as err:
+                raise URLError(err) from err
+            if not chunk:
+                break
+            buffered += chunk
+            *complete, buffered = buffered.split(b"\n")
+            for line in complete:
+                yield line + b"\n"
+        if buffered:
+            yield buffered
+
+
+_async_pools: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncConnectionPool] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def shared_async_pool() -> AsyncConnectionPool:
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = _async_pools[loop] = AsyncConnectionPool.from_env()
+    return pool
@@ -3,12 +3,16 @@ from typing import Any, cast
 from src.agent_models import AgentPolicy, AgentTask
 
 # ruff: noqa: E501
-from src.agent_runtime import run_constrained_agent_loop
-from src.agentic_wrappers import run_agentic_capability_demo
+from src.agent_runtime import async_run_constrained_agent_loop
+from src.agentic_wrappers import async_run_agentic_capability_demo
+from src.call_timings import call_site
+from src.chat_runtime import ChatRuntime, EventSink, SyncChatRuntime, as_runtime, run_sync
 from src.constants import AGENTICNESS, DEFAULT_USE_CASE_KEY, LEVELS, USE_CASE_OPTIONS
-from src.orchestrator import run_mini_orchestrator
+from src.dag import DagNode, FanOut, fan_out, fan_out_summary
+from src.deadline import Deadline
+from src.orchestrator import async_run_mini_orchestrator
 from src.tools import calculator_tool, retrieve_local_facts
-from src.types import AIChatClient
+from src.types import AIChatClient, AsyncAIChatClient
 from src.yegge_workflows import build_yegge_simulation
 
 LEVEL_ADVANCEMENT_REASONS = {
@@ -549,11 +553,73 @@ def _build_backend_missing_run_data(level: int, level_info: dict[str, str]) -> d
     }
 
 
+def _flag_deadline(payload: dict[str, Any], deadline: Deadline | None) -> dict[str, Any]:
+    if deadline is None:
+        return payload
+    payload["deadline"] = deadline.snapshot()
+    if not deadline.exceeded:
+        return payload
+    payload["partial"] = True
+    reason = (
+        f"The {deadline.budget_seconds:g}s run budget was spent; "
+        f"{deadline.skipped_calls} model call(s) were skipped."
+    )
+    payload.setdefault("lines", []).extend(
+        [
+            "Time budget reached: this output is partial.",
+            f"Reason: {reason}",
+            "No external action was taken.",
+        ]
+    )
+    payload.setdefault("theatre_steps", []).append(
+        {
+            "label": "Time budget reached",
+            "actor": "system",
+            "status": "failed",
+            "summary": "Run stopped early with partial output",
+            "detail": reason,
+        }
+    )
+    payload["replay_steps"] = payload.get("replay_steps", []) + [f"Time budget reached: {reason}"]
+    approval = payload.setdefault("approval_summary", {})
+    approval["approved"] = False
+    approval["final_status"] = "needs_human_review"
+    return payload
+
+
 def run_level(
     level: int,
     client: AIChatClient,
     use_case_key: str = DEFAULT_USE_CASE_KEY,
     use_case_context: str | None = None,
+    on_event: EventSink | None = None,
+    deadline: Deadline | None = None,
+) -> dict[str, Any]:
+    runtime = SyncChatRuntime(client, on_event=on_event, deadline=deadline)
+    with call_site(level=level):
+        payload = run_sync(_run_level(level, runtime, use_case_key, use_case_context))
+    return _flag_deadline(payload, deadline)
+
+
+async def async_run_level(
+    level: int,
+    client: AsyncAIChatClient,
+    use_case_key: str = DEFAULT_USE_CASE_KEY,
+    use_case_context: str | None = None,
+    on_event: EventSink | None = None,
+    deadline: Deadline | None = None,
+) -> dict[str, Any]:
+    runtime = as_runtime(client, on_event=on_event, deadline=deadline)
+    with call_site(level=level):
+        payload = await _run_level(level, runtime, use_case_key, use_case_context)
+    return _flag_deadline(payload, deadline)
+
+
+async def _run_level(
+    level: int,
+    client: ChatRuntime,
+    use_case_key: str,
+    use_case_context: str | None,
 ) -> dict[str, Any]:
     use_case = _resolve_use_case_prompt(use_case_key, use_case_context)
     level_info = cast(dict[str, str], LEVELS[level])
@@ -571,6 +637,7 @@ def run_level(
         intro.append(use_case)
     simulation = build_yegge_simulation(level, level_info["name"], use_case).to_dict()
     run_data: dict[str, Any] = {}
+    fan_outs: list[FanOut[Any]] = []
 
     if not client.available():
         run_data = _build_backend_missing_run_data(level, level_info)
@@ -589,7 +656,10 @@ def run_level(
     if level == 1:
         objective = "Show prompt-only autocomplete behaviour."
         prompt = f"Start a useful response for this use case: {use_case}"
-        continuation = client.chat("Continue the text naturally in one short phrase.", prompt)
+        with call_site(action="continuation"):
+            continuation = await client.chat(
+                "Continue the text naturally in one short phrase.", prompt
+            )
         lines = [
             "Prompt-only baseline",
             f"Objective: {objective}",
@@ -649,24 +719,26 @@ def run_level(
         permission = "Request permission to apply instruction output in IDE"
         allowed = ["draft_completion", "verify_completion", "revise_completion", "finish"]
 
-        def exec_l2(action: str, _state: dict[str, Any]) -> tuple[str, str]:
+        async def exec_l2(action: str, _state: dict[str, Any]) -> tuple[str, str]:
             if action == "draft_completion":
-                out = client.chat(
+                out = await client.chat(
                     "Follow user constraints precisely and respond as JSON with output field.",
                     instruction,
                 )
                 return out, f"structured output drafted: {out}"
             if action == "verify_completion":
-                check = client.chat(
+                check = await client.chat(
                     "Check exact 7-word constraint and return pass/fail with reason.", instruction
                 )
                 return "", f"constraint verifier: {check}"
             if action == "revise_completion":
-                revised = client.chat("Revise to satisfy exact 7-word constraint.", instruction)
+                revised = await client.chat(
+                    "Revise to satisfy exact 7-word constraint.", instruction
+                )
                 return revised, f"revision produced: {revised}"
             return "", "finish selected"
 
-        run = run_agentic_capability_demo(
+        run = await async_run_agentic_capability_demo(
             client,
             2,
             objective,
@@ -704,23 +776,25 @@ def run_level(
             "finish",
         ]
 
-        def exec_l3(action: str, _state: dict[str, Any]) -> tuple[str, str]:
+        async def exec_l3(action: str, _state: dict[str, Any]) -> tuple[str, str]:
             if action == "answer_directly":
-                ans = client.chat("Answer directly in one line.", f"What is {expression}?")
+                ans = await client.chat("Answer directly in one line.", f"What is {expression}?")
                 return ans, "selected action=answer_directly"
             if action == "use_calculator":
                 result = calculator_tool(expression)
-                ans = client.chat("Use calculator output to answer.", result)
+                ans = await client.chat("Use calculator output to answer.", result)
                 return ans, f"tool input={expression}; tool result={result}"
             if action == "verify_with_calculator":
                 v = calculator_tool(expression)
                 return "", f"independent verification={v}"
             if action == "revise_answer":
-                rev = client.chat("Revise answer to match verified calculator result.", expression)
+                rev = await client.chat(
+                    "Revise answer to match verified calculator result.", expression
+                )
                 return rev, "answer revised"
             return "", "finish selected"
 
-        run = run_agentic_capability_demo(
+        run = await async_run_agentic_capability_demo(
             client,
             3,
             objective,
@@ -750,39 +824,52 @@ def run_level(
         evidence = retrieve_local_facts(question)
         allowed = ["retrieve_evidence", "verify_completion", "revise_completion", "finish"]
 
-        def exec_l4(action: str, _state: dict[str, Any]) -> tuple[str, str]:
+        async def exec_l4(action: str, _state: dict[str, Any]) -> tuple[str, str]:
             if action == "retrieve_evidence":
-                answer = client.chat(
+                answer = await client.chat(
                     "Answer only from supplied evidence.", f"Q:{question}\nEvidence:{evidence}"
                 )
                 return answer, f"evidence source=local_kb; evidence={evidence}"
             if action == "verify_completion":
-                support = client.chat(
+                support = await client.chat(
                     "Check whether answer is fully supported by evidence.", f"Evidence:{evidence}"
                 )
                 return "", f"support verification={support}"
             if action == "revise_completion":
-                revised = client.chat(
+                revised = await client.chat(
                     "Revise and mark limits if unsupported.", f"Evidence:{evidence}"
                 )
                 return revised, "revised for evidence support"
             return "", "finish selected"
 
-        run = run_agentic_capability_demo(
-            client,
-            4,
-            objective,
-            "Grounded research agent",
-            allowed,
-            "retrieve_evidence",
-            exec_l4,
-            "Final verifier: supported/unsupported based on evidence only.",
+        async def demo_l4(_inputs: dict[str, Any]) -> Any:
+            return await async_run_agentic_capability_demo(
+                client,
+                4,
+                objective,
+                "Grounded research agent",
+                allowed,
+                "retrieve_evidence",
+                exec_l4,
+                "Final verifier: supported/unsupported based on evidence only.",
+            )
+
+        async def sufficiency_l4(_inputs: dict[str, Any]) -> Any:
+            with call_site(action="evidence_sufficiency"):
+                return await client.chat(
+                    "Is evidence sufficient? Return sufficient/insufficient.", evidence
+                )
+
+        calls = await fan_out(
+            client, [DagNode("demo", demo_l4), DagNode("sufficiency", sufficiency_l4)]
         )
+        fan_outs.append(calls)
+        run, sufficiency = calls.outputs["demo"], calls.outputs["sufficiency"]
         lines = [
             f"Research objective: {objective}",
             "Retrieval plan: query local_kb then answer from evidence only.",
             f"Evidence source: {evidence}",
-            f"Evidence sufficiency: {client.chat('Is evidence sufficient? Return sufficient/insufficient.', evidence)}",
+            f"Evidence sufficiency: {sufficiency}",
             f"Answer: {run['final_answer']}",
             f"Support verification: {run['verification_result']}",
             f"Human approval gate: {'required' if run['approval_required'] else 'none'}",
@@ -799,24 +886,24 @@ def run_level(
         )
         allowed = ["plan", "verify_completion", "revise_completion", "finish"]
 
-        def exec_l5(action: str, _state: dict[str, Any]) -> tuple[str, str]:
+        async def exec_l5(action: str, _state: dict[str, Any]) -> tuple[str, str]:
             if action == "plan":
-                plan = client.chat(
+                plan = await client.chat(
                     "Create concise numbered plan, then execute as timed agenda.", objective
                 )
                 return plan, f"plan_execute_output={plan}"
             if action == "verify_completion":
-                ver = client.chat(
+                ver = await client.chat(
                     "Verify against objective. Return strong/weak/incomplete and one reason.",
                     objective,
                 )
                 return "", f"final verifier={ver}"
             if action == "revise_completion":
-                revised = client.chat("Revise to fix verifier weaknesses.", objective)
+                revised = await client.chat("Revise to fix verifier weaknesses.", objective)
                 return revised, "revision generated"
             return "", "finish selected"
 
-        run = run_agentic_capability_demo(
+        run = await async_run_agentic_capability_demo(
             client,
             5,
             objective,
@@ -853,26 +940,36 @@ def run_level(
         allowed = ["draft_completion", "critique", "revise_completion", "finish"]
         attempts: list[tuple[int, int, str]] = []
 
-        def exec_l6(action: str, state: dict[str, Any]) -> tuple[str, str]:
+        async def exec_l6(action: str, state: dict[str, Any]) -> tuple[str, str]:
             if action == "draft_completion":
-                draft = client.chat("Draft initial answer.", objective)
+                draft = await client.chat("Draft initial answer.", objective)
                 return draft, "attempt 1 drafted"
             if action == "critique":
-                critique = client.chat(
-                    "Critique this draft and provide one improvement.", state.get("current", "")
-                )
-                score_raw = client.chat(
-                    "Score this draft 0-100 as integer only.", state.get("current", "")
+                current = state.get("current", "")
+
+                async def critique_l6(_inputs: dict[str, str]) -> str:
+                    return await client.chat(
+                        "Critique this draft and provide one improvement.", current
+                    )
+
+                async def score_l6(_inputs: dict[str, str]) -> str:
+                    with call_site(action="score"):
+                        return await client.chat("Score this draft 0-100 as integer only.", current)
+
+                calls = await fan_out(
+                    client, [DagNode("critique", critique_l6), DagNode("score", score_l6)]
                 )
+                fan_outs.append(calls)
+                critique, score_raw = calls.outputs["critique"], calls.outputs["score"]
                 score = int("".join(ch for ch in score_raw if ch.isdigit()) or "0")
                 attempts.append((state["iteration"], score, critique))
                 return "", f"attempt={state['iteration']} score={score} critique={critique}"
             if action == "revise_completion":
-                revised = client.chat("Revise using critique.", state.get("current", ""))
+                revised = await client.chat("Revise using critique.", state.get("current", ""))
                 return revised, "revision created"
             return "", "finish selected"
 
-        run = run_agentic_capability_demo(
+        run = await async_run_agentic_capability_demo(
             client,
             6,
             objective,
@@ -907,7 +1004,7 @@ def run_level(
             max_tool_errors=1,
             require_final_verification=True,
         )
-        run = run_constrained_agent_loop(
+        run = await async_run_constrained_agent_loop(
             client=client,
             objective=objective,
             retrieve_fn=retrieve_local_facts,
@@ -916,14 +1013,13 @@ def run_level(
         )
         tool_errors = sum(1 for s in run["trace"] if "tool error" in s.observation)
         verified = True
-        verifier = (
-            client.chat(
-                "Verify final answer for objective fit. Return safe/unsafe and one reason.",
-                f"Objective:{objective}\nAnswer:{run['final_answer']}",
-            )
-            if policy.require_final_verification
-            else "verification skipped"
-        )
+        verifier = "verification skipped"
+        if policy.require_final_verification:
+            with call_site(action="final_verification"):
+                verifier = await client.chat(
+                    "Verify final answer for objective fit. Return safe/unsafe and one reason.",
+                    f"Objective:{objective}\nAnswer:{run['final_answer']}",
+                )
         if "unsafe" in verifier.lower():
             verified = False
         lines = [
@@ -956,6 +1052,7 @@ def run_level(
                 "Structured run summary:",
                 f"stopped_on_finish: {run['stopped_on_finish']}",
                 f"stopped_on_budget: {not run['stopped_on_finish']}",
+                f"controller_context_tokens: {run['context_tokens']}",
                 f"tool_errors: {tool_errors}",
                 f"verified: {verified}",
                 f"final_verdict: {'safe' if verified else 'needs review'}",
@@ -966,6 +1063,7 @@ def run_level(
         agent_instances = simulation.get("agent_instances", [])
         run_data = {
             "trace": [s.__dict__ for s in run["trace"]],
+            "context_tokens": run["context_tokens"],
             "swarm_summary": {
                 "total_agents": len(agent_instances),
                 "running": sum(
@@ -996,7 +1094,7 @@ def run_level(
                 use_case,
             )
         )
-        orch = run_mini_orchestrator(client, task, parallel=True)
+        orch = await async_run_mini_orchestrator(client, task, parallel=True)
         lines = [
             "Confirmed user context:",
             use_case,
@@ -1018,6 +1116,9 @@ def run_level(
                     f"attempt: {item['attempt']}",
                 ]
             )
+        lines.append(
+            f"critical path: {' -> '.join(orch['critical_path'])} ({orch['critical_path_ms']} ms)"
+        )
         audit_without_verifier = [
             entry
             for entry in orch["audit_log"]
@@ -1051,4 +1152,6 @@ def run_level(
             level, level_info, intro + lines, AGENTICNESS[level], simulation, run_data
         )
     )
+    if fan_outs:
+        payload["fan_out"] = fan_out_summary(fan_outs)
     return payload
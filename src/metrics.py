@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+import math
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+Labels = tuple[tuple[str, str], ...]
+GaugeReading = float | dict[Labels, float]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def labels(**values: object) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in values.items()))
+
+
+@dataclass
+class _Histogram:
+    counts: list[int]
+    total: float = 0.0
+
+
+@dataclass
+class _Stripe:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    counters: dict[tuple[str, Labels], float] = field(default_factory=dict)
+    histograms: dict[tuple[str, Labels], _Histogram] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class _Meta:
+    kind: str
+    help: str
+    buckets: tuple[float, ...] = ()
+
+
+_thread_stripe = threading.local()
+_stripe_ids = itertools.count()
+
+
+# Each thread writes to its own stripe, so handler threads recording metrics almost never
+# wait on each other; the stripes are only merged when /metrics is scraped.
+class MetricsRegistry:
+    def __init__(self, stripes: int = 16) -> None:
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+        self._meta: dict[str, _Meta] = {}
+        self._gauges: dict[str, Callable[[], GaugeReading]] = {}
+
+    def counter(self, name: str, help: str) -> str:
+        self._meta[name] = _Meta("counter", help)
+        return name
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> str:
+        self._meta[name] = _Meta("histogram", help, tuple(sorted(buckets)))
+        return name
+
+    def gauge(self, name: str, help: str, read: Callable[[], GaugeReading]) -> str:
+        self._meta[name] = _Meta("gauge", help)
+        self._gauges[name] = read
+        return name
+
+    def _stripe(self) -> _Stripe:
+        index = getattr(_thread_stripe, "index", None)
+        if index is None:
+            index = _thread_stripe.index = next(_stripe_ids)
+        return self._stripes[index % len(self._stripes)]
+
+    def inc(self, name: str, tags: Labels = (), value: float = 1.0) -> None:
+        stripe = self._stripe()
+        with stripe.lock:
+            stripe.counters[(name, tags)] = stripe.counters.get((name, tags), 0.0) + value
+
+    def observe(self, name: str, value: float, tags: Labels = ()) -> None:
+        buckets = self._meta[name].buckets
+        slot = bisect.bisect_left(buckets, value)
+        stripe = self._stripe()
+        with stripe.lock:
+            hist = stripe.histograms.get((name, tags))
+            if hist is None:
+                hist = stripe.histograms[(name, tags)] = _Histogram([0] * (len(buckets) + 1))
+            hist.counts[slot] += 1
+            hist.total += value
+
+    def _merged(
+        self,
+    ) -> tuple[dict[tuple[str, Labels], float], dict[tuple[str, Labels], _Histogram]]:
+        counters: dict[tuple[str, Labels], float] = {}
+        histograms: dict[tuple[str, Labels], _Histogram] = {}
+        for stripe in self._stripes:
+            with stripe.lock:
+                for key, value in stripe.counters.items():
+                    counters[key] = counters.get(key, 0.0) + value
+                for key, hist in stripe.histograms.items():
+                    merged = histograms.setdefault(key, _Histogram([0] * len(hist.counts)))
+                    merged.counts = [a + b for a, b in zip(merged.counts, hist.counts, strict=True)]
+                    merged.total += hist.total
+        return counters, histograms
+
+    def value(self, name: str, tags: Labels = ()) -> float:
+        counters, histograms = self._merged()
+        if (name, tags) in histograms:
+            return float(sum(histograms[(name, tags)].counts))
+        return counters.get((name, tags), 0.0)
+
+    def render(self) -> str:
+        counters, histograms = self._merged()
+        out: list[str] = []
+        for name, meta in sorted(self._meta.items()):
+            out.append(f"# HELP {name} {meta.help}")
+            out.append(f"# TYPE {name} {meta.kind}")
+            if meta.kind == "counter":
+                for (metric, tags), value in sorted(counters.items()):
+                    if metric == name:
+                        out.append(f"{name}{_format_labels(tags)} {_format_value(value)}")
+            elif meta.kind == "histogram":
+                for (metric, tags), hist in sorted(histograms.items(), key=lambda i: i[0]):
+                    if metric == name:
+                        out.extend(_histogram_lines(name, tags, meta.buckets, hist))
+            else:
+                reading = self._gauges[name]()
+                readings = reading if isinstance(reading, dict) else {(): reading}
+                for tags, value in sorted(readings.items()):
+                    out.append(f"{name}{_format_labels(tags)} {_format_value(value)}")
+        return "\n".join(out) + "\n"
+
+
+def _histogram_lines(
+    name: str, tags: Labels, buckets: tuple[float, ...], hist: _Histogram
+) -> list[str]:
+    lines = []
+    running = 0
+    for bound, count in zip((*buckets, math.inf), hist.counts, strict=True):
+        running += count
+        le = "+Inf" if bound == math.inf else _format_value(bound)
+        lines.append(f"{name}_bucket{_format_labels((*tags, ('le', le)))} {running}")
+    lines.append(f"{name}_sum{_format_labels(tags)} {_format_value(hist.total)}")
+    lines.append(f"{name}_count{_format_labels(tags)} {running}")
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(tags: Labels) -> str:
+    if not tags:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in tags) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+METRICS = MetricsRegistry()
+RUN_REQUESTS = METRICS.counter(
+    "glytch_run_requests_total", "Level run requests by level, mode and HTTP status."
+)
+RUN_SECONDS = METRICS.histogram(
+    "glytch_run_duration_seconds", "Level run request latency by level and HTTP status."
+)
+UPSTREAM_SECONDS = METRICS.histogram(
+    "glytch_upstream_call_duration_seconds", "Upstream chat completion latency per attempt."
+)
+RATE_LIMITED = METRICS.counter(
+    "glytch_rate_limited_total", "Requests rejected by the per-client rate limiter."
+)
+OVERLOADED = METRICS.counter(
+    "glytch_overloaded_total", "Run requests answered 503 because every run slot was busy."
+)
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
 from datetime import datetime, timezone
 from uuid import uuid4
@@ -13,10 +12,34 @@ from src.agent_models import (
     TaskStatus,
     WorkerStatus,
 )
-from src.types import AIChatClient
+from src.call_timings import call_site
+from src.chat_runtime import ChatRuntime, SyncChatRuntime, as_runtime, run_sync
+from src.dag import DagNode, DagRun, run_dag
+from src.deadline import Deadline, budget_spent
+from src.event_log import EventLog, TaskBoard
+from src.types import AIChatClient, AsyncAIChatClient
 
 
-def run_mini_orchestrator(client: AIChatClient, task: AgentTask, parallel: bool = True) -> dict:
+def run_mini_orchestrator(
+    client: AIChatClient,
+    task: AgentTask,
+    parallel: bool = True,
+    deadline: Deadline | None = None,
+) -> dict:
+    return run_sync(
+        async_run_mini_orchestrator(
+            SyncChatRuntime(client, deadline=deadline), task, parallel=parallel
+        )
+    )
+
+
+async def async_run_mini_orchestrator(
+    client: AsyncAIChatClient | ChatRuntime,
+    task: AgentTask,
+    parallel: bool = True,
+    deadline: Deadline | None = None,
+) -> dict:
+    runtime = as_runtime(client, deadline=deadline)
     max_worker_retries = 1
     require_verifier_supported = True
     require_human_approval_before_merge = True
@@ -35,7 +58,12 @@ def run_mini_orchestrator(client: AIChatClient, task: AgentTask, parallel: bool
             "content_writer",
             "Draft user-ready content for the confirmed use case.",
         ),
-        AgentWorker("critic", "critic", "Identify weaknesses and suggest improvements."),
+        AgentWorker(
+            "critic",
+            "critic",
+            "Identify weaknesses and suggest improvements.",
+            depends_on=("content_writer",),
+        ),
     ]
 
     run_state = OrchestratorRunState(
@@ -48,106 +76,179 @@ def run_mini_orchestrator(client: AIChatClient, task: AgentTask, parallel: bool
     def _now() -> str:
         return datetime.now(timezone.utc).isoformat()  # noqa: UP017
 
+    log = EventLog(["orchestrator", *(w.name for w in workers), "verifier", "merger"])
+
+    records = []
     for w in workers:
         rec = OrchestratorTaskRecord(
             task_id=f"{run_state.run_id}-{w.name}",
             worker_name=w.name,
             worker_role=w.role,
             task=w.task,
+            depends_on=list(w.depends_on),
         )
-        run_state.tasks.append(rec)
-        run_state.audit_log.append(f"created task: {rec.task_id} for worker {w.name}")
-
-    tasks_by_worker = {r.worker_name: r for r in run_state.tasks}
-
-    def run_worker(worker: AgentWorker) -> tuple[str, str]:
-        rec = tasks_by_worker[worker.name]
-        while rec.attempt <= max_worker_retries:
-            rec.attempt += 1
-            rec.status = TaskStatus.RUNNING
-            rec.worker_status = WorkerStatus.RUNNING
-            rec.started_at = _now()
-            run_state.audit_log.append(f"started worker: {worker.name} attempt {rec.attempt}")
+        records.append(rec)
+        log.append("orchestrator", f"created task: {rec.task_id} for worker {w.name}")
+    board = TaskBoard(records)
+
+    # Each event carries the transition plus a snapshot of the whole board after it.
+    def _publish(rec: OrchestratorTaskRecord) -> None:
+        runtime.emit(
+            "taskboard",
+            {
+                "run_id": run_state.run_id,
+                "seq": log.next_seq(),
+                "task": asdict(rec),
+                "board": board.snapshot(),
+            },
+        )
+
+    for rec in records:
+        _publish(rec)
+
+    async def run_worker(worker: AgentWorker, inputs: dict[str, str]) -> tuple[str, str]:
+        rec = board.get(worker.name)
+        context = task.objective
+        if inputs:
+            context += "\n\nInputs from upstream workers:\n" + "\n\n".join(
+                f"{name}:\n{out}" for name, out in inputs.items()
+            )
+        # Counted from the current attempt so a sequential fallback gets a fresh retry budget.
+        last_attempt = rec.attempt + max_worker_retries + 1
+        while rec.attempt < last_attempt:
+            rec = board.update(
+                worker.name,
+                attempt=rec.attempt + 1,
+                status=TaskStatus.RUNNING,
+                worker_status=WorkerStatus.RUNNING,
+                started_at=_now(),
+            )
+            log.append(worker.name, f"started worker: {worker.name} attempt {rec.attempt}")
+            _publish(rec)
             try:
-                output = client.chat(f"You are {worker.role}. {worker.task}", task.objective)
-                rec.status = TaskStatus.COMPLETED
-                rec.worker_status = WorkerStatus.COMPLETED
-                rec.output = output
-                rec.completed_at = _now()
-                run_state.audit_log.append(f"completed worker: {worker.name} attempt {rec.attempt}")
+                with call_site(worker=worker.name):
+                    output = await runtime.chat(f"You are {worker.role}. {worker.task}", context)
+                rec = board.update(
+                    worker.name,
+                    status=TaskStatus.COMPLETED,
+                    worker_status=WorkerStatus.COMPLETED,
+                    output=output,
+                    completed_at=_now(),
+                )
+                log.append(worker.name, f"completed worker: {worker.name} attempt {rec.attempt}")
+                _publish(rec)
                 return worker.name, output
             except Exception as exc:
-                rec.status = TaskStatus.FAILED
-                rec.worker_status = WorkerStatus.FAILED
-                rec.error = str(exc)
-                rec.completed_at = _now()
-                run_state.audit_log.append(
-                    f"failed worker: {worker.name} attempt {rec.attempt}: {exc}"
+                retry = rec.attempt < last_attempt and not budget_spent(runtime.deadline)
+                rec = board.update(
+                    worker.name,
+                    status=TaskStatus.FAILED,
+                    worker_status=WorkerStatus.RETRIED if retry else WorkerStatus.FAILED,
+                    error=str(exc),
+                    completed_at=_now(),
                 )
-                if rec.attempt <= max_worker_retries:
-                    rec.worker_status = WorkerStatus.RETRIED
-                    run_state.audit_log.append(f"retried worker: {worker.name}")
+                log.append(
+                    worker.name, f"failed worker: {worker.name} attempt {rec.attempt}: {exc}"
+                )
+                _publish(rec)
+                if retry:
+                    log.append(worker.name, f"retried worker: {worker.name}")
                     continue
                 raise
         raise RuntimeError(f"Worker {worker.name} exhausted retries")
 
-    outputs: dict[str, str] = {}
-    mode = run_state.mode
-    if run_state.mode == "parallel":
-        try:
-            with ThreadPoolExecutor(max_workers=4) as pool:
-                for name, out in pool.map(run_worker, workers):
-                    outputs[name] = out
-        except Exception:
-            mode = "sequential"
-            run_state.mode = mode
-            run_state.audit_log.append("parallel execution failed; falling back to sequential")
-            for worker in workers:
-                name, out = run_worker(worker)
-                outputs[name] = out
-    else:
-        for worker in workers:
-            name, out = run_worker(worker)
-            outputs[name] = out
-
-    verifier_input = "\n\n".join(f"{k}:\n{v}" for k, v in outputs.items())
-    verifier = client.chat(
-        "You are verifier. Check objective coverage. Return supported/unsupported with one reason.",
-        f"Objective: {task.objective}\n\nOutputs:\n{verifier_input}",
-    )
-    run_state.verifier_result = verifier
-    run_state.audit_log.append("verifier completed")
-
-    verifier_supported = "supported" in verifier.lower() and "unsupported" not in verifier.lower()
-    run_state.approval_required = require_human_approval_before_merge
-    run_state.approved_for_merge = verifier_supported
-    run_state.audit_log.append(
-        f"approval decision: {'approved' if run_state.approved_for_merge else 'rejected'}"
-    )
+    def _worker_node(worker: AgentWorker) -> DagNode[str]:
+        async def _run(inputs: dict[str, str]) -> str:
+            return (await run_worker(worker, inputs))[1]
 
-    merger = "needs human review"
-    if run_state.approved_for_merge:
-        merger = client.chat(
-            (
-                "You are merger. Produce the user-requested output first "
-                "and make it action-ready. "
-                "Do not default to generic guidance. "
-                "Avoid 'guidance for preparing' wording unless guidance was requested. "
-                "Preserve known facts, clearly label assumptions, "
-                "and include 'Check before use' where appropriate. "
-                "Use plain English."
-            ),
-            f"Objective: {task.objective}\nVerifier: {verifier}\n\nOutputs:\n{verifier_input}",
+        return DagNode(worker.name, _run, worker.depends_on)
+
+    async def _verify(inputs: dict[str, str]) -> str:
+        # The verifier checks objective coverage from the drafting workers and does not
+        # wait for the critic, which only informs the merge.
+        verifier_input = "\n\n".join(f"{k}:\n{v}" for k, v in inputs.items())
+        with call_site(worker="verifier"):
+            verifier = await runtime.chat(
+                "You are verifier. Check objective coverage. "
+                "Return supported/unsupported with one reason.",
+                f"Objective: {task.objective}\n\nOutputs:\n{verifier_input}",
+            )
+        run_state.verifier_result = verifier
+        log.append("verifier", "verifier completed")
+        verifier_supported = (
+            "supported" in verifier.lower() and "unsupported" not in verifier.lower()
+        )
+        run_state.approval_required = require_human_approval_before_merge
+        run_state.approved_for_merge = verifier_supported
+        log.append(
+            "verifier",
+            f"approval decision: {'approved' if run_state.approved_for_merge else 'rejected'}",
         )
-        run_state.audit_log.append("merge decision: merged")
-        for rec in run_state.tasks:
-            if rec.status == TaskStatus.COMPLETED:
-                rec.status = TaskStatus.MERGED
-    else:
-        run_state.audit_log.append("merge decision: blocked; needs human review")
-        for rec in run_state.tasks:
-            if rec.status in {TaskStatus.COMPLETED, TaskStatus.FAILED}:
-                rec.status = TaskStatus.NEEDS_HUMAN_REVIEW
+        return verifier
+
+    async def _merge(inputs: dict[str, str]) -> str:
+        if not run_state.approved_for_merge:
+            log.append("merger", "merge decision: blocked; needs human review")
+            return "needs human review"
+        worker_input = "\n\n".join(f"{w.name}:\n{inputs[w.name]}" for w in workers)
+        with call_site(worker="merger"):
+            merged = await runtime.chat(
+                (
+                    "You are merger. Produce the user-requested output first "
+                    "and make it action-ready. "
+                    "Do not default to generic guidance. "
+                    "Avoid 'guidance for preparing' wording unless guidance was requested. "
+                    "Preserve known facts, clearly label assumptions, "
+                    "and include 'Check before use' where appropriate. "
+                    "Use plain English."
+                ),
+                f"Objective: {task.objective}\nVerifier: {inputs['verifier']}"
+                f"\n\nOutputs:\n{worker_input}",
+            )
+        log.append("merger", "merge decision: merged")
+        return merged
+
+    nodes = [
+        *(_worker_node(w) for w in workers),
+        DagNode("verifier", _verify, ("planner", "researcher", "content_writer")),
+        DagNode("merger", _merge, ("verifier", *(w.name for w in workers))),
+    ]
+    mode = run_state.mode
+    dag: DagRun[str] = DagRun()
+    try:
+        await run_dag(runtime, nodes, parallel=mode == "parallel", run=dag)
+    except Exception:
+        if mode != "parallel":
+            raise
+        mode = "sequential"
+        run_state.mode = mode
+        # run_dag has settled every spawn, so only failed or unstarted nodes run again.
+        log.append(
+            "orchestrator",
+            "parallel execution failed; falling back to sequential for: "
+            + ", ".join(n.name for n in nodes if n.name not in dag.outputs),
+        )
+        await run_dag(runtime, nodes, parallel=False, run=dag)
+    outputs = {w.name: dag.outputs[w.name] for w in workers}
+    verifier = dag.outputs["verifier"]
+    merger = dag.outputs["merger"]
+
+    run_state.critical_path = dag.critical_path()
+    log.append(
+        "orchestrator",
+        f"critical path: {' -> '.join(run_state.critical_path)} ({dag.critical_path_ms()} ms)",
+    )
+    for name in [w.name for w in workers]:
+        rec = board.update(name, on_critical_path=name in run_state.critical_path)
+        if run_state.approved_for_merge and rec.status == TaskStatus.COMPLETED:
+            _publish(board.update(name, status=TaskStatus.MERGED))
+        elif not run_state.approved_for_merge and rec.status in {
+            TaskStatus.COMPLETED,
+            TaskStatus.FAILED,
+        }:
+            _publish(board.update(name, status=TaskStatus.NEEDS_HUMAN_REVIEW))
+    run_state.tasks = board.records()
+    run_state.audit_log = log.messages()
 
     run_state.final_answer = merger
 
@@ -165,8 +266,9 @@ def run_mini_orchestrator(client: AIChatClient, task: AgentTask, parallel: bool
         "mode": mode,
         "policy": policy,
         "trace": trace,
-        "taskboard": [asdict(rec) for rec in run_state.tasks],
+        "taskboard": board.snapshot(),
         "audit_log": run_state.audit_log,
+        "audit_events": log.as_dicts(),
         "run_id": run_state.run_id,
         "worker_outputs": outputs,
         "verifier_result": verifier,
@@ -179,17 +281,20 @@ def run_mini_orchestrator(client: AIChatClient, task: AgentTask, parallel: bool
             else TaskStatus.NEEDS_HUMAN_REVIEW.value
         ),
         "final_answer": run_state.final_answer,
+        "critical_path": run_state.critical_path,
+        "critical_path_ms": dag.critical_path_ms(),
         "run_state": {
             "run_id": run_state.run_id,
             "objective": run_state.objective,
             "mode": run_state.mode,
-            "tasks": [asdict(rec) for rec in run_state.tasks],
+            "tasks": board.snapshot(),
             "verifier_result": run_state.verifier_result,
             "merge_policy": run_state.merge_policy,
             "approval_required": run_state.approval_required,
             "approved_for_merge": run_state.approved_for_merge,
             "final_answer": run_state.final_answer,
             "audit_log": run_state.audit_log,
+            "critical_path": run_state.critical_path,
         },
         "limitation": "Workshop-safe orchestration only; no external side-effectful tools.",
     }
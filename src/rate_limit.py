@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class RateLimitStats:
+    allowed: int = 0
+    limited: int = 0
+    evicted_idle: int = 0
+    evicted_capacity: int = 0
+
+
+@dataclass
+class _Window:
+    started: float
+    current: int = 0
+    previous: int = 0
+    touched: float = 0.0
+
+
+@dataclass
+class _Shard:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    clients: OrderedDict[str, _Window] = field(default_factory=OrderedDict)
+    stats: RateLimitStats = field(default_factory=RateLimitStats)
+
+
+# Sliding-window counter: each client keeps only the counts for the current and previous
+# fixed windows, and the previous count is weighted by how much of it still overlaps the
+# sliding window. Clients and counters are spread over shards so a check only locks one
+# small dict and there is no process-wide lock on the request path.
+class RateLimiter:
+    def __init__(
+        self,
+        max_requests: int = 20,
+        window_seconds: float = 60.0,
+        shards: int = 16,
+        max_clients: int = 10_000,
+        sweep_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.max_clients = max_clients
+        self.sweep_seconds = sweep_seconds
+        self._clock = clock
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._per_shard = max(1, max_clients // len(self._shards))
+        self._sweeper: threading.Thread | None = None
+        self._sweeper_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> RateLimiter:
+        return cls(
+            max_requests=int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "20")),
+            window_seconds=float(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60")),
+            shards=int(os.getenv("RATE_LIMIT_SHARDS", "16")),
+            max_clients=int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000")),
+            sweep_seconds=float(os.getenv("RATE_LIMIT_SWEEP_SECONDS", "30")),
+        )
+
+    def __len__(self) -> int:
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                total += len(shard.clients)
+        return total
+
+    def snapshot(self) -> dict[str, float]:
+        totals = RateLimitStats()
+        clients = 0
+        for shard in self._shards:
+            with shard.lock:
+                clients += len(shard.clients)
+                for name, value in asdict(shard.stats).items():
+                    setattr(totals, name, getattr(totals, name) + value)
+        return {
+            **asdict(totals),
+            "clients": clients,
+            "max_clients": self.max_clients,
+            "shards": len(self._shards),
+            "max_requests": self.max_requests,
+            "window_seconds": self.window_seconds,
+        }
+
+    def _roll(self, window: _Window, now: float) -> None:
+        elapsed = int((now - window.started) // self.window_seconds)
+        if elapsed <= 0:
+            return
+        window.previous = window.current if elapsed == 1 else 0
+        window.current = 0
+        window.started += elapsed * self.window_seconds
+
+    def _estimate(self, window: _Window, now: float) -> float:
+        overlap = 1.0 - (now - window.started) / self.window_seconds
+        return window.previous * max(overlap, 0.0) + window.current
+
+    def allow(self, client: str) -> bool:
+        if self.sweep_seconds > 0 and self._sweeper is None:
+            self._start_sweeper()
+        now = self._clock()
+        shard = self._shards[hash(client) % len(self._shards)]
+        with shard.lock:
+            window = shard.clients.get(client)
+            if window is None:
+                window = shard.clients[client] = _Window(started=now)
+                while len(shard.clients) > self._per_shard:
+                    shard.clients.popitem(last=False)
+                    shard.stats.evicted_capacity += 1
+            else:
+                shard.clients.move_to_end(client)
+                self._roll(window, now)
+            window.touched = now
+            allowed = self._estimate(window, now) < self.max_requests
+            if allowed:
+                window.current += 1
+                shard.stats.allowed += 1
+            else:
+                shard.stats.limited += 1
+        return allowed
+
+    # A client whose last request is two windows old has nothing left to count against it.
+    def sweep(self) -> int:
+        cutoff = self._clock() - 2 * self.window_seconds
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                # Entries are kept in last-touched order, so idle ones sit at the front.
+                while shard.clients:
+                    oldest = next(iter(shard.clients.values()))
+                    if oldest.touched > cutoff:
+                        break
+                    shard.clients.popitem(last=False)
+                    shard.stats.evicted_idle += 1
+                    removed += 1
+        return removed
+
+    def _start_sweeper(self) -> None:
+        with self._sweeper_lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(
+                target=_sweep_loop,
+                args=(weakref.ref(self), self.sweep_seconds, self._closed),
+                name="rate-limit-sweeper",
+                daemon=True,
+            )
+            self._sweeper.start()
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+def _sweep_loop(
+    ref: weakref.ReferenceType[RateLimiter], interval: float, closed: threading.Event
+) -> None:
+    # Holding only a weak reference lets a discarded limiter be collected and its sweeper exit.
+    while not closed.wait(interval):
+        limiter = ref()
+        if limiter is None:
+            return
+        limiter.sweep()
+        del limiter
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from urllib.error import HTTPError, URLError
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@dataclass
+class ResilienceStats:
+    retries: int = 0
+    retry_wait_seconds: float = 0.0
+    gave_up: int = 0
+    circuit_opens: int = 0
+    circuit_rejections: int = 0
+
+
+_stats = ResilienceStats()
+_stats_lock = threading.Lock()
+
+
+def retry_after_seconds(err: HTTPError | URLError | TimeoutError) -> float | None:
+    if not isinstance(err, HTTPError) or err.headers is None:
+        return None
+    value = (err.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(err: HTTPError | URLError | TimeoutError) -> bool:
+    if isinstance(err, HTTPError):
+        return err.code in RETRYABLE_STATUS
+    return True
+
+
+def trips_breaker(err: HTTPError | URLError | TimeoutError) -> bool:
+    if isinstance(err, HTTPError):
+        return err.code >= 500
+    return True
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = 2
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    @classmethod
+    def from_env(cls) -> RetryPolicy:
+        return cls(
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+            base_delay=float(os.getenv("OPENAI_RETRY_BASE_SECONDS", "0.5")),
+            max_delay=float(os.getenv("OPENAI_RETRY_MAX_SECONDS", "8")),
+        )
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float | None:
+        if attempt >= self.max_retries:
+            return None
+        if retry_after is not None:
+            # Waiting longer than the cap would just hold a worker thread hostage.
+            if retry_after > self.max_delay:
+                return None
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> CircuitBreaker:
+        return cls(
+            failure_threshold=int(os.getenv("OPENAI_CIRCUIT_FAILURES", "5")),
+            reset_seconds=float(os.getenv("OPENAI_CIRCUIT_RESET_SECONDS", "30")),
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked(time.monotonic())
+
+    def _state_locked(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if now - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            state = self._state_locked(time.monotonic())
+            if state == "closed":
+                return True
+            # Half-open lets exactly one probe through; everyone else keeps failing fast.
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+        with _stats_lock:
+            _stats.circuit_rejections += 1
+        return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        # An attempt that ended without an upstream verdict frees the probe slot for the next call.
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            reopen = self._probing or (
+                self.opened_at is None and self.failures >= self.failure_threshold > 0
+            )
+            self._probing = False
+            if not reopen:
+                return
+            self.opened_at = time.monotonic()
+        with _stats_lock:
+            _stats.circuit_opens += 1
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(base_url: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(base_url)
+        if breaker is None:
+            breaker = _breakers[base_url] = CircuitBreaker.from_env()
+        return breaker
+
+
+def reset_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def record_retry(delay: float) -> None:
+    with _stats_lock:
+        _stats.retries += 1
+        _stats.retry_wait_seconds += delay
+
+
+def record_gave_up() -> None:
+    with _stats_lock:
+        _stats.gave_up += 1
+
+
+def resilience_snapshot() -> dict[str, object]:
+    with _stats_lock:
+        stats = asdict(_stats)
+    stats["retry_wait_seconds"] = round(stats["retry_wait_seconds"], 3)
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    stats["circuits"] = {url: b.state for url, b in breakers.items()}
+    return stats
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from src.deadline import remaining_budget
+from src.runtime_client import AIClientLike, AsyncAIClientLike, json_or_chat, stream_or_chat
+from src.single_flight import DoneSignal
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    coalesced: int = 0
+    wait_timeouts: int = 0
+
+
+def cache_key(
+    base_url: str,
+    model: str,
+    system: str,
+    user: str,
+    temperature: float,
+    schema: dict[str, Any] | None = None,
+) -> str:
+    # Different providers can serve the same model name with different answers.
+    parts: list[Any] = [base_url, model, system, user, round(float(temperature), 4)]
+    if schema is not None:
+        parts.append(schema)
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SqliteCacheBackend:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str, now: float) -> tuple[str, float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM chat_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                with self._conn:
+                    self._conn.execute("DELETE FROM chat_cache WHERE key = ?", (key,))
+                return None
+            return str(row[0]), float(row[1])
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM chat_cache WHERE expires_at <= ?", (now,)
+            ).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_bytes: int = 8 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+        backend: SqliteCacheBackend | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: dict[str, DoneSignal] = {}
+
+    @classmethod
+    def from_env(cls) -> ResponseCache:
+        path = os.getenv("RESPONSE_CACHE_PATH", "").strip()
+        return cls(
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+            max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+            backend=SqliteCacheBackend(path) if path else None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.stats.hits + self.stats.misses
+            return {
+                **asdict(self.stats),
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    @staticmethod
+    def _size(key: str, value: str) -> int:
+        return len(key) + len(value.encode("utf-8"))
+
+    def _drop(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= self._size(key, value)
+
+    def _store_locked(self, key: str, value: str, expires_at: float) -> None:
+        if key in self._entries:
+            self._drop(key)
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, expires_at)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def get(self, key: str) -> str | None:
+        return self._lookup(key, count=True)
+
+    def _lookup(self, key: str, count: bool) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += count
+                    return entry[0]
+                self._drop(key)
+                self.stats.expirations += 1
+        stored = self.backend.get(key, now) if self.backend is not None else None
+        with self._lock:
+            if stored is None:
+                self.stats.misses += count
+                return None
+            self.stats.hits += count
+            self.stats.disk_hits += count
+            self._store_locked(key, stored[0], stored[1])
+            return stored[0]
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store_locked(key, value, expires_at)
+        if self.backend is not None:
+            self.backend.set(key, value, expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _claim(self, key: str, first: bool) -> tuple[str | None, DoneSignal | None]:
+        # Returns the cached value, or the in-flight call to wait for; (None, None) means
+        # the caller now leads the call for this key and must _release it when done. Only
+        # the first pass of a call counts as a lookup, so waiters that loop back after a
+        # leader finishes do not add hits or misses.
+        cached = self._lookup(key, count=first)
+        if cached is not None:
+            return cached, None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                return entry[0], None
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                self._inflight[key] = DoneSignal()
+            else:
+                self.stats.coalesced += 1
+            return None, waiter
+
+    def _leader_stored(self, key: str, landed: bool) -> bool:
+        with self._lock:
+            if not landed:
+                self.stats.wait_timeouts += 1
+                return False
+            # False when the leading call failed; the waiter then calls upstream itself.
+            return key in self._entries
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            leader = self._inflight.pop(key)
+        leader.set()
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        first = True
+        while True:
+            cached, waiter = self._claim(key, first)
+            if cached is not None:
+                return cached
+            if waiter is None:
+                break
+            first = False
+            # A hung leader must not hold waiters past their own run deadline.
+            if not self._leader_stored(key, waiter.wait(remaining_budget())):
+                return compute()
+        try:
+            value = compute()
+            self.set(key, value)
+            return value
+        finally:
+            self._release(key)
+
+    async def get_or_compute_async(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        first = True
+        while True:
+            cached, waiter = self._claim(key, first)
+            if cached is not None:
+                return cached
+            if waiter is None:
+                break
+            first = False
+            if not self._leader_stored(key, await waiter.wait_async(remaining_budget())):
+                return await compute()
+        try:
+            value = await compute()
+            self.set(key, value)
+            return value
+        finally:
+            self._release(key)
+
+
+class CachedAIClient:
+    def __init__(self, inner: AIClientLike, cache: ResponseCache) -> None:
+        self.inner = inner
+        self.cache = cache
+        self.model = getattr(inner, "model", "")
+        self.base_url = getattr(inner, "base_url", "")
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    def chat(self, system: str, user: str, temperature: float = 0.2) -> str:
+        if not self.cache.enabled:
+            return self.inner.chat(system, user, temperature=temperature)
+        key = cache_key(self.base_url, self.model, system, user, temperature)
+        return self.cache.get_or_compute(
+            key, lambda: self.inner.chat(system, user, temperature=temperature)
+        )
+
+    def chat_json(
+        self, system: str, user: str, schema: dict[str, Any], temperature: float = 0.2
+    ) -> str:
+        if not self.cache.enabled:
+            return json_or_chat(self.inner, system, user, schema, temperature=temperature)
+        key = cache_key(self.base_url, self.model, system, user, temperature, schema)
+        return self.cache.get_or_compute(
+            key, lambda: json_or_chat(self.inner, system, user, schema, temperature=temperature)
+        )
+
+    def chat_stream(
+        self,
+        system: str,
+        user: str,
+        on_token: Callable[[str], None],
+        temperature: float = 0.2,
+    ) -> str:
+        if not self.cache.enabled:
+            return stream_or_chat(self.inner, system, user, on_token, temperature=temperature)
+        streamed = False
+
+        def _compute() -> str:
+            nonlocal streamed
+            streamed = True
+            return stream_or_chat(self.inner, system, user, on_token, temperature=temperature)
+
+        key = cache_key(self.base_url, self.model, system, user, temperature)
+        text = self.cache.get_or_compute(key, _compute)
+        if not streamed:
+            on_token(text)
+        return text
+
+
+class AsyncCachedAIClient:
+    def __init__(self, inner: AsyncAIClientLike, cache: ResponseCache) -> None:
+        self.inner = inner
+        self.cache = cache
+        self.model = getattr(inner, "model", "")
+        self.base_url = getattr(inner, "base_url", "")
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    async def chat(self, system: str, user: str, temperature: float = 0.2) -> str:
+        if not self.cache.enabled:
+            return await self.inner.chat(system, user, temperature=temperature)
+        key = cache_key(self.base_url, self.model, system, user, temperature)
+        return await self.cache.get_or_compute_async(
+            key, lambda: self.inner.chat(system, user, temperature=temperature)
+        )
+
+    async def chat_json(
+        self, system: str, user: str, schema: dict[str, Any], temperature: float = 0.2
+    ) -> str:
+        async def _compute() -> str:
+            chat_json = getattr(self.inner, "chat_json", None)
+            if chat_json is not None:
+                return str(await chat_json(system, user, schema, temperature=temperature))
+            return await self.inner.chat(system, user, temperature=temperature)
+
+        if not self.cache.enabled:
+            return await _compute()
+        key = cache_key(self.base_url, self.model, system, user, temperature, schema)
+        return await self.cache.get_or_compute_async(key, _compute)
+
+    async def chat_stream(
+        self,
+        system: str,
+        user: str,
+        on_token: Callable[[str], None],
+        temperature: float = 0.2,
+    ) -> str:
+        streamed = False
+
+        async def _compute() -> str:
+            nonlocal streamed
+            streamed = True
+            chat_stream = getattr(self.inner, "chat_stream", None)
+            if chat_stream is not None:
+                return str(await chat_stream(system, user, on_token, temperature=temperature))
+            text = await self.inner.chat(system, user, temperature=temperature)
+            on_token(text)
+            return text
+
+        if not self.cache.enabled:
+            return await _compute()
+        key = cache_key(self.base_url, self.model, system, user, temperature)
+        text = await self.cache.get_or_compute_async(key, _compute)
+        if not streamed:
+            on_token(text)
+        return text
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Any, Protocol
 
 from src.ai_client import AIClientError
+from src.call_timings import CallTiming, summarize_timings, timed_call
 
 SAFE_PLACEHOLDER = (
     "[AI call failed safely. No external action was taken. "
@@ -24,29 +28,71 @@ class AIClientLike(Protocol):
     def chat(self, system: str, user: str, temperature: float = 0.2) -> str: ...
 
 
-class CapturedAIClient:
-    def __init__(self, inner: AIClientLike) -> None:
-        self.inner = inner
+def stream_or_chat(
+    client: AIClientLike,
+    system: str,
+    user: str,
+    on_token: Callable[[str], None],
+    temperature: float = 0.2,
+) -> str:
+    chat_stream = getattr(client, "chat_stream", None)
+    if chat_stream is not None:
+        return str(chat_stream(system, user, on_token, temperature=temperature))
+    text = client.chat(system, user, temperature=temperature)
+    on_token(text)
+    return text
+
+
+def json_or_chat(
+    client: AIClientLike,
+    system: str,
+    user: str,
+    schema: dict[str, Any],
+    temperature: float = 0.2,
+) -> str:
+    chat_json = getattr(client, "chat_json", None)
+    if chat_json is not None:
+        return str(chat_json(system, user, schema, temperature=temperature))
+    return client.chat(system, user, temperature=temperature)
+
+
+class AsyncAIClientLike(Protocol):
+    def available(self) -> bool: ...
+
+    async def chat(self, system: str, user: str, temperature: float = 0.2) -> str: ...
+
+
+class _ErrorCapture:
+    def __init__(self, inner: AIClientLike | AsyncAIClientLike) -> None:
         self.model = getattr(inner, "model", "")
         self.base_url = getattr(inner, "base_url", "")
         self.errors: list[RuntimeAIError] = []
-
-    def available(self) -> bool:
-        return self.inner.available()
+        self.timings: list[CallTiming] = []
+        self._timings_lock = threading.Lock()
 
     @property
     def has_errors(self) -> bool:
         return bool(self.errors)
 
-    def chat(self, system: str, user: str, temperature: float = 0.2) -> str:
-        try:
-            return self.inner.chat(system, user, temperature=temperature)
-        except AIClientError as err:
+    @contextmanager
+    def _timed(self, method: str) -> Iterator[CallTiming]:
+        with timed_call(method) as call:
+            try:
+                yield call
+            finally:
+                with self._timings_lock:
+                    self.timings.append(call)
+
+    def timings_summary(self) -> dict[str, Any]:
+        with self._timings_lock:
+            return summarize_timings(list(self.timings))
+
+    def _record(self, err: Exception) -> str:
+        if isinstance(err, AIClientError):
             self.errors.append(
                 RuntimeAIError(message=str(err.message), code=str(err.code), status=int(err.status))
             )
-            return SAFE_PLACEHOLDER
-        except Exception:
+        else:
             self.errors.append(
                 RuntimeAIError(
                     message="Unexpected AI runtime error during model call.",
@@ -54,4 +100,98 @@ class CapturedAIClient:
                     status=500,
                 )
             )
-            return SAFE_PLACEHOLDER
+        return SAFE_PLACEHOLDER
+
+
+class CapturedAIClient(_ErrorCapture):
+    def __init__(self, inner: AIClientLike) -> None:
+        super().__init__(inner)
+        self.inner = inner
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    def chat(self, system: str, user: str, temperature: float = 0.2) -> str:
+        with self._timed("chat") as call:
+            try:
+                return self.inner.chat(system, user, temperature=temperature)
+            except Exception as err:
+                call.ok = False
+                return self._record(err)
+
+    def chat_json(
+        self, system: str, user: str, schema: dict[str, Any], temperature: float = 0.2
+    ) -> str:
+        with self._timed("chat_json") as call:
+            try:
+                return json_or_chat(self.inner, system, user, schema, temperature=temperature)
+            except Exception as err:
+                call.ok = False
+                return self._record(err)
+
+    def chat_stream(
+        self,
+        system: str,
+        user: str,
+        on_token: Callable[[str], None],
+        temperature: float = 0.2,
+    ) -> str:
+        with self._timed("chat_stream") as call:
+            try:
+                return stream_or_chat(self.inner, system, user, on_token, temperature=temperature)
+            except Exception as err:
+                call.ok = False
+                placeholder = self._record(err)
+                on_token(placeholder)
+                return placeholder
+
+
+class CapturedAsyncAIClient(_ErrorCapture):
+    def __init__(self, inner: AsyncAIClientLike) -> None:
+        super().__init__(inner)
+        self.inner = inner
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    async def chat(self, system: str, user: str, temperature: float = 0.2) -> str:
+        with self._timed("chat") as call:
+            try:
+                return await self.inner.chat(system, user, temperature=temperature)
+            except Exception as err:
+                call.ok = False
+                return self._record(err)
+
+    async def chat_json(
+        self, system: str, user: str, schema: dict[str, Any], temperature: float = 0.2
+    ) -> str:
+        chat_json = getattr(self.inner, "chat_json", None)
+        with self._timed("chat_json") as call:
+            try:
+                if chat_json is not None:
+                    return str(await chat_json(system, user, schema, temperature=temperature))
+                return await self.inner.chat(system, user, temperature=temperature)
+            except Exception as err:
+                call.ok = False
+                return self._record(err)
+
+    async def chat_stream(
+        self,
+        system: str,
+        user: str,
+        on_token: Callable[[str], None],
+        temperature: float = 0.2,
+    ) -> str:
+        chat_stream = getattr(self.inner, "chat_stream", None)
+        with self._timed("chat_stream") as call:
+            try:
+                if chat_stream is not None:
+                    return str(await chat_stream(system, user, on_token, temperature=temperature))
+                text = await self.inner.chat(system, user, temperature=temperature)
+            except Exception as err:
+                call.ok = False
+                placeholder = self._record(err)
+                on_token(placeholder)
+                return placeholder
+        on_token(text)
+        return text
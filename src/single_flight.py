@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import asdict, dataclass, field
+from typing import Any, Generic, TypeVar
+
+from src.chat_runtime import EventSink
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    leaders: int = 0
+    coalesced: int = 0
+    failures: int = 0
+
+
+def _wake(landed: asyncio.Future[None]) -> None:
+    if not landed.done():
+        landed.set_result(None)
+
+
+# Completion of work led by one caller: threads block on wait(), event-loop callers await
+# wait_async() and are woken on their own loop whichever thread finishes the work.
+class DoneSignal:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = []
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def set(self) -> None:
+        with self._lock:
+            self._event.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, landed in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, landed)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._event.wait(timeout)
+
+    async def wait_async(self, timeout: float | None = None) -> bool:
+        loop = asyncio.get_running_loop()
+        landed: asyncio.Future[None] = loop.create_future()
+        with self._lock:
+            if self._event.is_set():
+                return True
+            self._waiters.append((loop, landed))
+        try:
+            await asyncio.wait_for(landed, timeout)
+        except TimeoutError:
+            return False
+        return True
+
+
+@dataclass
+class _Flight(Generic[T]):
+    done: DoneSignal = field(default_factory=DoneSignal)
+    listeners: list[EventSink] = field(default_factory=list)
+    result: T | None = None
+    error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    def __init__(self) -> None:
+        self.stats = SingleFlightStats()
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight[T]] = {}
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {**asdict(self.stats), "in_flight": len(self._flights)}
+
+    def _broadcast(self, flight: _Flight[T]) -> EventSink:
+        def emit(event: str, data: dict[str, Any]) -> None:
+            with self._lock:
+                listeners = list(flight.listeners)
+            for listener in listeners:
+                listener(event, data)
+
+        return emit
+
+    def _join(self, key: Hashable, on_event: EventSink | None) -> tuple[_Flight[T], bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.stats.leaders += 1
+            else:
+                self.stats.coalesced += 1
+            if on_event is not None:
+                flight.listeners.append(on_event)
+        return flight, leader
+
+    def _land(self, key: Hashable, flight: _Flight[T], error: BaseException | None) -> None:
+        with self._lock:
+            if error is not None:
+                flight.error = error
+                self.stats.failures += 1
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    @staticmethod
+    def _shared(flight: _Flight[T]) -> tuple[T, bool]:
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, True  # type: ignore[return-value]
+
+    # The leader always emits through the broadcast sink, so a streaming caller that joins a
+    # non-streaming run still gets its events; callers that join later see the events
+    # emitted after they joined. Every caller gets the same result or exception.
+    def run(
+        self,
+        key: Hashable,
+        fn: Callable[[EventSink], T],
+        on_event: EventSink | None = None,
+    ) -> tuple[T, bool]:
+        flight, leader = self._join(key, on_event)
+        if not leader:
+            flight.done.wait()
+            return self._shared(flight)
+        try:
+            flight.result = fn(self._broadcast(flight))
+        except BaseException as err:
+            self._land(key, flight, err)
+            raise
+        self._land(key, flight, None)
+        return flight.result, False
+
+    # The same flights awaited from an event loop, so a waiting caller holds no thread.
+    async def run_async(
+        self,
+        key: Hashable,
+        fn: Callable[[EventSink], Awaitable[T]],
+        on_event: EventSink | None = None,
+    ) -> tuple[T, bool]:
+        flight, leader = self._join(key, on_event)
+        if not leader:
+            await flight.done.wait_async()
+            return self._shared(flight)
+        try:
+            flight.result = await fn(self._broadcast(flight))
+        except BaseException as err:
+            self._land(key, flight, err)
+            raise
+        self._land(key, flight, None)
+        return flight.result, False
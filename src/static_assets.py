@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+import threading
+from pathlib import Path
+from urllib.parse import unquote
+
+from src.static_responses import PreparedResponse, prepare
+
+# Asset URLs carry no content hash, so after a deploy browsers must find out from the ETag;
+# a revalidation that still matches costs a 304 with no body.
+ASSET_CACHE_CONTROL = "no-cache"
+
+
+def _content_type(path: Path) -> str:
+    guessed, _ = mimetypes.guess_type(path.name)
+    return guessed or "application/octet-stream"
+
+
+# Every file under the web root is read, hashed and gzip-compressed once at startup.
+# With reload on, each hit compares the file's mtime so edits show up without a restart.
+class StaticAssets:
+    def __init__(self, root: Path, reload: bool = False) -> None:
+        self.root = root.resolve()
+        self.reload = reload
+        self._lock = threading.Lock()
+        self._files: dict[str, tuple[PreparedResponse, int]] = {}
+        for path in sorted(self.root.rglob("*")):
+            if path.is_file() and path.resolve().is_relative_to(self.root):
+                self._load(path)
+
+    @classmethod
+    def from_env(cls, root: Path) -> StaticAssets:
+        return cls(root, reload=os.getenv("STATIC_RELOAD", "").strip().lower() in {"1", "true"})
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def _key(self, path: Path) -> str:
+        return "/" + path.relative_to(self.root).as_posix()
+
+    def _load(self, path: Path) -> PreparedResponse:
+        stat = path.stat()
+        prepared = prepare(path.read_bytes(), _content_type(path))
+        with self._lock:
+            self._files[self._key(path)] = (prepared, stat.st_mtime_ns)
+        return prepared
+
+    def _resolve(self, url_path: str) -> Path | None:
+        relative = unquote(url_path).lstrip("/")
+        if not relative or relative.endswith("/"):
+            relative += "index.html"
+        path = (self.root / relative).resolve()
+        if not path.is_relative_to(self.root):
+            return None
+        return path
+
+    def get(self, url_path: str) -> PreparedResponse | None:
+        # Keys are canonical URLs of files inside the root, so an exact match is safe to serve
+        # without resolving the path; anything else takes the checked route below.
+        cached = self._files.get(url_path + "index.html" if url_path.endswith("/") else url_path)
+        if cached is not None and not self.reload:
+            return cached[0]
+        path = self._resolve(url_path)
+        if path is None:
+            return None
+        key = self._key(path)
+        cached = self._files.get(key)
+        if not self.reload:
+            return cached[0] if cached else None
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._files.pop(key, None)
+            return None
+        if cached is not None and cached[1] == mtime:
+            return cached[0]
+        return self._load(path) if path.is_file() else None
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import importlib
+import json
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    _brotli: Any = importlib.import_module("brotli")
+except ImportError:
+    _brotli = None
+
+# Preferred order when a client accepts several encodings equally.
+ENCODINGS = ("br", "gzip", "identity")
+
+
+@dataclass(frozen=True)
+class Variant:
+    body: bytes
+    etag: str
+
+
+@dataclass(frozen=True)
+class PreparedResponse:
+    content_type: str
+    variants: dict[str, Variant]
+
+    def select(self, accept_encoding: str | None) -> tuple[str, Variant]:
+        encoding = negotiate_encoding(accept_encoding, tuple(self.variants))
+        return encoding, self.variants[encoding]
+
+    def not_modified(self, if_none_match: str | None) -> bool:
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or any(v.etag in tags for v in self.variants.values())
+
+
+def _compress(encoding: str, body: bytes) -> bytes | None:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == "br" and _brotli is not None:
+        return bytes(_brotli.compress(body, quality=11))
+    return None
+
+
+def prepare(body: bytes, content_type: str) -> PreparedResponse:
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    variants = {"identity": Variant(body, f'"{digest}"')}
+    for encoding in ENCODINGS[:-1]:
+        compressed = _compress(encoding, body)
+        # Each representation gets its own strong tag; tiny bodies are not worth encoding.
+        if compressed is not None and len(compressed) < len(body):
+            variants[encoding] = Variant(compressed, f'"{digest}-{encoding}"')
+    return PreparedResponse(content_type, variants)
+
+
+def prepare_json(payload: Any) -> PreparedResponse:
+    return prepare(json.dumps(payload).encode(), "application/json")
+
+
+def _quality(params: list[str]) -> float:
+    for param in params:
+        name, _, value = param.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate_encoding(accept_encoding: str | None, available: tuple[str, ...]) -> str:
+    weights: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        name, *params = item.split(";")
+        if name.strip():
+            weights[name.strip().lower()] = _quality(params)
+    wildcard = weights.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    # Ties go to the earlier entry in ENCODINGS, so compressed bodies win over identity.
+    for encoding in ENCODINGS:
+        default = 1.0 if encoding == "identity" and "*" not in weights else wildcard
+        q = weights.get(encoding, default)
+        if encoding in available and q > best_q:
+            best, best_q = encoding, q
+    return best
@@ -10,3 +10,12 @@ class AIChatClient(Protocol):
     def available(self) -> bool: ...
 
     def chat(self, system: str, user: str, temperature: float = 0.2) -> str: ...
+
+
+class AsyncAIChatClient(Protocol):
+    model: str
+    base_url: str
+
+    def available(self) -> bool: ...
+
+    async def chat(self, system: str, user: str, temperature: float = 0.2) -> str: ...
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class WorkerPoolStats:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    inline: int = 0
+    nested: int = 0
+    nested_inline: int = 0
+    max_queue_depth: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+@dataclass
+class _Job:
+    fn: Callable[[], Any]
+    future: Future[Any]
+    queued_at: float
+
+
+_in_pool = threading.local()
+
+
+class FairWorkerPool:
+    def __init__(self, max_workers: int = 16) -> None:
+        self.max_workers = max(1, max_workers)
+        self.stats = WorkerPoolStats()
+        # One FIFO per run, visited round-robin, so a run with many queued calls cannot
+        # starve a run that just arrived.
+        self._queues: OrderedDict[Hashable, deque[_Job]] = OrderedDict()
+        self._depth = 0
+        self._threads: list[threading.Thread] = []
+        self._idle = 0
+        self._active = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls) -> FairWorkerPool:
+        return cls(max_workers=int(os.getenv("WORKER_POOL_SIZE", "16")))
+
+    def snapshot(self) -> dict[str, float]:
+        with self._cond:
+            done = self.stats.completed + self.stats.failed
+            return {
+                **asdict(self.stats),
+                "wait_seconds_total": round(self.stats.wait_seconds_total, 4),
+                "wait_seconds_max": round(self.stats.wait_seconds_max, 4),
+                "wait_seconds_avg": round(self.stats.wait_seconds_total / done, 4) if done else 0.0,
+                "queue_depth": self._depth,
+                "queued_runs": len(self._queues),
+                "active": self._active,
+                "threads": len(self._threads),
+                "max_workers": self.max_workers,
+            }
+
+    def submit(self, key: Hashable, fn: Callable[[], T]) -> Future[T]:
+        future: Future[T] = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("worker pool is closed")
+            self._queues.setdefault(key, deque()).append(_Job(fn, future, time.perf_counter()))
+            self._depth += 1
+            self.stats.submitted += 1
+            self.stats.max_queue_depth = max(self.stats.max_queue_depth, self._depth)
+            if self._depth > self._idle and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, name="fair-worker", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    @staticmethod
+    def on_worker_thread() -> bool:
+        return bool(getattr(_in_pool, "active", False))
+
+    def call(self, key: Hashable, fn: Callable[[], T]) -> T:
+        # Work already running on a pool thread holds a slot; queueing it again could
+        # deadlock once every slot is waiting on queued children.
+        if self.on_worker_thread():
+            with self._cond:
+                self.stats.inline += 1
+            return fn()
+        return self.submit(key, fn).result()
+
+    def submit_nested(self, key: Hashable, fn: Callable[[], T]) -> Future[T]:
+        future = self.submit(key, fn)
+        with self._cond:
+            self.stats.nested += 1
+        return future
+
+    # A pool thread waiting on its own nested work runs whatever is still queued itself, so
+    # free slots pick children up in parallel and a full pool cannot deadlock on them.
+    def run_if_queued(self, future: Future[Any]) -> bool:
+        with self._cond:
+            job = self._take_locked(future)
+            if job is None:
+                return False
+            self.stats.nested_inline += 1
+        self._run_job(job)
+        return True
+
+    def wait_nested(self, future: Future[T]) -> T:
+        self.run_if_queued(future)
+        return future.result()
+
+    def _take_locked(self, future: Future[Any]) -> _Job | None:
+        for key, queue in self._queues.items():
+            for job in queue:
+                if job.future is future:
+                    queue.remove(job)
+                    if not queue:
+                        del self._queues[key]
+                    self._depth -= 1
+                    return job
+        return None
+
+    def _next_job_locked(self) -> _Job:
+        key, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(key)
+        else:
+            del self._queues[key]
+        self._depth -= 1
+        return job
+
+    def _work(self) -> None:
+        _in_pool.active = True
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._queues and not self._closed:
+                    self._cond.wait()
+                self._idle -= 1
+                if not self._queues:
+                    return
+                job = self._next_job_locked()
+                waited = time.perf_counter() - job.queued_at
+                self.stats.wait_seconds_total += waited
+                self.stats.wait_seconds_max = max(self.stats.wait_seconds_max, waited)
+                self._active += 1
+            self._run_job(job)
+            with self._cond:
+                self._active -= 1
+
+    def _run_job(self, job: _Job) -> None:
+        ok = False
+        if job.future.set_running_or_notify_cancel():
+            try:
+                job.future.set_result(job.fn())
+                ok = True
+            except BaseException as err:
+                job.future.set_exception(err)
+        with self._cond:
+            if ok:
+                self.stats.completed += 1
+            else:
+                self.stats.failed += 1
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+_shared: FairWorkerPool | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_worker_pool() -> FairWorkerPool:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = FairWorkerPool.from_env()
+        return _shared
+
+
+_upstream_slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+# Runs on an event loop hold no pool thread, so their upstream calls take one of the same
+# number of slots from a per-loop semaphore instead.
+def shared_upstream_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _upstream_slots.get(loop)
+    if slots is None:
+        slots = _upstream_slots[loop] = asyncio.Semaphore(shared_worker_pool().max_workers)
+    return slots
@@ -1,4 +1,20 @@
 import sys
 from pathlib import Path
 
-sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+# The must-gather analyzer is only kept as its built package.
+sys.path.insert(0, str(ROOT / "build" / "lib"))
+
+
+@pytest.fixture(autouse=True)
+def _isolated_upstream_guards(monkeypatch):
+    from src.resilience import reset_breakers
+
+    # Breakers are process-wide; keep one test's failures from opening another's circuit.
+    monkeypatch.setenv("OPENAI_RETRY_BASE_SECONDS", "0")
+    reset_breakers()
+    yield
+    reset_breakers()
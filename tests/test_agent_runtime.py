@@ -1,4 +1,14 @@
-from src.agent_runtime import choose_next_action, run_constrained_agent_loop
+from src.agent_runtime import (
+    DECISION_SCHEMA,
+    AgentStep,
+    TraceBudget,
+    choose_next_action,
+    compact_trace,
+    decision_parse_snapshot,
+    estimate_tokens,
+    extract_json_object,
+    run_constrained_agent_loop,
+)
 from src.tools import calculator_tool, retrieve_local_facts
 
 
@@ -68,3 +78,95 @@ def test_max_iteration_fallback():
     )
     assert result["stopped_on_finish"] is False
     assert result["final_answer"] == "best effort"
+
+
+class RecordingClient:
+    def __init__(self):
+        self.contexts: list[str] = []
+
+    def chat(self, prompt, context):
+        self.contexts.append(context)
+        if "Max iterations" in prompt:
+            return "best effort"
+        return '{"action":"research","input":"postgres","reason":"collect","final":""}'
+
+
+def _long_retrieve(_query):
+    return "observation " * 400
+
+
+def test_compact_trace_keeps_recent_steps_and_summarises_older_ones():
+    trace = [AgentStep(i, "research", "why", f"q{i}", f"obs {i} " * 200) for i in range(1, 9)]
+    text = compact_trace(trace, TraceBudget(recent_steps=2, observation_chars=100))
+    lines = text.splitlines()
+    assert lines[0].startswith("Earlier steps #1-#6 summarised (research x6)")
+    assert lines[1].startswith("#7 action=research") and lines[2].startswith("#8 ")
+    assert all(len(line) < 700 for line in lines[1:])
+    assert compact_trace([]) == "(empty)"
+
+
+def test_compact_trace_over_budget_clips_the_observation_not_the_header():
+    trace = [AgentStep(i, "research", "why", f"q{i}", f"obs {i} " * 400) for i in range(1, 6)]
+    budget = TraceBudget(recent_steps=2, observation_chars=2000, max_tokens=200)
+    text = compact_trace(trace, budget)
+    lines = text.splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith("Earlier steps #1-#4 summarised (research x4)")
+    assert lines[1].startswith("#5 action=research reason=why input=q5 observation=obs 5")
+    assert lines[1].endswith("...")
+    assert estimate_tokens(text) <= budget.max_tokens
+
+
+def test_controller_prompt_size_stays_flat_as_iterations_grow():
+    sizes = {}
+    for iterations in (20, 60):
+        client = RecordingClient()
+        result = run_constrained_agent_loop(
+            client, "obj", _long_retrieve, str, max_iterations=iterations
+        )
+        sizes[iterations] = max(estimate_tokens(c) for c in client.contexts)
+        assert result["context_tokens"] <= TraceBudget().max_tokens + 200
+    assert sizes[60] <= sizes[20] * 1.05
+    assert sizes[60] <= TraceBudget().max_tokens + 200
+
+
+def test_extractor_recovers_objects_from_prose_and_fences():
+    fenced = 'Sure!\n```json\n{"action": "finish", "input": "", "reason": "r", "final": "ok"}\n```'
+    assert extract_json_object(fenced) == (
+        {"action": "finish", "input": "", "reason": "r", "final": "ok"},
+        True,
+    )
+    assert extract_json_object('{"a": 1}') == ({"a": 1}, False)
+    assert extract_json_object('note {broken} then {"a": {"b": 2}} end') == ({"a": {"b": 2}}, True)
+    assert extract_json_object("[1, 2]") == (None, False)
+    assert extract_json_object("no json here") == (None, False)
+
+
+def test_prose_wrapped_reply_skips_the_correction_round_trip():
+    before = decision_parse_snapshot()
+    client = SequenceClient(
+        ['I pick: {"action":"research","input":"q","reason":"facts","final":""} as planned']
+    )
+    decision = choose_next_action(client, "obj", [], "")
+    after = decision_parse_snapshot()
+    assert decision.action == "research"
+    assert client.responses == []
+    assert after["retries_saved"] == before["retries_saved"] + 1
+    assert after["correction_retries"] == before["correction_retries"]
+
+
+def test_structured_output_is_requested_when_the_client_supports_it():
+    class JsonClient:
+        def __init__(self):
+            self.schemas = []
+
+        def chat(self, _prompt, _context):
+            raise AssertionError("plain chat should not be used")
+
+        def chat_json(self, _prompt, _context, schema):
+            self.schemas.append(schema)
+            return '{"action":"finish","input":"","reason":"done","final":"ok"}'
+
+    client = JsonClient()
+    assert choose_next_action(client, "obj", [], "").final == "ok"
+    assert client.schemas == [DECISION_SCHEMA]
@@ -1,9 +1,11 @@
 import io
+import json
 from urllib.error import HTTPError, URLError
 
 import pytest
 
 import src.ai_client as ai
+from src.agent_runtime import choose_next_action
 from src.ai_client import AIClient, AIClientError
 
 
@@ -32,6 +34,34 @@ def test_build_chat_payload_shape():
     assert "reasoning" not in payload
 
 
+def test_chat_json_sends_a_strict_json_schema_response_format(monkeypatch):
+    sent = {}
+
+    class Resp:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *_a):
+            return False
+
+        def read(self):
+            return b'{"choices":[{"message":{"content":"{}"}}]}'
+
+    def fake_urlopen(request, **_kwargs):
+        sent.update(json.loads(request.data))
+        return Resp()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setattr(ai, "urlopen", fake_urlopen)
+    schema = {"type": "object", "properties": {}}
+    assert AIClient().chat_json("s", "u", schema) == "{}"
+    assert sent["response_format"] == {
+        "type": "json_schema",
+        "json_schema": {"name": "response", "schema": schema, "strict": True},
+    }
+    assert "response_format" not in AIClient()._build_chat_payload("s", "u", 0.2)
+
+
 def test_ai_client_unavailable_raises(monkeypatch):
     monkeypatch.delenv("OPENAI_API_KEY", raising=False)
     with pytest.raises(AIClientError, match="OPENAI_API_KEY"):
@@ -109,3 +139,64 @@ def test_ai_client_unexpected_schema(monkeypatch):
     with pytest.raises(AIClientError) as err:
         AIClient().chat("s", "u")
     assert err.value.code == "upstream_schema"
+
+
+class _SchemaRejectingUpstream:
+    def __init__(self, content: str):
+        self.content = content
+        self.payloads: list[dict] = []
+
+    def __call__(self, request, **_kwargs):
+        payload = json.loads(request.data)
+        self.payloads.append(payload)
+        if "response_format" in payload:
+            raise HTTPError("u", 400, "bad request", {}, io.BytesIO(b'{"error":"json_schema"}'))
+        body = json.dumps({"choices": [{"message": {"content": self.content}}]}).encode()
+
+        class Resp:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *_a):
+                return False
+
+            def read(self):
+                return body
+
+        return Resp()
+
+
+def test_chat_json_falls_back_to_plain_chat_when_the_provider_rejects_the_schema(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setattr(ai, "_schema_rejected", set())
+    upstream = _SchemaRejectingUpstream('Sure: ```json\n{"action":"finish"}\n```')
+    monkeypatch.setattr(ai, "urlopen", upstream)
+
+    assert AIClient().chat_json("s", "u", {"type": "object"}).endswith("```")
+    assert ["response_format" in p for p in upstream.payloads] == [True, False]
+    # The provider is remembered, so later calls skip the doomed structured request.
+    AIClient().chat_json("s", "u", {"type": "object"})
+    assert ["response_format" in p for p in upstream.payloads] == [True, False, False]
+
+
+def test_controller_still_parses_free_text_from_a_provider_without_structured_output(
+    monkeypatch,
+):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setattr(ai, "_schema_rejected", set())
+    upstream = _SchemaRejectingUpstream(
+        'Here you go: {"action":"finish","input":"","reason":"done","final":"answer"}'
+    )
+    monkeypatch.setattr(ai, "urlopen", upstream)
+    decision = choose_next_action(AIClient(), "objective", [], "")
+    assert decision.action == "finish" and decision.final == "answer"
+
+
+def test_structured_output_can_be_switched_off(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_STRUCTURED_OUTPUT", "0")
+    monkeypatch.setattr(ai, "_schema_rejected", set())
+    upstream = _SchemaRejectingUpstream("{}")
+    monkeypatch.setattr(ai, "urlopen", upstream)
+    assert AIClient().chat_json("s", "u", {"type": "object"}) == "{}"
+    assert len(upstream.payloads) == 1 and "response_format" not in upstream.payloads[0]
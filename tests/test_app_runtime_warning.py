@@ -30,7 +30,7 @@ def test_api_run_returns_structured_warning_when_model_calls_fail(monkeypatch):
     from src.ai_client import AIClientError
 
     class FakeAIClient:
-        def __init__(self):
+        def __init__(self, **_kwargs):
             self.model = "gpt-4.1-mini"
             self.base_url = "https://api.openai.com/v1"
 
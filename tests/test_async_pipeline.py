@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.ai_client import AIClientError, AsyncAIClient
+from src.chat_runtime import AsyncChatRuntime
+from src.constants import LEVELS
+from src.levels import async_run_level, run_level
+from src.runtime_client import SAFE_PLACEHOLDER, CapturedAsyncAIClient
+
+
+class AsyncFakeClient:
+    model = "fake-model"
+    base_url = "http://fake"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def available(self):
+        return True
+
+    async def chat(self, system, _user, temperature=0.2):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        p = system.lower()
+        if "verifier" in p:
+            return "supported: objective covered"
+        if "merger" in p:
+            return "merged answer"
+        return '{"action":"finish","input":"","reason":"done","final":"async answer"}'
+
+
+class SyncFakeClient:
+    def available(self):
+        return True
+
+    def chat(self, system, user):
+        return asyncio.run(AsyncFakeClient().chat(system, user))
+
+
+def test_async_run_level_matches_sync_shape_for_all_levels():
+    for level in LEVELS:
+        async_payload = asyncio.run(async_run_level(level, AsyncFakeClient()))
+        sync_payload = run_level(level, SyncFakeClient())
+        assert async_payload["level"] == level
+        assert set(async_payload) == set(sync_payload)
+        assert async_payload["theatre_steps"]
+
+
+def test_async_run_level_holds_many_runs_without_extra_threads():
+    client = AsyncFakeClient(delay=0.05)
+    threads_before = threading.active_count()
+
+    async def _many():
+        return await asyncio.gather(*(async_run_level(4, client) for _ in range(200)))
+
+    started = time.perf_counter()
+    payloads = asyncio.run(_many())
+    elapsed = time.perf_counter() - started
+    assert len(payloads) == 200
+    assert threading.active_count() <= threads_before + 1
+    assert elapsed < 5
+
+
+def test_async_level8_runs_workers_concurrently():
+    client = AsyncFakeClient(delay=0.2)
+    started = time.perf_counter()
+    payload = asyncio.run(async_run_level(8, client))
+    elapsed = time.perf_counter() - started
+    assert payload["approval_summary"]["approved"] is True
+    # four workers in parallel plus verifier and merger: three round trips, not six
+    assert elapsed < 1.0
+
+
+def test_captured_async_client_returns_placeholder_on_error():
+    class Failing:
+        def available(self):
+            return True
+
+        async def chat(self, *_args, **_kwargs):
+            raise AIClientError("down", code="upstream_http", status=502)
+
+    wrapper = CapturedAsyncAIClient(Failing())
+    payload = asyncio.run(async_run_level(2, wrapper))
+    assert payload["lines"]
+    assert wrapper.has_errors
+    assert asyncio.run(wrapper.chat("s", "u")) == SAFE_PLACEHOLDER
+
+
+class ChunkedChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_args):
+        return None
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        if self.path.startswith("/fail"):
+            body = b'{"error":"nope"}'
+            self.send_response(503)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path.startswith("/sse"):
+            events = [
+                {"choices": [{"delta": {"content": "Hel"}}]},
+                {"choices": [{"delta": {"content": "lo"}}]},
+                {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2}},
+            ]
+            stream = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+            raw = stream.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            # Chunk boundaries deliberately fall inside SSE lines.
+            for part in (raw[i : i + 7] for i in range(0, len(raw), 7)):
+                self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        if self.path.startswith("/interim"):
+            self.wfile.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            self.wfile.write(b"HTTP/1.1 103 Early Hints\r\nLink: </style.css>\r\n\r\n")
+        body = json.dumps({"choices": [{"message": {"content": "async hello"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for part in (body[:10], body[10:]):
+            self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture()
+def chunked_upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChunkedChatHandler)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_async_ai_client_reuses_connection_and_maps_errors(monkeypatch, chunked_upstream):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_BASE_URL", chunked_upstream)
+
+    async def _run():
+        client = AsyncAIClient()
+        first = await client.chat("s", "u")
+        second = await client.chat("s", "u")
+        stats = client.pool.snapshot()
+        client.pool.close()
+        return first, second, stats
+
+    first, second, stats = asyncio.run(_run())
+    assert first == second == "async hello"
+    assert stats["created"] == 1 and stats["reused"] == 1
+
+    async def _fail():
+        client = AsyncAIClient()
+        try:
+            return await client.chat("s", "u")
+        finally:
+            client.pool.close()
+
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{chunked_upstream}/fail")
+    with pytest.raises(AIClientError) as err:
+        asyncio.run(_fail())
+    assert err.value.code == "upstream_http"
+
+
+def test_async_ai_client_skips_interim_responses(monkeypatch, chunked_upstream):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{chunked_upstream}/interim")
+
+    async def _run():
+        client = AsyncAIClient()
+        try:
+            replies = [await client.chat("s", "u") for _ in range(2)]
+            return replies, client.pool.snapshot()
+        finally:
+            client.pool.close()
+
+    replies, stats = asyncio.run(_run())
+    assert replies == ["async hello"] * 2
+    assert stats["created"] == 1 and stats["reused"] == 1
+
+
+def test_async_ai_client_streams_token_deltas(monkeypatch, chunked_upstream):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{chunked_upstream}/sse")
+
+    async def _run():
+        client = AsyncAIClient()
+        tokens: list[str] = []
+        try:
+            texts = [await client.chat_stream("s", "u", tokens.append) for _ in range(2)]
+            return texts, tokens, client.pool.snapshot()
+        finally:
+            client.pool.close()
+
+    texts, tokens, stats = asyncio.run(_run())
+    assert texts == ["Hello", "Hello"]
+    assert tokens == ["Hel", "lo", "Hel", "lo"]
+    assert stats["created"] == 1 and stats["reused"] == 1
+
+
+def test_async_runtime_bounds_concurrent_upstream_calls():
+    active = 0
+    peak = 0
+
+    class Counting(AsyncFakeClient):
+        async def chat(self, system, _user, temperature=0.2):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return "ok"
+
+    async def _run():
+        runtime = AsyncChatRuntime(Counting(), slots=asyncio.Semaphore(2))
+        return await runtime.gather([runtime.chat("s", str(i)) for i in range(6)])
+
+    assert asyncio.run(_run()) == ["ok"] * 6
+    assert peak == 2
+
+
+def test_async_ai_client_requires_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(AIClientError, match="OPENAI_API_KEY"):
+        asyncio.run(AsyncAIClient().chat("s", "u"))
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.client import HTTPConnection
+
+import pytest
+
+import app
+from src.async_server import AsyncHTTPServer
+from src.rate_limit import RateLimiter
+from src.single_flight import SingleFlight
+
+
+class GatedClient:
+    release = threading.Event()
+    started = threading.Event()
+    threads: set[int] = set()
+    cancelled = 0
+
+    def __init__(self, **_kwargs):
+        self.model = "fake-model"
+        self.base_url = "http://fake"
+
+    def available(self):
+        return True
+
+    async def chat(self, _system, _user, temperature=0.2):
+        cls = type(self)
+        cls.threads.add(threading.get_ident())
+        cls.started.set()
+        try:
+            for _ in range(500):
+                if cls.release.is_set():
+                    break
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cls.cancelled += 1
+            raise
+        return '{"action":"finish","input":"","reason":"done","final":"answer"}'
+
+
+@pytest.fixture()
+def serve(monkeypatch):
+    GatedClient.release = threading.Event()
+    GatedClient.started = threading.Event()
+    GatedClient.threads = set()
+    GatedClient.cancelled = 0
+    monkeypatch.setattr(app, "AsyncAIClient", GatedClient)
+    monkeypatch.setattr(app, "RUN_FLIGHTS", SingleFlight())
+    monkeypatch.setattr(app, "RATE_LIMITER", RateLimiter(max_requests=1000, sweep_seconds=0))
+    app.RESPONSE_CACHE.clear()
+    servers: list[tuple[AsyncHTTPServer, threading.Thread]] = []
+
+    def _start(**kwargs) -> AsyncHTTPServer:
+        server = AsyncHTTPServer(app.Handler, "127.0.0.1", 0, **kwargs)
+        thread = threading.Thread(target=lambda: asyncio.run(server.serve()), daemon=True)
+        thread.start()
+        assert server.ready.wait(5)
+        servers.append((server, thread))
+        return server
+
+    yield _start
+    GatedClient.release.set()
+    for server, thread in servers:
+        server.shutdown()
+        thread.join(10)
+
+
+def _post_run(conn: HTTPConnection, context: str, path: str = "/api/run"):
+    body = json.dumps({"level": 1, "use_case": "custom", "use_case_context": context})
+    conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return resp, resp.read()
+
+
+def test_keep_alive_serves_several_routes_on_one_connection(serve):
+    GatedClient.release.set()
+    server = serve()
+    conn = HTTPConnection("127.0.0.1", server.port, timeout=5)
+    conn.request("GET", "/healthz")
+    first = conn.getresponse()
+    assert first.status == 200 and json.loads(first.read()) == {"status": "ok"}
+    sock = conn.sock
+
+    conn.request("GET", "/api/levels", headers={"Accept-Encoding": "gzip"})
+    resp = conn.getresponse()
+    resp.read()
+    assert resp.status == 200 and resp.getheader("Content-Encoding") == "gzip"
+
+    resp, body = _post_run(conn, "keep alive run")
+    assert resp.status == 200 and json.loads(body)["level"] == 1
+    assert conn.sock is sock
+    conn.close()
+
+
+def test_streaming_runs_work_over_the_event_loop(serve):
+    GatedClient.release.set()
+    server = serve()
+    conn = HTTPConnection("127.0.0.1", server.port, timeout=5)
+    resp, body = _post_run(conn, "stream run", "/api/run/stream")
+    text = body.decode()
+    assert resp.status == 200
+    assert text.index("event: started") < text.index("event: result") < text.index("event: done")
+
+
+def test_runs_beyond_capacity_get_503_with_retry_after(serve):
+    server = serve(max_runs=1, retry_after_seconds=7)
+    holder = threading.Thread(
+        target=lambda: _post_run(HTTPConnection("127.0.0.1", server.port, timeout=10), "a")
+    )
+    holder.start()
+    assert GatedClient.started.wait(5)
+
+    conn = HTTPConnection("127.0.0.1", server.port, timeout=5)
+    resp, body = _post_run(conn, "b")
+    assert resp.status == 503
+    assert resp.getheader("Retry-After") == "7"
+    assert json.loads(body)["code"] == "overloaded"
+
+    conn.request("GET", "/healthz")
+    assert conn.getresponse().status == 200
+
+    GatedClient.release.set()
+    holder.join(10)
+
+
+def test_sigterm_drain_finishes_in_flight_runs_and_stops_accepting(serve):
+    server = serve(drain_seconds=10)
+    result: dict[str, object] = {}
+
+    def _run() -> None:
+        resp, body = _post_run(HTTPConnection("127.0.0.1", server.port, timeout=10), "drain")
+        result.update(status=resp.status, connection=resp.getheader("Connection"), body=body)
+
+    holder = threading.Thread(target=_run)
+    holder.start()
+    assert GatedClient.started.wait(5)
+    idle = HTTPConnection("127.0.0.1", server.port, timeout=5)
+    idle.connect()
+
+    server.shutdown()
+    deadline = time.monotonic() + 5
+    while not server.draining and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(OSError):
+        HTTPConnection("127.0.0.1", server.port, timeout=1).request("GET", "/healthz")
+
+    GatedClient.release.set()
+    holder.join(10)
+    assert result["status"] == 200
+    assert result["connection"] == "close"
+    assert json.loads(result["body"])["level"] == 1
+
+
+def test_runs_are_awaited_on_the_event_loop_without_a_thread_each(serve):
+    server = serve()
+    results: list[int] = []
+    before = threading.active_count()
+    holders = [
+        threading.Thread(
+            target=lambda i=i: results.append(
+                _post_run(HTTPConnection("127.0.0.1", server.port, timeout=10), f"run {i}")[
+                    0
+                ].status
+            )
+        )
+        for i in range(40)
+    ]
+    for holder in holders:
+        holder.start()
+    deadline = time.monotonic() + 5
+    while server.runs < 40 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.runs == 40
+    # Only the client threads started here are new; the server added none for its runs.
+    assert threading.active_count() <= before + 40
+    assert len(GatedClient.threads) == 1
+
+    GatedClient.release.set()
+    for holder in holders:
+        holder.join(10)
+    assert results == [200] * 40
+
+
+def test_drain_cancels_runs_that_outlive_the_grace_period(serve):
+    server = serve(drain_seconds=0.2)
+    errors: list[OSError] = []
+
+    def _run() -> None:
+        try:
+            _post_run(HTTPConnection("127.0.0.1", server.port, timeout=10), "stuck")
+        except OSError as err:
+            errors.append(err)
+
+    holder = threading.Thread(target=_run)
+    holder.start()
+    assert GatedClient.started.wait(5)
+
+    server.shutdown()
+    deadline = time.monotonic() + 5
+    while server.snapshot()["connections"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.snapshot() == {"connections": 0, "runs": 0, "max_runs": 256, "draining": True}
+    assert GatedClient.cancelled == 1
+    holder.join(5)
+    assert len(errors) == 1
+
+
+class StreamingClient(GatedClient):
+    async def chat_stream(self, _system, _user, on_token, temperature=0.2):
+        parts = ['{"action":"finish",', '"input":"","reason":"done",', '"final":"answer"}']
+        for part in parts:
+            on_token(part)
+            await asyncio.sleep(0)
+        return "".join(parts)
+
+
+def test_streaming_runs_send_token_deltas_from_the_upstream(serve, monkeypatch):
+    monkeypatch.setattr(app, "AsyncAIClient", StreamingClient)
+    server = serve()
+    conn = HTTPConnection("127.0.0.1", server.port, timeout=5)
+    resp, body = _post_run(conn, "token deltas", "/api/run/stream")
+    deltas = [
+        json.loads(frame.split("data: ", 1)[1])["delta"]
+        for frame in body.decode().split("\n\n")
+        if frame.startswith("event: token")
+    ]
+    assert resp.status == 200
+    assert deltas[:3] == ['{"action":"finish",', '"input":"","reason":"done",', '"final":"answer"}']
@@ -0,0 +1,57 @@
+import json
+
+from scripts.benchmark import UpstreamProfile, main, parse_levels, percentile, run_benchmark
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+    assert parse_levels("1-3,8") == [1, 2, 3, 8]
+
+
+def test_benchmark_drives_levels_against_the_fake_upstream():
+    report = run_benchmark(
+        [1, 4, 8],
+        requests_per_level=2,
+        concurrency=3,
+        profile=UpstreamProfile(latency_ms=5, jitter_ms=0, error_rate=0.0, seed=1),
+    )
+    assert report["requests"] == report["ok"] == 6
+    assert report["status_counts"] == {"200": 6}
+    assert report["requests_per_second"] > 0
+    assert set(report["latency_ms"]) == {"p50", "p95", "p99", "mean", "max"}
+    assert report["per_level"]["1"]["upstream_calls_per_run"] == 1
+    assert report["per_level"]["8"]["upstream_calls_per_run"] > 1
+    assert report["upstream"]["calls"] > 0
+    assert report["threads"]["peak_active"] > 0
+    assert "worker_pool" in report["server_stats"]
+
+
+def test_injected_upstream_errors_are_retried_and_reported(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    code = main(
+        [
+            "--levels",
+            "2",
+            "--requests-per-level",
+            "3",
+            "--latency-ms",
+            "0",
+            "--jitter-ms",
+            "0",
+            "--error-rate",
+            "0.3",
+            "--seed",
+            "7",
+            "--output",
+            str(out),
+        ]
+    )
+    report = json.loads(out.read_text())
+    assert json.loads(capsys.readouterr().out) == report
+    assert code == 0
+    assert report["upstream"]["injected_errors"] > 0
+    assert report["server_stats"]["upstream_resilience"]["retries"] > 0
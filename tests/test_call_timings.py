@@ -0,0 +1,73 @@
+import json
+from urllib.request import Request, urlopen
+
+from scripts.benchmark import FakeUpstream, UpstreamProfile, in_process_app
+from src.ai_client import AIClientError
+from src.call_timings import call_site, record_upstream, record_usage
+from src.levels import run_level
+from src.runtime_client import CapturedAIClient
+
+
+class MeteredInner:
+    def available(self):
+        return True
+
+    def chat(self, system, user, temperature=0.2):
+        if "fail" in system:
+            raise AIClientError("boom", code="upstream_http", status=502)
+        record_upstream(len(system) + len(user), 40)
+        record_usage({"prompt_tokens": 12, "completion_tokens": 3})
+        return "supported: ok"
+
+
+def test_wrapper_records_site_bytes_usage_and_failures():
+    client = CapturedAIClient(MeteredInner())
+    with call_site(level=4):
+        with call_site(action="retrieve_evidence"):
+            client.chat("answer", "q")
+        with call_site(action="fail"):
+            client.chat("fail", "q")
+    summary = client.timings_summary()
+    assert summary["calls"] == 2 and summary["failed"] == 1
+    assert summary["prompt_tokens"] == 12 and summary["completion_tokens"] == 3
+    assert summary["request_bytes"] == 7 and summary["response_bytes"] == 40
+    sites = {s["site"]: s for s in summary["by_site"]}
+    assert sites["level 4 / retrieve_evidence"]["upstream_calls"] == 1
+    assert sites["level 4 / fail"]["upstream_calls"] == 0
+    assert summary["per_call"][1]["ok"] is False
+
+
+def test_call_sites_follow_level8_workers_onto_pool_threads():
+    client = CapturedAIClient(MeteredInner())
+    run_level(8, client)
+    sites = {s["site"] for s in client.timings_summary()["by_site"]}
+    assert {
+        "level 8 / planner",
+        "level 8 / researcher",
+        "level 8 / content_writer",
+        "level 8 / critic",
+        "level 8 / verifier",
+        "level 8 / merger",
+    } <= sites
+
+
+def test_run_payload_carries_timings_from_upstream_usage():
+    upstream = FakeUpstream(UpstreamProfile(latency_ms=0, jitter_ms=0)).start()
+    try:
+        with in_process_app(upstream) as base:
+            run = {"level": 7, "use_case": "uk_year10_teacher", "use_case_context": "timings"}
+            body = json.dumps(run).encode()
+            request = Request(
+                f"{base}/api/run", data=body, headers={"Content-Type": "application/json"}
+            )
+            with urlopen(request, timeout=30) as response:
+                payload = json.loads(response.read())
+    finally:
+        upstream.stop()
+    timings = payload["timings"]
+    assert timings["calls"] == upstream.calls
+    assert timings["prompt_tokens"] > 0 and timings["completion_tokens"] > 0
+    assert timings["request_bytes"] > 0 and timings["response_bytes"] > 0
+    sites = {s["site"] for s in timings["by_site"]}
+    assert {"level 7 / choose_next_action", "level 7 / final_verification"} <= sites
+    assert timings["slowest_site"] in sites
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import src.ai_client as ai
+from src.ai_client import AIClient
+from src.chat_runtime import SyncChatRuntime, run_sync
+from src.deadline import DEADLINE_PLACEHOLDER, Deadline, bound, call_timeout
+from src.levels import async_run_level, run_level
+from src.worker_pool import FairWorkerPool
+
+
+class SlowClient:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    def available(self):
+        return True
+
+    def chat(self, system, _user):
+        self.calls += 1
+        time.sleep(self.delay)
+        if "verifier" in system.lower():
+            return "supported: covered"
+        return '{"action":"research","input":"facts","reason":"need evidence","final":""}'
+
+
+def test_level7_stops_with_flagged_partial_payload_when_budget_is_spent():
+    full = SlowClient(delay=0)
+    run_level(7, full)
+
+    client = SlowClient(delay=0.1)
+    started = time.perf_counter()
+    payload = run_level(7, client, deadline=Deadline(0.25))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0
+    assert client.calls < full.calls
+    assert payload["partial"] is True
+    assert payload["deadline"]["exceeded"] is True
+    assert payload["approval_summary"]["final_status"] == "needs_human_review"
+    assert any(step["label"] == "Time budget reached" for step in payload["theatre_steps"])
+    assert "Time budget reached: this output is partial." in payload["lines"]
+
+
+def test_level8_workers_skip_calls_after_deadline():
+    client = SlowClient(delay=0.05)
+    payload = run_level(8, client, deadline=Deadline(0))
+    assert client.calls == 0
+    assert payload["deadline"]["skipped_calls"] >= 5
+    assert payload["approval_summary"]["approved"] is False
+    assert DEADLINE_PLACEHOLDER in "\n".join(payload["lines"])
+
+
+def test_sync_runtime_skips_calls_whose_deadline_passed_while_queued():
+    client = SlowClient(delay=0.3)
+    deadline = Deadline(0.15)
+    pool = FairWorkerPool(max_workers=1)
+    runtime = SyncChatRuntime(client, deadline=deadline, pool=pool)
+    # Two request threads both pass the entry check, then share the only pool thread.
+    try:
+        with ThreadPoolExecutor(max_workers=2) as callers:
+            replies = list(callers.map(lambda u: run_sync(runtime.chat("s", u)), ["a", "b"]))
+    finally:
+        pool.close()
+    assert client.calls == 1
+    assert DEADLINE_PLACEHOLDER in replies
+    assert deadline.skipped_calls == 1
+
+
+def test_generous_deadline_is_reported_but_not_flagged():
+    payload = run_level(2, SlowClient(delay=0), deadline=Deadline(60))
+    assert payload["deadline"]["exceeded"] is False
+    assert "partial" not in payload
+    assert "deadline" not in run_level(2, SlowClient(delay=0))
+
+
+def test_async_pipeline_honours_deadline():
+    class AsyncSlow:
+        def available(self):
+            return True
+
+        async def chat(self, _system, _user, temperature=0.2):
+            await asyncio.sleep(0.1)
+            return '{"action":"research","input":"x","reason":"r","final":""}'
+
+    payload = asyncio.run(async_run_level(7, AsyncSlow(), deadline=Deadline(0.15)))
+    assert payload["partial"] is True
+
+
+def test_ai_client_uses_remaining_budget_as_timeout(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    seen: list[float] = []
+
+    class Resp:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *_args):
+            return None
+
+        def read(self):
+            return json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+
+    def _urlopen(_request, timeout):
+        seen.append(timeout)
+        return Resp()
+
+    monkeypatch.setattr(ai, "urlopen", _urlopen)
+    AIClient().chat("s", "u")
+    with bound(Deadline(5)):
+        AIClient().chat("s", "u")
+        assert call_timeout(30) <= 5
+    assert seen[0] == 30
+    assert 4 < seen[1] <= 5
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import threading
+
+from src.agent_models import AgentTask, OrchestratorTaskRecord, TaskStatus
+from src.chat_runtime import SyncChatRuntime, run_sync
+from src.event_log import EventLog, TaskBoard
+from src.orchestrator import async_run_mini_orchestrator, run_mini_orchestrator
+from src.runtime_client import CapturedAIClient
+
+
+def test_concurrent_appends_keep_unique_monotonic_sequence_per_source():
+    sources = [f"w{i}" for i in range(8)]
+    log = EventLog(sources)
+
+    def _write(source: str) -> None:
+        for n in range(500):
+            log.append(source, f"{source}:{n}")
+
+    threads = [threading.Thread(target=_write, args=(s,)) for s in sources]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    merged = log.merged()
+    seqs = [e.seq for e in merged]
+    assert len(merged) == 4000
+    assert seqs == sorted(set(seqs))
+    for source in sources:
+        own = [int(e.message.split(":")[1]) for e in merged if e.source == source]
+        assert own == list(range(500))
+
+
+def test_taskboard_snapshots_are_not_changed_by_later_transitions():
+    board = TaskBoard([OrchestratorTaskRecord("t1", "planner", "planner", "plan")])
+    before = board.snapshot()
+    old = board.get("planner")
+    new = board.update("planner", status=TaskStatus.RUNNING, attempt=1)
+    assert old.status == TaskStatus.PENDING and old.attempt == 0
+    assert new.status == TaskStatus.RUNNING
+    assert before[0]["status"] == TaskStatus.PENDING
+    assert board.snapshot()[0]["attempt"] == 1
+
+
+class Client:
+    def available(self):
+        return True
+
+    def chat(self, prompt, _context):
+        p = prompt.lower()
+        if "verifier" in p:
+            return "supported: ok"
+        if "merger" in p:
+            return "merged"
+        return "worker output"
+
+
+def test_parallel_orchestrator_emits_ordered_events_and_merged_audit_log():
+    events: list[dict] = []
+    lock = threading.Lock()
+
+    def _on_event(name, data):
+        if name == "taskboard":
+            with lock:
+                events.append(data)
+
+    runtime = SyncChatRuntime(Client(), on_event=_on_event)
+    result = run_sync(async_run_mini_orchestrator(runtime, AgentTask(objective="x")))
+
+    audit_seqs = [e["seq"] for e in result["audit_events"]]
+    assert audit_seqs == sorted(audit_seqs)
+    assert [e["message"] for e in result["audit_events"]] == result["audit_log"]
+    for worker in ("planner", "researcher", "content_writer", "critic"):
+        own = [e["message"] for e in result["audit_events"] if e["source"] == worker]
+        assert own[0].startswith("started worker") and own[-1].startswith("completed worker")
+
+    by_seq = sorted(events, key=lambda e: e["seq"])
+    final = {e["task"]["worker_name"]: e["task"]["status"] for e in by_seq}
+    assert set(final.values()) == {"merged"}
+    assert {t["worker_name"]: t["status"] for t in result["taskboard"]} == final
+    assert by_seq[-1]["board"] == result["taskboard"] == result["run_state"]["tasks"]
+    assert all(len(e["board"]) == len(final) for e in by_seq)
+
+
+def test_parallel_audit_log_is_deterministic_across_runs():
+    def _shape(result):
+        return sorted(e.replace(result["run_id"], "RUN") for e in result["audit_log"][:-1])
+
+    first = run_mini_orchestrator(CapturedAIClient(Client()), AgentTask(objective="x"))
+    for _ in range(5):
+        again = run_mini_orchestrator(CapturedAIClient(Client()), AgentTask(objective="x"))
+        assert _shape(again) == _shape(first)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request
+
+import pytest
+
+from src.ai_client import AIClient, AIClientError
+from src.http_pool import ConnectionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ports_seen: list[int] = []
+
+    def log_message(self, *_args):
+        return None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        self.rfile.read(length)
+        self.ports_seen.append(self.client_address[1])
+        if self.path.startswith("/fail"):
+            body = b'{"error":"rate limited"}'
+            self.send_response(429)
+        else:
+            body = json.dumps({"choices": [{"message": {"content": "pooled hello"}}]}).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture()
+def upstream():
+    KeepAliveHandler.ports_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _post(url: str) -> Request:
+    return Request(url=url, data=b"{}", method="POST", headers={"Content-Type": "application/json"})
+
+
+def test_pool_reuses_keep_alive_connection(upstream):
+    pool = ConnectionPool(max_per_host=2)
+    for _ in range(3):
+        with pool.urlopen(_post(f"{upstream}/chat/completions"), timeout=5) as resp:
+            assert b"pooled hello" in resp.read()
+    assert pool.stats.created == 1
+    assert pool.stats.reused == 2
+    assert len(set(KeepAliveHandler.ports_seen)) == 1
+    pool.close()
+    assert pool.idle_count() == 0
+
+
+def test_pool_raises_http_error_and_keeps_connection(upstream):
+    pool = ConnectionPool()
+    with pytest.raises(HTTPError) as err:
+        pool.urlopen(_post(f"{upstream}/fail"), timeout=5)
+    assert err.value.code == 429
+    assert b"rate limited" in err.value.read()
+    assert pool.idle_count() == 1
+
+
+def test_pool_evicts_idle_connections(upstream):
+    pool = ConnectionPool(idle_timeout=0)
+    pool.urlopen(_post(f"{upstream}/a"), timeout=5)
+    pool.urlopen(_post(f"{upstream}/b"), timeout=5)
+    assert pool.stats.created == 2
+    assert pool.stats.evicted_idle >= 1
+
+
+def test_pool_is_bounded_per_host(upstream):
+    pool = ConnectionPool(max_per_host=1)
+    conns = [pool._acquire(("http", "127.0.0.1", 1), 5)[0] for _ in range(3)]
+    for conn in conns:
+        pool._release(("http", "127.0.0.1", 1), conn)
+    assert pool.idle_count() == 1
+    assert pool.stats.discarded_full == 2
+
+
+def test_ai_client_uses_pool(monkeypatch, upstream):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_BASE_URL", upstream)
+    pool = ConnectionPool()
+    client = AIClient(pool=pool)
+    assert client.chat("s", "u") == "pooled hello"
+    assert client.chat("s", "u") == "pooled hello"
+    assert pool.stats.reused == 1
+
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{upstream}/fail")
+    with pytest.raises(AIClientError) as err:
+        AIClient(pool=pool).chat("s", "u")
+    assert err.value.code == "upstream_http"
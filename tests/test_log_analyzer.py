@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import os
+import random
+import re
+import tarfile
+from io import BytesIO
+
+import pytest
+from openshift_log_analyzer import analyzer, benchmark
+from openshift_log_analyzer.analyzer import (
+    ENTITY_KEYWORDS,
+    LINE_MATCHER,
+    NAMESPACE_PATTERN,
+    NODE_PATTERN,
+    POD_PATTERN,
+    ROOT_CAUSE_RULES,
+    RULE_KEYWORDS,
+    SEVERITY_PATTERN,
+    Evidence,
+    _BoundedEvidence,
+    _date_bytes_pattern,
+    _iter_dated_lines,
+    analyze_log_file,
+)
+from openshift_log_analyzer.matcher import LineMatcher, _lowercase_pattern
+
+DATE = "2024-05-01"
+DATE_TEXT = re.compile(r"2024[-/]05[-/]01")
+
+FRAGMENTS = (
+    b"2024-05-01 etcd leader changed",
+    b"2024/05/01 ERROR oauth timeout",
+    b"2024-04-30 other day",
+    b"plain text",
+    b"\n",
+    b"\r\n",
+    b"\r",
+    b"\xc2\x85",
+    b"\x0b",
+    b"\x0c",
+    b"\x1c",
+    b"\xe2\x80\xa8",
+    b"\xff\xfe",
+    b"caf\xc3\xa9",
+)
+
+
+def _dated_lines(data: bytes) -> list[tuple[int, str]]:
+    return list(_iter_dated_lines(BytesIO(data), _date_bytes_pattern(DATE)))
+
+
+def _check_against_splitlines(data: bytes) -> None:
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    found = _dated_lines(data)
+    # Lines without the date may be yielded too (the scan re-checks the date token), but
+    # every yielded line must be the one splitlines() numbers that way, and none is missed.
+    for line_number, line in found:
+        assert lines[line_number - 1] == line
+    expected = [(i, line) for i, line in enumerate(lines, 1) if DATE_TEXT.search(line)]
+    assert set(expected) <= set(found)
+    assert [n for n, _ in found] == sorted({n for n, _ in found})
+
+
+@pytest.fixture(params=[7, 64, analyzer.READ_BUFFER_BYTES])
+def buffer_bytes(request, monkeypatch):
+    monkeypatch.setattr(analyzer, "READ_BUFFER_BYTES", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"2024-05-01 a\r\nskip\r\n2024/05/01 b\r\n",
+        b"2024-05-01 a\rskip\r2024-05-01 b\r",
+        b"skip\xc2\x852024-05-01 after NEL\n",
+        b"2024-05-01 a\x0bskip\x0c2024-05-01 b\n",
+        b"2024-05-01 \xff\xfe bad bytes\nskip\n2024-05-01 caf\xc3\xa9\n",
+        b"skip\n2024-05-01 no final newline",
+        b"\n\n\r\n2024-05-01 after blanks\n\n",
+    ],
+    ids=["crlf", "lone-cr", "nel", "vt-ff", "invalid-utf8", "no-final-newline", "blank-lines"],
+)
+def test_dated_lines_are_numbered_like_splitlines(data, buffer_bytes):
+    _check_against_splitlines(data)
+
+
+def test_lines_longer_than_the_read_buffer_keep_their_numbers(buffer_bytes):
+    long_line = b"2024-05-01 " + b"x" * (buffer_bytes * 3)
+    data = b"skip\n" + long_line + b"\r\nskip\r" + long_line + b"\n" + long_line
+    _check_against_splitlines(data)
+    assert [n for n, line in _dated_lines(data) if DATE_TEXT.search(line)] == [2, 4, 5]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_mixed_line_breaks_match_splitlines(seed, buffer_bytes):
+    rng = random.Random(seed)
+    data = b"".join(rng.choice(FRAGMENTS) for _ in range(300))
+    _check_against_splitlines(data)
+
+
+def test_bounded_evidence_keeps_the_first_items_and_counts_the_rest():
+    def _evidence(n: int) -> Evidence:
+        return Evidence(source="f", line_number=n, severity="INFO", line=str(n))
+
+    first = _BoundedEvidence(3)
+    for n in range(1, 3):
+        first.add(_evidence(n))
+    second = _BoundedEvidence(3)
+    for n in range(3, 8):
+        second.add(_evidence(n))
+    assert [e.line_number for e in second.items] == [3, 4, 5] and second.seen == 5
+
+    first.merge(second)
+    assert [e.line_number for e in first.items] == [1, 2, 3]
+    assert first.seen == 7
+
+
+def test_summary_caps_timeline_and_notable_errors_but_counts_every_line(tmp_path):
+    log = tmp_path / "pod.log"
+    log.write_text("".join(f"{DATE}T10:00:{i:02d}Z ERROR line {i}\n" for i in range(25)))
+    summary = analyze_log_file(log, incident_date=DATE, top_n=2)
+    assert summary.matched_lines == 25
+    assert [e.line_number for e in summary.timeline] == list(range(1, 11))
+    assert summary.notable_errors == [
+        f"{DATE}T10:00:00Z ERROR line 0",
+        f"{DATE}T10:00:01Z ERROR line 1",
+    ]
+    assert summary.levels == {"ERROR": 25}
+
+
+def _write_bundle(root):
+    messages = (
+        "ERROR etcd leader changed namespace=openshift-etcd node=master-0",
+        "WARN kube-apiserver oauth timeout pod=oauth-1 namespace=openshift-authentication",
+        "ERROR clusteroperator/ingress Degraded node=worker-2",
+        "INFO disk pressure on host=worker-1 pod=api-7",
+        "FATAL tls handshake timeout dialing 10.0.0.12:6443 ns=payments",
+    )
+    for f in range(24):
+        folder = root / f"namespaces/ns-{f % 4}/pods/pod-{f}"
+        folder.mkdir(parents=True)
+        lines = [
+            f"{DATE}T10:{f:02d}:{i:02d}Z {messages[(f + i) % len(messages)]} file={f}"
+            for i in range(f % 7 + 3)
+        ]
+        lines.insert(1, f"2024-04-30T23:59:59Z ERROR etcd timeout file={f}")
+        (folder / "current.log").write_text("\n".join(lines) + "\n")
+    (root / "must-gather.png").write_bytes(b"\x89PNG 2024-05-01 ERROR etcd timeout")
+
+
+def test_parallel_scan_matches_serial_scan_including_order(tmp_path):
+    _write_bundle(tmp_path)
+    serial = analyze_log_file(tmp_path, incident_date=DATE, top_n=3, jobs=1)
+    parallel = analyze_log_file(tmp_path, incident_date=DATE, top_n=3, jobs=2)
+    assert serial.total_files_scanned == 24
+    assert parallel == serial
+    assert parallel.timeline == serial.timeline
+    assert [c.evidence for c in parallel.root_cause_candidates] == [
+        c.evidence for c in serial.root_cause_candidates
+    ]
+    assert parallel.api_failure_signals == serial.api_failure_signals
+
+
+def test_jobs_zero_uses_every_core_and_matches_serial(tmp_path, monkeypatch):
+    _write_bundle(tmp_path)
+    monkeypatch.setattr(analyzer.os, "cpu_count", lambda: 3)
+    used: list[int] = []
+    scan_parallel = analyzer._scan_parallel
+
+    def _spy(files, root, normalized_date, top_n, jobs, stale_before):
+        used.append(jobs)
+        return scan_parallel(files, root, normalized_date, top_n, jobs, stale_before)
+
+    monkeypatch.setattr(analyzer, "_scan_parallel", _spy)
+    summary = analyze_log_file(tmp_path, incident_date=DATE, jobs=0)
+    assert used == [3]
+    assert summary == analyze_log_file(tmp_path, incident_date=DATE, jobs=1)
+
+
+def test_parallel_scan_of_a_single_file_matches_serial(tmp_path):
+    _write_bundle(tmp_path)
+    log = tmp_path / "namespaces/ns-1/pods/pod-5/current.log"
+    serial = analyze_log_file(log, incident_date=DATE, jobs=1)
+    assert serial.total_files_scanned == 1 and serial.matched_lines > 0
+    assert analyze_log_file(log, incident_date=DATE, jobs=2) == serial
+
+
+def _case_shuffled(line: str, rng: random.Random) -> str:
+    return "".join(c.upper() if rng.random() < 0.5 else c.lower() for c in line)
+
+
+def test_gated_matcher_agrees_with_the_reference_scan():
+    rng = random.Random(3)
+    lines = benchmark.synthetic_lines(500)
+    lines += [_case_shuffled(line, rng) for line in lines[:200]]
+    lines += [
+        "2024-05-01 Error NAMESPACE=Payments Node:Worker-1 POD/Api-7 etcd Leader Changed",
+        'ns="shop" host=Master-0.Example.COM machine/m-2 OOMKilled',
+        "kube-ApiServer request Timeout 503 from OAuth",
+        "clusteroperator/dns not progressing",
+        "2024-05-01 ÉRROR étcd leader changed namespace=café",
+        "Ünïcode operator Degraded on node=wörker-1 pod=pöd-1",
+        "İNFO etcd timeout namespace=İstanbul",
+        "\u212aubelet node not ready: disk pressure",
+        "WARNING tls handshake timeout; no route to host",
+        "warning: nothing to see here",
+        "",
+    ]
+    for line in lines:
+        assert LINE_MATCHER.match(line) == LINE_MATCHER.match_reference(line), line
+
+
+def _alternatives(pattern: re.Pattern[str]) -> list[str]:
+    # The leading literal group of each pattern, e.g. "\b(etcd)\b.*..." -> ["etcd"].
+    head = re.split(r"\[|\.\*", pattern.pattern, maxsplit=1)[0]
+    head = re.sub(r"\\b|\(\?:|[()]", "", head)
+    return head.lower().split("|")
+
+
+@pytest.mark.parametrize(
+    "pattern, keywords",
+    [
+        *((pattern, RULE_KEYWORDS[key]) for key, (pattern, _) in ROOT_CAUSE_RULES.items()),
+        (NAMESPACE_PATTERN, ENTITY_KEYWORDS["namespace"]),
+        (NODE_PATTERN, ENTITY_KEYWORDS["node"]),
+        (POD_PATTERN, ENTITY_KEYWORDS["pod"]),
+    ],
+)
+def test_every_pattern_alternative_contains_one_of_its_keywords(pattern, keywords):
+    alternatives = _alternatives(pattern)
+    assert alternatives and all(alt for alt in alternatives)
+    for alternative in alternatives:
+        assert any(keyword in alternative for keyword in keywords), alternative
+    assert all(keyword == keyword.lower() for keyword in keywords)
+
+
+def test_uppercase_escapes_are_refused_when_lowercasing_patterns():
+    with pytest.raises(ValueError, match="lowercase fast path"):
+        _lowercase_pattern(re.compile(r"\betcd\S+", re.IGNORECASE))
+    with pytest.raises(ValueError):
+        LineMatcher(SEVERITY_PATTERN, {}, {"bad": (re.compile(r"\W+oauth"), ("oauth",))})
+    fast = _lowercase_pattern(re.compile(r"\bETCD\d+", re.IGNORECASE))
+    assert fast.pattern == r"\betcd\d+" and not fast.flags & re.IGNORECASE
+
+
+def test_prefilter_accepts_both_date_forms_and_checks_the_first_date_token(tmp_path):
+    lines = [
+        "2024-05-01T10:00:00Z ERROR etcd leader changed",
+        "2024/05/01 10:00:01 WARN oauth timeout",
+        "2024-05/01 mixed separators node=worker-1",
+        "2024-04-30T23:59:59Z ERROR retrying until 2024-05-01 etcd timeout",
+        "2024/04/30 INFO next window 2024/05/01",
+        "no date but 2024-05-01 later",
+        "20240501 compact form is not a date token",
+    ]
+    log = tmp_path / "pod.log"
+    log.write_text("\r\n".join(lines) + "\n")
+    pattern = _date_bytes_pattern(DATE)
+    assert [bool(pattern.search(line.encode())) for line in lines] == [True] * 6 + [False]
+
+    for incident_date in ("2024-05-01", "2024/05/01"):
+        summary = analyze_log_file(log, incident_date=incident_date)
+        assert [(e.line_number, e.line) for e in summary.timeline] == [
+            (1, lines[0]),
+            (2, lines[1]),
+            (3, lines[2]),
+            (6, lines[5]),
+        ]
+
+
+def test_stale_files_are_skipped_by_mtime(tmp_path):
+    incident_start = analyzer._stale_before(DATE) + analyzer.STALE_MARGIN_SECONDS
+    for name, mtime in (
+        ("stale.log", incident_start - 3 * 24 * 60 * 60),
+        ("same-day.log", incident_start + 12 * 60 * 60),
+        ("day-before.log", incident_start - 60 * 60),
+    ):
+        path = tmp_path / name
+        path.write_text(f"{DATE}T10:00:00Z ERROR etcd timeout in {name}\n")
+        os.utime(path, (mtime, mtime))
+
+    kept = analyze_log_file(tmp_path, incident_date=DATE, skip_stale_files=True)
+    assert kept.total_files_skipped == 1
+    assert kept.total_files_scanned == 2
+    assert sorted(e.source for e in kept.timeline) == ["day-before.log", "same-day.log"]
+
+    everything = analyze_log_file(tmp_path, incident_date=DATE)
+    assert everything.total_files_skipped == 0 and everything.total_files_scanned == 3
+    parallel = analyze_log_file(tmp_path, incident_date=DATE, skip_stale_files=True, jobs=2)
+    assert parallel == kept
+
+
+def _write_archive(tmp_path, mode: str, extra_members: bool = False):
+    bundle = tmp_path / "bundle"
+    _write_bundle(bundle)
+    archive_path = tmp_path / ("bundle.tar.gz" if mode == "w:gz" else "bundle.tar")
+    with tarfile.open(archive_path, mode) as archive:
+        archive.add(bundle, arcname="./must-gather")
+        if extra_members:
+            for name in ("../escape.log", "/abs/escape.log", "must-gather/link.log"):
+                info = tarfile.TarInfo(name)
+                data = f"{DATE}T10:00:00Z ERROR etcd timeout {name}\n".encode()
+                if name.endswith("link.log"):
+                    info.type = tarfile.SYMTYPE
+                    info.linkname = "namespaces/ns-0/pods/pod-0/current.log"
+                    archive.addfile(info)
+                else:
+                    info.size = len(data)
+                    archive.addfile(info, BytesIO(data))
+    return archive_path
+
+
+def _evidence_set(evidence):
+    return {(e.source, e.line_number, e.line) for e in evidence}
+
+
+@pytest.mark.parametrize("mode", ["w", "w:gz"])
+def test_streamed_archive_counts_match_extraction(tmp_path, mode):
+    archive_path = _write_archive(tmp_path, mode)
+    streamed = analyze_log_file(archive_path, incident_date=DATE, top_n=5000, stream_archive=True)
+    extracted = analyze_log_file(archive_path, incident_date=DATE, top_n=5000)
+
+    assert streamed.extracted_dir is None and extracted.extracted_dir is not None
+    assert streamed.total_files_scanned == extracted.total_files_scanned == 24
+    assert streamed.matched_lines == extracted.matched_lines
+    assert streamed.levels == extracted.levels
+    assert dict(streamed.top_namespaces) == dict(extracted.top_namespaces)
+    assert dict(streamed.infrastructure_hotspots) == dict(extracted.infrastructure_hotspots)
+    # With every line kept, only the order of the samples may differ.
+    assert _evidence_set(streamed.timeline) == _evidence_set(extracted.timeline)
+    assert sorted(streamed.api_failure_signals) == sorted(extracted.api_failure_signals)
+    assert all(e.source.startswith("must-gather/") for e in streamed.timeline)
+
+
+def test_streamed_archive_skips_links_and_escaping_members(tmp_path):
+    archive_path = _write_archive(tmp_path, "w:gz", extra_members=True)
+    streamed = analyze_log_file(archive_path, incident_date=DATE, top_n=5000, stream_archive=True)
+    assert streamed.total_files_scanned == 24
+    assert not any("escape" in e.line or "link" in e.source for e in streamed.timeline)
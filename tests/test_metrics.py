@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import app
+from scripts.benchmark import FakeUpstream, UpstreamProfile
+from src.ai_client import AIClient
+from src.metrics import (
+    METRICS,
+    RATE_LIMITED,
+    RUN_REQUESTS,
+    UPSTREAM_SECONDS,
+    MetricsRegistry,
+    labels,
+)
+from src.rate_limit import RateLimiter
+
+
+def test_striped_counters_merge_across_threads():
+    registry = MetricsRegistry(stripes=4)
+    name = registry.counter("hits_total", "hits")
+
+    def _work():
+        for _ in range(1000):
+            registry.inc(name, labels(kind="a"))
+
+    threads = [threading.Thread(target=_work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert registry.value(name, labels(kind="a")) == 8000
+    assert 'hits_total{kind="a"} 8000' in registry.render()
+
+
+def test_histogram_renders_cumulative_buckets_and_escaped_labels():
+    registry = MetricsRegistry()
+    name = registry.histogram("latency_seconds", "latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        registry.observe(name, value, labels(site='a"b'))
+    registry.gauge("threads", "threads", lambda: {labels(pool="x"): 3})
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{site="a\\"b",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{site="a\\"b",le="1"} 3' in text
+    assert 'latency_seconds_bucket{site="a\\"b",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{site="a\\"b"} 4' in text
+    assert 'latency_seconds_sum{site="a\\"b"} 3.65' in text
+    assert 'threads{pool="x"} 3' in text
+
+
+class FakeClient:
+    def __init__(self, **_kwargs):
+        self.model = "fake-model"
+        self.base_url = "http://fake"
+
+    def available(self):
+        return True
+
+    def chat(self, _system, _user, temperature=0.2):
+        return "ok"
+
+
+@pytest.fixture()
+def server(monkeypatch):
+    monkeypatch.setattr(app, "AIClient", FakeClient)
+    monkeypatch.setattr(app, "RATE_LIMITER", RateLimiter(max_requests=1))
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), app.Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        yield srv.server_port
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _request(port, method, path, body=None):
+    conn = HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json"} if body else {}
+    conn.request(method, path, body=body, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp, data
+
+
+def test_metrics_endpoint_counts_runs_and_rate_limit_rejections(server):
+    ok = labels(level=1, mode="run", status=200)
+    before_ok = METRICS.value(RUN_REQUESTS, ok)
+    before_limited = METRICS.value(RATE_LIMITED)
+    assert _request(server, "POST", "/api/run", b'{"level": 1}')[0].status == 200
+    assert _request(server, "POST", "/api/run", b'{"level": 1}')[0].status == 429
+
+    resp, data = _request(server, "GET", "/metrics")
+    text = data.decode()
+    assert resp.status == 200
+    assert resp.getheader("Content-Type").startswith("text/plain; version=0.0.4")
+    assert METRICS.value(RUN_REQUESTS, ok) == before_ok + 1
+    assert METRICS.value(RATE_LIMITED) == before_limited + 1
+    assert 'glytch_run_duration_seconds_bucket{level="1",status="200",le="+Inf"}' in text
+    for gauge in (
+        "glytch_active_threads",
+        "glytch_runs_in_flight",
+        "glytch_response_cache_hit_ratio",
+        "glytch_worker_pool_queue_depth",
+    ):
+        assert f"\n{gauge} " in text
+    assert "# TYPE glytch_upstream_call_duration_seconds histogram" in text
+
+
+def test_upstream_attempts_are_timed(monkeypatch):
+    upstream = FakeUpstream(UpstreamProfile(latency_ms=0, jitter_ms=0)).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_BASE_URL", upstream.base_url)
+    before = METRICS.value(UPSTREAM_SECONDS, labels(outcome="ok"))
+    try:
+        assert AIClient().chat("s", "u") == "Benchmark reply."
+    finally:
+        upstream.stop()
+    assert METRICS.value(UPSTREAM_SECONDS, labels(outcome="ok")) == before + 1
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import threading
+
+from src.rate_limit import RateLimiter
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _limiter(clock: Clock, **kwargs) -> RateLimiter:
+    return RateLimiter(clock=clock, sweep_seconds=0, **kwargs)
+
+
+def test_limits_each_client_independently_within_a_window():
+    limiter = _limiter(Clock(), max_requests=3, window_seconds=60)
+    assert [limiter.allow("a") for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow("b")
+    snap = limiter.snapshot()
+    assert snap["allowed"] == 4 and snap["limited"] == 1 and snap["clients"] == 2
+
+
+def test_previous_window_is_weighted_by_its_remaining_overlap():
+    clock = Clock()
+    limiter = _limiter(clock, max_requests=4, window_seconds=60)
+    for _ in range(4):
+        assert limiter.allow("a")
+    clock.now += 60 + 15
+    # 4 * 0.75 = 3 still counts against the client, so only one more request fits.
+    assert limiter.allow("a")
+    assert not limiter.allow("a")
+    clock.now += 45
+    assert limiter.allow("a")
+
+
+def test_client_is_fully_reset_after_two_idle_windows():
+    clock = Clock()
+    limiter = _limiter(clock, max_requests=2, window_seconds=10)
+    assert limiter.allow("a") and limiter.allow("a") and not limiter.allow("a")
+    clock.now += 25
+    assert limiter.allow("a") and limiter.allow("a")
+
+
+def test_sweep_evicts_only_idle_clients():
+    clock = Clock()
+    limiter = _limiter(clock, max_requests=5, window_seconds=10)
+    for n in range(50):
+        limiter.allow(f"10.0.0.{n}")
+    clock.now += 15
+    limiter.allow("10.0.0.7")
+    clock.now += 6
+    assert limiter.sweep() == 49
+    assert len(limiter) == 1
+    assert limiter.snapshot()["evicted_idle"] == 49
+
+
+def test_memory_is_bounded_by_max_clients():
+    limiter = _limiter(Clock(), max_requests=5, shards=4, max_clients=100)
+    for n in range(5000):
+        limiter.allow(f"client-{n}")
+    assert len(limiter) <= 100
+    assert limiter.snapshot()["evicted_capacity"] >= 4900
+
+
+def test_concurrent_checks_never_exceed_the_limit():
+    limiter = _limiter(Clock(), max_requests=50, shards=8)
+    allowed: list[bool] = []
+    lock = threading.Lock()
+
+    def _hammer() -> None:
+        for _ in range(40):
+            result = limiter.allow("shared")
+            with lock:
+                allowed.append(result)
+
+    threads = [threading.Thread(target=_hammer) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(allowed) == 50
+
+
+def test_from_env_reads_limits(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_MAX_REQUESTS", "7")
+    monkeypatch.setenv("RATE_LIMIT_WINDOW_SECONDS", "30")
+    monkeypatch.setenv("RATE_LIMIT_SHARDS", "4")
+    monkeypatch.setenv("RATE_LIMIT_MAX_CLIENTS", "400")
+    snap = RateLimiter.from_env().snapshot()
+    assert snap["max_requests"] == 7 and snap["window_seconds"] == 30.0
+    assert snap["shards"] == 4 and snap["max_clients"] == 400
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import time
+from email.message import Message
+from typing import Any, cast
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+import src.ai_client as ai
+from src.ai_client import AIClient, AIClientError, AsyncAIClient
+from src.resilience import (
+    CircuitBreaker,
+    RetryPolicy,
+    breaker_for,
+    resilience_snapshot,
+    retry_after_seconds,
+)
+
+
+class OkResponse:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        return None
+
+    def read(self):
+        return json.dumps({"choices": [{"message": {"content": "recovered"}}]}).encode()
+
+
+def _http_error(status: int, retry_after: str | None = None) -> HTTPError:
+    headers = Message()
+    if retry_after is not None:
+        headers["Retry-After"] = retry_after
+    return HTTPError("u", status, "err", headers, io.BytesIO(b"{}"))
+
+
+def _scripted_urlopen(outcomes):
+    calls = []
+
+    def _urlopen(*_args, **_kwargs):
+        calls.append(1)
+        outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return _urlopen, calls
+
+
+def test_transient_429_is_retried_and_honours_retry_after(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    sleeps: list[float] = []
+    monkeypatch.setattr(ai.time, "sleep", sleeps.append)
+    opener, calls = _scripted_urlopen([_http_error(429, "2"), OkResponse()])
+    monkeypatch.setattr(ai, "urlopen", opener)
+    before = resilience_snapshot()
+
+    assert AIClient(retry=RetryPolicy(base_delay=0.1)).chat("s", "u") == "recovered"
+    assert len(calls) == 2
+    assert 2.0 <= sleeps[0] <= 2.1
+    after = resilience_snapshot()
+    assert after["retries"] == before["retries"] + 1
+    assert after["retry_wait_seconds"] >= before["retry_wait_seconds"] + 2
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    opener, calls = _scripted_urlopen([_http_error(400)])
+    monkeypatch.setattr(ai, "urlopen", opener)
+    with pytest.raises(AIClientError):
+        AIClient().chat("s", "u")
+    assert len(calls) == 1
+
+
+def test_retry_after_beyond_cap_gives_up():
+    policy = RetryPolicy(max_retries=3, max_delay=5)
+    assert policy.backoff(0, retry_after=60) is None
+    assert policy.backoff(3) is None
+    assert 0 <= policy.backoff(1) <= 1.0
+    assert retry_after_seconds(_http_error(503, "Wed, 21 Oct 2015 07:28:00 GMT")) == 0.0
+    assert retry_after_seconds(URLError("x")) is None
+
+
+def test_breaker_opens_fails_fast_and_recovers_after_probe(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_CIRCUIT_FAILURES", "3")
+    opener, calls = _scripted_urlopen([URLError("down")])
+    monkeypatch.setattr(ai, "urlopen", opener)
+    client = AIClient(retry=RetryPolicy(max_retries=0))
+    for _ in range(3):
+        with pytest.raises(AIClientError) as err:
+            client.chat("s", "u")
+        assert err.value.code == "upstream_connection"
+    rejected_before = resilience_snapshot()["circuit_rejections"]
+
+    with pytest.raises(AIClientError) as err:
+        client.chat("s", "u")
+    assert err.value.code == "upstream_circuit_open" and err.value.status == 503
+    assert len(calls) == 3
+    assert resilience_snapshot()["circuit_rejections"] == rejected_before + 1
+    assert resilience_snapshot()["circuits"][client.base_url] == "open"
+
+    breaker = breaker_for(client.base_url)
+    breaker.opened_at -= breaker.reset_seconds
+    monkeypatch.setattr(ai, "urlopen", lambda *_a, **_k: OkResponse())
+    assert client.chat("s", "u") == "recovered"
+    assert breaker.state == "closed"
+
+
+def test_client_errors_between_server_errors_do_not_reset_the_breaker(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_CIRCUIT_FAILURES", "3")
+    outcomes = [_http_error(503), _http_error(429), _http_error(400), _http_error(503)]
+    opener, calls = _scripted_urlopen(outcomes + [_http_error(503)])
+    monkeypatch.setattr(ai, "urlopen", opener)
+    client = AIClient(retry=RetryPolicy(max_retries=0))
+    for _ in outcomes:
+        with pytest.raises(AIClientError):
+            client.chat("s", "u")
+    assert breaker_for(client.base_url).failures == 2
+    with pytest.raises(AIClientError):
+        client.chat("s", "u")
+    assert breaker_for(client.base_url).state == "open"
+    assert len(calls) == 5
+
+
+def test_half_open_admits_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.record_failure()
+    assert breaker.allow() is True
+
+
+class BadStreamResponse(OkResponse):
+    def __iter__(self):
+        return iter([b"data: {not json\n"])
+
+
+def _half_open(base_url: str) -> CircuitBreaker:
+    breaker = breaker_for(base_url)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - breaker.reset_seconds
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_probe_failing_with_a_non_network_error_frees_the_probe(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_CIRCUIT_FAILURES", "1")
+    client = AIClient(retry=RetryPolicy(max_retries=0))
+    _half_open(client.base_url)
+
+    monkeypatch.setattr(ai, "urlopen", lambda *_a, **_k: BadStreamResponse())
+    with pytest.raises(AIClientError) as err:
+        client.chat_stream("s", "u", on_token=lambda _t: None)
+    assert err.value.code == "upstream_json"
+
+    monkeypatch.setattr(ai, "urlopen", lambda *_a, **_k: OkResponse())
+    for _ in range(3):
+        assert client.chat("s", "u") == "recovered"
+    assert breaker_for(client.base_url).state == "closed"
+
+
+def test_cancelled_async_probe_frees_the_probe(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_CIRCUIT_FAILURES", "1")
+
+    class HangingPool:
+        async def request(self, *_args, **_kwargs):
+            await asyncio.sleep(10)
+
+    client = AsyncAIClient(pool=cast(Any, HangingPool()))
+    breaker = _half_open(client.base_url)
+
+    async def _probe() -> None:
+        await asyncio.wait_for(client.chat("s", "u"), timeout=0.05)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(_probe())
+    assert breaker.state == "half_open"
+    assert breaker.allow() is True
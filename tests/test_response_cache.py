@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.ai_client import AIClientError
+from src.deadline import Deadline, bound
+from src.levels import run_level
+from src.response_cache import (
+    AsyncCachedAIClient,
+    CachedAIClient,
+    ResponseCache,
+    SqliteCacheBackend,
+    cache_key,
+)
+from src.runtime_client import CapturedAIClient
+
+
+class CountingClient:
+    model = "gpt-test"
+    base_url = "http://fake"
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def available(self):
+        return True
+
+    def chat(self, system, user, temperature=0.2):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return f"answer to {system}|{user}|{temperature}"
+
+
+def test_cache_key_covers_provider_model_system_user_and_temperature():
+    base = cache_key("http://a", "m", "s", "u", 0.2)
+    assert base == cache_key("http://a", "m", "s", "u", 0.2)
+    assert base != cache_key("http://b", "m", "s", "u", 0.2)
+    assert base != cache_key("http://a", "m2", "s", "u", 0.2)
+    assert base != cache_key("http://a", "m", "s2", "u", 0.2)
+    assert base != cache_key("http://a", "m", "s", "u2", 0.2)
+    assert base != cache_key("http://a", "m", "s", "u", 0.7)
+
+
+def test_providers_serving_the_same_model_do_not_share_answers():
+    cache = ResponseCache()
+    first, second = CountingClient(), CountingClient()
+    second.base_url = "http://other"
+    CachedAIClient(first, cache).chat("s", "u")
+    CachedAIClient(second, cache).chat("s", "u")
+    assert first.calls == second.calls == 1
+
+
+def test_cached_client_hits_and_misses():
+    inner = CountingClient()
+    cache = ResponseCache()
+    client = CachedAIClient(inner, cache)
+    assert client.chat("s", "u") == client.chat("s", "u")
+    client.chat("s", "other")
+    assert inner.calls == 2
+    stats = cache.snapshot()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["hit_ratio"] == pytest.approx(1 / 3, abs=1e-3)
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats.evictions == 1
+
+    small = ResponseCache(max_bytes=10)
+    small.set("k1", "abcd")
+    small.set("k2", "efgh")
+    assert len(small) == 1 and small.get("k2") == "efgh"
+
+
+def test_ttl_expiry(monkeypatch):
+    cache = ResponseCache(ttl_seconds=10)
+    now = [1000.0]
+    monkeypatch.setattr("src.response_cache.time.time", lambda: now[0])
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    now[0] += 11
+    assert cache.get("k") is None
+    assert cache.stats.expirations == 1
+
+
+def test_errors_are_not_cached():
+    class Flaky(CountingClient):
+        def chat(self, system, user, temperature=0.2):
+            self.calls += 1
+            if self.calls == 1:
+                raise AIClientError("busy", code="upstream_http", status=502)
+            return "recovered"
+
+    inner = Flaky()
+    client = CachedAIClient(inner, ResponseCache())
+    with pytest.raises(AIClientError):
+        client.chat("s", "u")
+    assert client.chat("s", "u") == "recovered"
+
+
+def test_concurrent_identical_calls_cost_one_upstream_call():
+    inner = CountingClient(delay=0.2)
+    cache = ResponseCache()
+    results: list[str] = []
+
+    def _call():
+        results.append(CachedAIClient(inner, cache).chat("same", "prompt"))
+
+    threads = [threading.Thread(target=_call) for _ in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert inner.calls == 1
+    assert len(set(results)) == 1 and len(results) == 30
+    assert cache.stats.coalesced >= 1
+    # One lookup per call, however often a waiter re-checks the cache.
+    assert cache.stats.hits + cache.stats.misses == 30
+
+
+def test_waiters_stop_waiting_on_a_hung_leader_at_their_deadline():
+    cache = ResponseCache()
+    release = threading.Event()
+    threading.Thread(
+        target=cache.get_or_compute, args=("k", lambda: release.wait(5) and "late"), daemon=True
+    ).start()
+    while not cache._inflight:
+        time.sleep(0.001)
+
+    started = time.monotonic()
+    with bound(Deadline(0.1)):
+        assert cache.get_or_compute("k", lambda: "local") == "local"
+    assert time.monotonic() - started < 2
+    assert cache.stats.wait_timeouts == 1
+    release.set()
+
+
+class AsyncCountingClient(CountingClient):
+    async def chat(self, system, user, temperature=0.2):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"answer to {system}|{user}|{temperature}"
+
+
+def test_concurrent_identical_async_calls_cost_one_upstream_call():
+    inner = AsyncCountingClient(delay=0.1)
+    cache = ResponseCache()
+
+    async def _calls():
+        return await asyncio.gather(
+            *(AsyncCachedAIClient(inner, cache).chat("same", "prompt") for _ in range(30))
+        )
+
+    results = asyncio.run(_calls())
+    assert inner.calls == 1
+    assert len(set(results)) == 1 and len(results) == 30
+    assert cache.stats.coalesced == 29
+    assert (cache.stats.hits, cache.stats.misses) == (0, 30)
+
+
+def test_async_waiters_are_woken_by_a_leader_on_another_thread():
+    cache = ResponseCache()
+    release = threading.Event()
+    leader = threading.Thread(
+        target=cache.get_or_compute, args=("k", lambda: release.wait(5) and "shared")
+    )
+    leader.start()
+    while not cache._inflight:
+        time.sleep(0.001)
+
+    async def _wait():
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        return await cache.get_or_compute_async("k", lambda: asyncio.sleep(0, "local"))
+
+    assert asyncio.run(_wait()) == "shared"
+    leader.join(5)
+
+
+def test_classroom_preset_runs_share_upstream_calls():
+    inner = CountingClient()
+    cache = ResponseCache()
+    run_level(5, CapturedAIClient(CachedAIClient(inner, cache)))
+    first_run_calls = inner.calls
+    for _ in range(29):
+        run_level(5, CapturedAIClient(CachedAIClient(inner, cache)))
+    assert inner.calls == first_run_calls
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    inner = CountingClient()
+    first = ResponseCache(backend=SqliteCacheBackend(path))
+    CachedAIClient(inner, first).chat("s", "u")
+    first.backend.close()
+
+    restarted = ResponseCache(backend=SqliteCacheBackend(path))
+    assert CachedAIClient(inner, restarted).chat("s", "u").startswith("answer to s|u")
+    assert inner.calls == 1
+    assert restarted.stats.disk_hits == 1
+
+
+def test_disabled_cache_passes_through():
+    inner = CountingClient()
+    client = CachedAIClient(inner, ResponseCache(max_entries=0))
+    client.chat("s", "u")
+    client.chat("s", "u")
+    assert inner.calls == 2
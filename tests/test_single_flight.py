@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import app
+from app import Handler
+from src.ai_client import AIClientError
+from src.rate_limit import RateLimiter
+from src.single_flight import SingleFlight
+
+
+def _run_concurrently(n: int, target) -> None:
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_concurrent_callers_share_one_execution():
+    flight: SingleFlight[str] = SingleFlight()
+    calls = []
+    results = []
+
+    def _work(_emit):
+        calls.append(1)
+        time.sleep(0.2)
+        return "done"
+
+    _run_concurrently(12, lambda: results.append(flight.run("k", _work)))
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["done"] * 12
+    assert sum(shared for _, shared in results) == 11
+    assert flight.snapshot() == {"leaders": 1, "coalesced": 11, "failures": 0, "in_flight": 0}
+
+
+def test_failures_reach_every_waiter_and_are_not_remembered():
+    flight: SingleFlight[str] = SingleFlight()
+    errors = []
+
+    def _fail(_emit):
+        time.sleep(0.1)
+        raise AIClientError("down", code="upstream_http", status=502)
+
+    def _call():
+        try:
+            flight.run("k", _fail)
+        except AIClientError as err:
+            errors.append(err.code)
+
+    _run_concurrently(5, _call)
+    assert errors == ["upstream_http"] * 5
+    assert flight.snapshot()["failures"] == 1
+    assert flight.run("k", lambda _emit: "fresh") == ("fresh", False)
+
+
+def test_async_callers_share_one_execution_and_its_failure():
+    flight: SingleFlight[str] = SingleFlight()
+    calls = []
+
+    async def _work(_emit):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        if len(calls) > 1:
+            raise AIClientError("down", code="upstream_http", status=502)
+        return "done"
+
+    async def _callers():
+        return await asyncio.gather(
+            *(flight.run_async("k", _work) for _ in range(10)), return_exceptions=True
+        )
+
+    results = asyncio.run(_callers())
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["done"] * 10
+    assert sum(shared for _, shared in results) == 9
+
+    failed = asyncio.run(_callers())
+    assert len(calls) == 2
+    assert {err.code for err in failed} == {"upstream_http"} and len(failed) == 10
+    assert flight.snapshot() == {"leaders": 2, "coalesced": 18, "failures": 1, "in_flight": 0}
+
+
+def test_followers_receive_events_emitted_after_joining():
+    flight: SingleFlight[str] = SingleFlight()
+    release = threading.Event()
+    joined = threading.Event()
+    leader_events: list[str] = []
+    follower_events: list[str] = []
+
+    def _work(emit):
+        emit("first", {})
+        joined.wait(2)
+        emit("second", {})
+        release.wait(2)
+        return "ok"
+
+    leader = threading.Thread(
+        target=lambda: flight.run("k", _work, on_event=lambda e, _d: leader_events.append(e))
+    )
+    leader.start()
+    while flight.snapshot()["in_flight"] == 0:
+        time.sleep(0.01)
+    follower = threading.Thread(
+        target=lambda: flight.run("k", _work, on_event=lambda e, _d: follower_events.append(e))
+    )
+    follower.start()
+    while flight.snapshot()["coalesced"] == 0:
+        time.sleep(0.01)
+    joined.set()
+    release.set()
+    leader.join()
+    follower.join()
+    assert leader_events == ["first", "second"]
+    assert follower_events == ["second"]
+
+
+class SlowFakeClient:
+    instances = 0
+
+    def __init__(self, **_kwargs):
+        type(self).instances += 1
+        self.model = "fake-model"
+        self.base_url = "http://fake"
+
+    def available(self):
+        return True
+
+    def chat(self, system, _user, temperature=0.2):
+        time.sleep(0.05)
+        return '{"action":"finish","input":"","reason":"done","final":"answer"}'
+
+
+@pytest.fixture()
+def server(monkeypatch):
+    SlowFakeClient.instances = 0
+    monkeypatch.setattr(app, "AIClient", SlowFakeClient)
+    monkeypatch.setattr(app, "RUN_FLIGHTS", SingleFlight())
+    monkeypatch.setattr(app, "RATE_LIMITER", RateLimiter(max_requests=1000))
+    app.RESPONSE_CACHE.clear()
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield srv.server_port
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_identical_api_runs_are_coalesced(server):
+    responses = []
+
+    def _post():
+        conn = HTTPConnection("127.0.0.1", server, timeout=10)
+        conn.request(
+            "POST",
+            "/api/run",
+            body=json.dumps(
+                {"level": 4, "use_case": "uk_year10_teacher", "use_case_context": "  "}
+            ).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        resp = conn.getresponse()
+        responses.append((resp.status, json.loads(resp.read())))
+        conn.close()
+
+    _run_concurrently(20, _post)
+    assert all(status == 200 for status, _ in responses)
+    request_ids = {body["request_id"] for _, body in responses}
+    assert len(request_ids) == 20
+    assert SlowFakeClient.instances < 20
+
+    conn = HTTPConnection("127.0.0.1", server, timeout=5)
+    conn.request("GET", "/api/run/stats")
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    coalescing = stats["coalescing"]
+    assert coalescing["leaders"] + coalescing["coalesced"] == 20
+    assert coalescing["leaders"] == SlowFakeClient.instances
+    assert "hit_ratio" in stats["response_cache"]
+
+
+class GatedFakeClient(SlowFakeClient):
+    release = threading.Event()
+
+    def chat(self, system, _user, temperature=0.2):
+        type(self).release.wait(5)
+        if "verifier" in system.lower():
+            return "supported: covered"
+        return "worker output"
+
+
+def test_stream_follower_of_a_plain_run_still_gets_progress_events(server, monkeypatch):
+    GatedFakeClient.release = threading.Event()
+    monkeypatch.setattr(app, "AIClient", GatedFakeClient)
+    body = json.dumps({"level": 8, "use_case": "uk_year10_teacher", "use_case_context": ""})
+    results: dict[str, str] = {}
+
+    def _request(path: str) -> None:
+        conn = HTTPConnection("127.0.0.1", server, timeout=10)
+        conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        results[path] = conn.getresponse().read().decode()
+        conn.close()
+
+    leader = threading.Thread(target=_request, args=("/api/run",))
+    leader.start()
+    deadline = time.monotonic() + 5
+    while app.RUN_FLIGHTS.snapshot()["in_flight"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    follower = threading.Thread(target=_request, args=("/api/run/stream",))
+    follower.start()
+    while app.RUN_FLIGHTS.snapshot()["coalesced"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    GatedFakeClient.release.set()
+    leader.join(10)
+    follower.join(10)
+
+    assert app.RUN_FLIGHTS.snapshot()["coalesced"] == 1
+    stream = results["/api/run/stream"]
+    assert "event: token" in stream and "event: taskboard" in stream
+    assert stream.index("event: taskboard") < stream.index("event: result")
+    assert json.loads(results["/api/run"])["level"] == 8
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import app
+from app import Handler
+
+
+class StreamingFakeClient:
+    def __init__(self, **_kwargs):
+        self.model = "fake-model"
+        self.base_url = "http://fake"
+
+    def available(self):
+        return True
+
+    def chat(self, system, _user, temperature=0.2):
+        p = system.lower()
+        if "verifier" in p:
+            return "supported: objective covered"
+        if "merger" in p:
+            return "merged answer"
+        return '{"action":"finish","input":"","reason":"done","final":"streamed answer"}'
+
+    def chat_stream(self, system, user, on_token, temperature=0.2):
+        text = self.chat(system, user, temperature=temperature)
+        for i in range(0, len(text), 8):
+            on_token(text[i : i + 8])
+        return text
+
+
+@pytest.fixture()
+def server(monkeypatch):
+    monkeypatch.setattr(app, "AIClient", StreamingFakeClient)
+    app.RESPONSE_CACHE.clear()
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield srv.server_port
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _events(raw: bytes) -> list[tuple[str, dict]]:
+    events = []
+    for frame in raw.decode().split("\n\n"):
+        if not frame.strip():
+            continue
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_emits_progress_before_result(server):
+    conn = HTTPConnection("127.0.0.1", server, timeout=10)
+    conn.request(
+        "POST",
+        "/api/run/stream",
+        body=json.dumps({"level": 8, "use_case": "uk_year10_teacher"}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    resp = conn.getresponse()
+    assert resp.status == 200
+    assert resp.getheader("Content-Type") == "text/event-stream"
+    assert resp.getheader("Cache-Control") == "no-cache"
+    events = _events(resp.read())
+    conn.close()
+
+    names = [name for name, _ in events]
+    assert names[0] == "started"
+    assert names[-2:] == ["result", "done"]
+    assert "token" in names and "taskboard" in names
+    assert names.index("taskboard") < names.index("result")
+    result = events[-2][1]
+    assert result["level"] == 8
+    assert result["request_id"] == events[0][1]["request_id"]
+    assert events[-1][1]["status"] == 200
+
+
+def test_stream_get_route_and_validation(server):
+    conn = HTTPConnection("127.0.0.1", server, timeout=10)
+    conn.request("GET", "/api/run/stream?level=2&use_case=uk_year10_teacher")
+    resp = conn.getresponse()
+    names = [name for name, _ in _events(resp.read())]
+    conn.close()
+    assert names[0] == "started" and names[-2:] == ["result", "done"]
+    assert "theatre_step" not in names or names.index("theatre_step") < names.index("result")
+
+    conn = HTTPConnection("127.0.0.1", server, timeout=10)
+    conn.request("GET", "/api/run/stream?level=99")
+    resp = conn.getresponse()
+    body = json.loads(resp.read())
+    conn.close()
+    assert resp.status == 400 and body["code"] == "invalid_level"
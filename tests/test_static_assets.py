@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import gzip
+import os
+import threading
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import app
+from src.static_assets import ASSET_CACHE_CONTROL, StaticAssets
+
+
+def _site(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<html>" + "hello " * 100 + "</html>")
+    (tmp_path / "assets" / "logo.svg").write_text("<svg>" + "<g/>" * 100 + "</svg>")
+    return tmp_path
+
+
+def test_loads_every_file_with_content_type_and_gzip_variant(tmp_path):
+    assets = StaticAssets(_site(tmp_path))
+    assert len(assets) == 2
+    index = assets.get("/")
+    assert index is not None and index.content_type == "text/html"
+    assert gzip.decompress(index.variants["gzip"].body).startswith(b"<html>")
+    assert assets.get("/assets/logo.svg").content_type == "image/svg+xml"
+    assert assets.get("/missing.css") is None
+
+
+def test_rejects_paths_outside_the_root(tmp_path):
+    (tmp_path / "secret.txt").write_text("nope")
+    web = tmp_path / "web"
+    web.mkdir()
+    (web / "index.html").write_text("ok")
+    for reload in (False, True):
+        assets = StaticAssets(web, reload=reload)
+        assert assets.get("/../secret.txt") is None
+        assert assets.get("/%2e%2e/secret.txt") is None
+
+
+def test_reload_picks_up_edits_only_when_enabled(tmp_path):
+    site = _site(tmp_path)
+    frozen = StaticAssets(site)
+    live = StaticAssets(site, reload=True)
+    before = live.get("/index.html").variants["identity"].etag
+
+    index = site / "index.html"
+    index.write_text("<html>changed</html>")
+    stat = index.stat()
+    os.utime(index, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert frozen.get("/index.html").variants["identity"].etag == before
+    changed = live.get("/index.html")
+    assert changed.variants["identity"].body == b"<html>changed</html>"
+    assert changed.variants["identity"].etag != before
+
+
+def test_canonical_hits_skip_path_resolution(tmp_path, monkeypatch):
+    assets = StaticAssets(_site(tmp_path))
+
+    def _no_resolve(_url_path):
+        raise AssertionError("resolved a cached path")
+
+    monkeypatch.setattr(assets, "_resolve", _no_resolve)
+    assert assets.get("/").content_type == "text/html"
+    assert assets.get("/assets/logo.svg") is not None
+
+
+def test_symlinks_leaving_the_root_are_not_served(tmp_path):
+    (tmp_path / "secret.txt").write_text("nope")
+    web = tmp_path / "web"
+    web.mkdir()
+    (web / "leak.txt").symlink_to(tmp_path / "secret.txt")
+    assert StaticAssets(web).get("/leak.txt") is None
+
+
+@pytest.fixture()
+def port():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), app.Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        yield srv.server_port
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _get(port: int, path: str, headers: dict[str, str] | None = None):
+    conn = HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp, body
+
+
+def test_index_and_assets_are_served_from_memory(port):
+    resp, body = _get(port, "/", {"Accept-Encoding": "gzip"})
+    assert resp.status == 200
+    assert resp.getheader("Content-Encoding") == "gzip"
+    assert resp.getheader("Cache-Control") == ASSET_CACHE_CONTROL
+    assert gzip.decompress(body) == (app.WEB / "index.html").read_bytes()
+
+    resp, body = _get(port, "/assets/glytch-logo.svg")
+    assert resp.status == 200
+    # Asset URLs are not fingerprinted, so they revalidate rather than being pinned.
+    assert resp.getheader("Cache-Control") == ASSET_CACHE_CONTROL
+    assert body == (app.WEB / "assets" / "glytch-logo.svg").read_bytes()
+
+    resp, _ = _get(port, "/styles.css", {"If-None-Match": resp.getheader("ETag")})
+    assert resp.status == 200
+    etag = resp.getheader("ETag")
+    resp, body = _get(port, "/styles.css", {"If-None-Match": etag})
+    assert resp.status == 304 and body == b""
+
+
+def test_unknown_files_still_404(port):
+    resp, _ = _get(port, "/does-not-exist.js")
+    assert resp.status == 404
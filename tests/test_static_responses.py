@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import app
+from src.static_responses import negotiate_encoding, prepare, prepare_json
+
+
+def test_prepared_json_has_stable_strong_etags_per_encoding():
+    first = prepare_json({"levels": [{"id": n} for n in range(50)]})
+    again = prepare_json({"levels": [{"id": n} for n in range(50)]})
+    assert first.variants["identity"].etag == again.variants["identity"].etag
+    assert first.variants["gzip"].etag != first.variants["identity"].etag
+    assert not first.variants["identity"].etag.startswith("W/")
+    assert gzip.decompress(first.variants["gzip"].body) == first.variants["identity"].body
+
+
+def test_tiny_bodies_are_not_compressed():
+    assert set(prepare(b"{}", "application/json").variants) == {"identity"}
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, "identity"),
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0", "identity"),
+        ("identity;q=1, gzip;q=0.5", "identity"),
+        ("*", "gzip"),
+        ("deflate", "identity"),
+    ],
+)
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header, ("identity", "gzip")) == expected
+
+
+def test_if_none_match_accepts_any_variant_tag_list_or_wildcard():
+    prepared = prepare_json({"stages": ["x" * 200]})
+    gzip_tag = prepared.variants["gzip"].etag
+    assert prepared.not_modified(f'"other", {gzip_tag}')
+    assert prepared.not_modified(f"W/{prepared.variants['identity'].etag}")
+    assert prepared.not_modified("*")
+    assert not prepared.not_modified('"other"')
+    assert not prepared.not_modified(None)
+
+
+@pytest.fixture()
+def port():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), app.Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        yield srv.server_port
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _get(port: int, path: str, headers: dict[str, str] | None = None):
+    conn = HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp, body
+
+
+def test_static_endpoints_serve_gzip_and_revalidate_with_304(port):
+    resp, body = _get(port, "/api/levels", {"Accept-Encoding": "gzip"})
+    assert resp.status == 200
+    assert resp.getheader("Content-Encoding") == "gzip"
+    assert resp.getheader("Vary") == "Accept-Encoding"
+    assert "max-age" in resp.getheader("Cache-Control")
+    assert resp.getheader("X-Request-ID")
+    assert json.loads(gzip.decompress(body)) == json.loads(json.dumps({"levels": app.LEVELS}))
+
+    etag = resp.getheader("ETag")
+    resp, body = _get(port, "/api/levels", {"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert resp.status == 304 and body == b""
+    assert resp.getheader("ETag") == etag
+
+
+def test_static_endpoints_default_to_identity(port):
+    resp, body = _get(port, "/api/assessment")
+    assert resp.status == 200
+    assert resp.getheader("Content-Encoding") is None
+    assert int(resp.getheader("Content-Length")) == len(body)
+    assert json.loads(body) == json.loads(json.dumps({"questions": app.ASSESSMENT_QUESTIONS}))
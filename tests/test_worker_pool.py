@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import src.worker_pool as worker_pool
+from src.chat_runtime import SyncChatRuntime, run_sync
+from src.dag import DagNode, fan_out, run_dag
+from src.levels import run_level
+from src.worker_pool import FairWorkerPool
+
+
+def test_pool_caps_concurrency_and_reports_queue_metrics():
+    pool = FairWorkerPool(max_workers=2)
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def _job():
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return "ok"
+
+    futures = [pool.submit("run", _job) for _ in range(6)]
+    assert [f.result() for f in futures] == ["ok"] * 6
+    stats = pool.snapshot()
+    pool.close()
+    assert running[1] == 2
+    assert stats["threads"] == 2
+    assert stats["max_queue_depth"] >= 4
+    assert stats["completed"] == 6 and stats["queue_depth"] == 0
+    assert stats["wait_seconds_max"] > 0
+
+
+def test_runs_are_served_round_robin():
+    pool = FairWorkerPool(max_workers=1)
+    gate = threading.Event()
+    order: list[str] = []
+    blocker = pool.submit("busy", gate.wait)
+    futures = [pool.submit("a", lambda i=i: order.append(f"a{i}")) for i in range(4)]
+    futures.append(pool.submit("b", lambda: order.append("b0")))
+    gate.set()
+    blocker.result()
+    for f in futures:
+        f.result()
+    pool.close()
+    assert order.index("b0") <= 1
+
+
+def test_nested_calls_run_inline_instead_of_deadlocking():
+    pool = FairWorkerPool(max_workers=1)
+    assert (
+        pool.submit("run", lambda: pool.call("run", lambda: "inner")).result(timeout=2) == "inner"
+    )
+    assert pool.snapshot()["inline"] == 1
+    pool.close()
+
+
+def test_concurrent_level8_runs_share_the_global_cap(monkeypatch):
+    pool = FairWorkerPool(max_workers=3)
+    monkeypatch.setattr(worker_pool, "_shared", pool)
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    class Client:
+        def available(self):
+            return True
+
+        def chat(self, prompt, _context):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return "supported: ok" if "verifier" in prompt.lower() else "merged"
+
+    threads_before = threading.active_count()
+    payloads = []
+    callers = [
+        threading.Thread(target=lambda: payloads.append(run_level(8, Client()))) for _ in range(8)
+    ]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join()
+    pool.close()
+    assert len(payloads) == 8
+    assert all(p["approval_summary"]["approved"] for p in payloads)
+    assert in_flight[1] <= 3
+    assert pool.snapshot()["threads"] == 3
+    assert threading.active_count() <= threads_before + 3
+
+
+def _nested_fan_out(pool: FairWorkerPool, width: int, delay: float):
+    runtime = SyncChatRuntime(object(), pool=pool)
+
+    def _leaf(name: str):
+        async def _run(_inputs):
+            time.sleep(delay)
+            return name
+
+        return _run
+
+    async def _outer(_inputs):
+        inner = await fan_out(
+            runtime, [DagNode(f"leaf{i}", _leaf(f"leaf{i}")) for i in range(width)]
+        )
+        gathered = await runtime.gather([_leaf("g")({}) for _ in range(width)])
+        return sorted(inner.outputs.values()) + gathered
+
+    started = time.perf_counter()
+    outputs = run_sync(run_dag(runtime, [DagNode("outer", _outer)])).outputs["outer"]
+    return outputs, time.perf_counter() - started
+
+
+def test_nested_fan_out_on_a_pool_thread_runs_in_parallel():
+    pool = FairWorkerPool(max_workers=4)
+    outputs, elapsed = _nested_fan_out(pool, width=3, delay=0.15)
+    stats = pool.snapshot()
+    pool.close()
+    assert outputs == ["leaf0", "leaf1", "leaf2", "g", "g", "g"]
+    # Two waves of three 0.15s leaves; running them one by one would take 0.9s.
+    assert elapsed < 0.6
+    assert stats["nested"] == 6
+    assert stats["nested_inline"] < 6
+
+
+def test_nested_work_in_a_full_pool_runs_on_the_waiting_thread():
+    pool = FairWorkerPool(max_workers=1)
+    outputs, _ = _nested_fan_out(pool, width=3, delay=0.0)
+    stats = pool.snapshot()
+    pool.close()
+    assert outputs == ["leaf0", "leaf1", "leaf2", "g", "g", "g"]
+    assert stats["nested"] == stats["nested_inline"] == 6
@@ -30,9 +30,87 @@ export const loadStartupData = () =>
     fetchJson('/api/agentic-maturity'),
   ]);
 
-export const runLevelRequest = (payload) =>
-  fetchJson('/api/run', {
+function parseSseFrame(frame) {
+  let event = 'message';
+  const dataLines = [];
+  frame.split('\n').forEach((line) => {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+  });
+  if (!dataLines.length) return null;
+  try {
+    return { event, data: JSON.parse(dataLines.join('\n')) };
+  } catch {
+    return null;
+  }
+}
+
+function streamError(data) {
+  const error = new Error(data?.error || 'Streaming run failed');
+  error.requestId = data?.request_id;
+  error.code = data?.code;
+  error.status = data?.status;
+  return error;
+}
+
+async function streamRunLevel(url, payload, onEvent) {
+  let res;
+  try {
+    res = await fetch(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify(payload),
+    });
+  } catch (err) {
+    throw new Error(`Network error while requesting ${url}: ${err instanceof Error ? err.message : 'request failed'}`);
+  }
+  if (!res.ok || !(res.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+    let data;
+    try {
+      data = await res.json();
+    } catch {
+      throw new Error(`Malformed JSON response from ${url}`);
+    }
+    throw Object.assign(streamError(data), { status: res.status, field: data?.field });
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+  let failure = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+    let cut = buffer.indexOf('\n\n');
+    while (cut !== -1) {
+      const message = parseSseFrame(buffer.slice(0, cut));
+      buffer = buffer.slice(cut + 2);
+      cut = buffer.indexOf('\n\n');
+      if (!message) continue;
+      if (message.event === 'result') result = message.data;
+      else if (message.event === 'error') failure = streamError(message.data);
+      else onEvent(message.event, message.data);
+    }
+  }
+  if (failure) throw failure;
+  if (!result) throw new Error(`Stream from ${url} ended without a result`);
+  return result;
+}
+
+let runEventHandler = null;
+
+export const onRunLevelEvent = (handler) => {
+  runEventHandler = handler;
+};
+
+export const runLevelRequest = (payload, onEvent = runEventHandler) => {
+  if (onEvent && typeof ReadableStream !== 'undefined' && typeof TextDecoder !== 'undefined') {
+    return streamRunLevel('/api/run/stream', payload, onEvent);
+  }
+  return fetchJson('/api/run', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify(payload),
   });
+};
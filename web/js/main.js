@@ -1,10 +1,10 @@
-import { loadStartupData, runLevelRequest } from './api.js';
+import { loadStartupData, onRunLevelEvent, runLevelRequest } from './api.js';
 import { createEl, el, refs, setStatus } from './dom.js';
 import { renderQuiz } from './quiz.js';
 import { renderScorePanel } from './render-score.js';
 import { renderMaturityStages, renderBeforeAfter, renderLevelCards, renderSurpriseUseCases, renderUseCases } from './render-static.js';
 import { renderTaskboard } from './render-taskboard.js';
-import { renderTheatre } from './render-theatre.js';
+import { appendTheatreStep, renderTheatre } from './render-theatre.js';
 import { runReplay } from './replay.js';
 import { appendMessage, clearOutput, clearRunPanels, updateLevelButtonsVisibility } from './run-ui.js';
 import { initOnboarding } from './onboarding.js';
@@ -135,6 +135,14 @@ function getRuntimeWarningLines(runtimeError) {
   ];
 }
 
+function onRunEvent(event, data) {
+  if (event === 'started') setText(refs.meta, `request_id=${data?.request_id || 'Available after run'} · streaming live progress`);
+  else if (event === 'theatre_step') appendTheatreStep(data);
+  else if (event === 'taskboard' && data?.task) setStatus(`Running… ${data.task.worker_name || data.task.task_id}: ${data.task.status}`, 'running');
+}
+
+onRunLevelEvent(onRunEvent);
+
 async function runLevel(level) {
   state.lastRunLevel = level;
   if (!state.confirmedUseCase || state.runInProgress) return;
@@ -30,6 +30,8 @@ export function renderTaskboard(data) {
     attempt: r.attempt || 1,
     output: summarizeOutput(r.output || r.output_summary || r.summary),
     error: r.error || '',
+    depends_on: Array.isArray(r.depends_on) ? r.depends_on : [],
+    on_critical_path: Boolean(r.on_critical_path),
   }));
   const columns = ['pending', 'running', 'completed', 'needs_human_review', 'merged', 'failed'];
   const wrap = createEl('div', 'taskboard-grid');
@@ -44,6 +46,8 @@ export function renderTaskboard(data) {
       const wc = createEl('article', `worker-card ${w.status}`);
       appendKV(wc, 'Step', w.worker_name); appendKV(wc, 'Role', w.worker_role); appendKV(wc, 'What it worked on', w.task);
       appendKV(wc, 'Result', `${humanizeStatus(w.status)} · Step status: ${humanizeStatus(w.worker_status)}`); appendKV(wc, 'Try', String(w.attempt)); appendKV(wc, 'Summary', w.output);
+      if (w.depends_on.length) appendKV(wc, 'Waits for', w.depends_on.join(', '));
+      if (w.on_critical_path) wc.appendChild(createEl('div', 'pill running', 'On critical path'));
       if (w.error) wc.appendChild(createEl('div', 'pill blocked', `Error: ${w.error}`));
       col.appendChild(wc);
     });
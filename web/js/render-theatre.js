@@ -10,16 +10,26 @@ function humanizeTheatreLabel(label) {
   return label;
 }
 
+function buildTheatreCard(s) {
+  const status = normalizeStatus(s.status);
+  const card = createEl('article', `theatre-step ${status}`);
+  const header = createEl('div', 'section-header');
+  header.append(createEl('span', 'actor', (s.actor || 'agent').toLowerCase()), createEl('span', `pill ${status}`, humanizeStatus(status)));
+  card.append(header, createEl('strong', '', humanizeTheatreLabel(s.label || 'Workflow step')), createEl('div', '', s.summary || ''), createEl('div', 'muted', s.detail || ''));
+  return card;
+}
+
+export function appendTheatreStep(step) {
+  if (!refs.theatreSteps) return;
+  refs.theatreSteps.appendChild(buildTheatreCard(step));
+}
+
 export function renderTheatre(data) {
   refs.theatreSteps.textContent = '';
   state.theatreCards = [];
   const steps = data.theatre_steps || [];
   steps.forEach((s) => {
-    const status = normalizeStatus(s.status);
-    const card = createEl('article', `theatre-step ${status}`);
-    const header = createEl('div', 'section-header');
-    header.append(createEl('span', 'actor', (s.actor || 'agent').toLowerCase()), createEl('span', `pill ${status}`, humanizeStatus(status)));
-    card.append(header, createEl('strong', '', humanizeTheatreLabel(s.label || 'Workflow step')), createEl('div', '', s.summary || ''), createEl('div', 'muted', s.detail || ''));
+    const card = buildTheatreCard(s);
     state.theatreCards.push(card);
     refs.theatreSteps.appendChild(card);
   });